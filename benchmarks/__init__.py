@@ -0,0 +1,4 @@
+"""
+Benchmarks of the transfers, globbing, status polling and the launch workflow against an
+SSH/SFTP server running in the same process. Run them with `python -m benchmarks`.
+"""
@@ -0,0 +1,172 @@
+import json
+import platform
+import statistics
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import typer
+
+from rcc.core.ssh import ConnectionPool, LinkConditions
+
+from .standin import StandInServer
+from .suite import BENCHMARKS, HIGHER_IS_BETTER, LOWER_IS_BETTER, Environment
+
+# Each metric is summarized as {"median": ..., "min": ..., "max": ...}
+Results = Dict[str, Dict[str, Dict[str, float]]]
+
+app = typer.Typer()
+
+
+@app.command()
+def main(
+    output: Optional[str] = typer.Option(
+        None, help="Write the results as JSON to this file"
+    ),
+    compare: Optional[str] = typer.Option(
+        None, help="Compare against the results in this JSON file"
+    ),
+    threshold: float = typer.Option(
+        0.1, help="The relative change of a median that counts as a regression"
+    ),
+    repeat: int = typer.Option(3, help="How often each benchmark runs"),
+    only: List[str] = typer.Option(
+        [], help=f"Only run these benchmarks, out of {', '.join(BENCHMARKS)}"
+    ),
+    delay: float = typer.Option(
+        0.0, help="Simulated one way delay of the link to the server in milliseconds"
+    ),
+    jitter: float = typer.Option(
+        0.0, help="The delay varies by up to this many milliseconds"
+    ),
+    bandwidth: Optional[float] = typer.Option(
+        None, help="Simulated bandwidth of the link in each direction, in MB/s"
+    ),
+):
+    unknown = [name for name in only if name not in BENCHMARKS]
+    if unknown:
+        typer.echo(f"Unknown benchmarks: {', '.join(unknown)}", err=True)
+        raise typer.Exit(2)
+
+    conditions = None
+    if delay or jitter or bandwidth:
+        conditions = LinkConditions(
+            delay=delay / 1000,
+            jitter=jitter / 1000,
+            bandwidth=bandwidth * 2**20 if bandwidth else None,
+        )
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "link": {"delay_ms": delay, "jitter_ms": jitter, "bandwidth_mb": bandwidth},
+        "benchmarks": run(only or list(BENCHMARKS), repeat, conditions),
+    }
+    _print(report["benchmarks"])
+
+    if output:
+        with open(output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if compare:
+        with open(compare) as file:
+            baseline_report = json.load(file)
+        if baseline_report.get("link") != report["link"]:
+            typer.echo("The baseline was measured with other link conditions", err=True)
+        baseline = baseline_report["benchmarks"]
+        regressions = find_regressions(baseline, report["benchmarks"], threshold)
+        for regression in regressions:
+            typer.echo(f"Regression: {regression}", err=True)
+        if regressions:
+            raise typer.Exit(1)
+
+
+def run(
+    names: List[str], repeat: int, conditions: Optional[LinkConditions] = None
+) -> Results:
+    """
+    Runs the benchmarks against one stand-in server.
+
+    Args:
+        names (List[str]): The benchmarks to run
+        repeat (int): How often each benchmark runs
+        conditions (LinkConditions): The simulated link to the server, loopback speed if None
+
+    Returns:
+        Results: The median, minimum and maximum of every metric, by benchmark
+    """
+    results: Results = {}
+    with tempfile.TemporaryDirectory() as remote_dir, tempfile.TemporaryDirectory() as local_dir:
+        with StandInServer(remote_dir) as server:
+            environment = Environment(server, local_dir, ConnectionPool(conditions))
+            try:
+                for name in names:
+                    typer.echo(f"Running {name}", err=True)
+                    runs = [BENCHMARKS[name](environment) for _ in range(repeat)]
+                    results[name] = _summarize(runs)
+            finally:
+                environment.pool.close()
+
+    return results
+
+
+def find_regressions(
+    baseline: Results, current: Results, threshold: float
+) -> List[str]:
+    """
+    Compares the medians of the metrics both results share.
+
+    Returns:
+        List[str]: A description of every metric that got worse by more than `threshold`
+    """
+    regressions = []
+    for name, metrics in current.items():
+        for metric, summary in metrics.items():
+            before = baseline.get(name, {}).get(metric)
+            if before is None or before["median"] == 0:
+                continue
+
+            change = summary["median"] / before["median"] - 1
+            if metric.endswith(HIGHER_IS_BETTER):
+                change = -change
+            elif not metric.endswith(LOWER_IS_BETTER):
+                continue
+
+            if change > threshold:
+                regressions.append(
+                    f"{name}.{metric}: {before['median']:.4g} -> {summary['median']:.4g}"
+                )
+
+    return regressions
+
+
+def _summarize(runs: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    return {
+        metric: {
+            "median": statistics.median(values),
+            "min": min(values),
+            "max": max(values),
+        }
+        for metric, values in _by_metric(runs).items()
+    }
+
+
+def _by_metric(runs: List[Dict[str, float]]) -> Dict[str, List[float]]:
+    values: Dict[str, List[float]] = {}
+    for metrics in runs:
+        for metric, value in metrics.items():
+            values.setdefault(metric, []).append(value)
+
+    return values
+
+
+def _print(results: Results) -> None:
+    for name, metrics in results.items():
+        for metric, summary in metrics.items():
+            typer.echo(f"{name}.{metric}: {summary['median']:.4g}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,174 @@
+import itertools
+import os
+import shlex
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+# The exit code, stdout and stderr of a command
+Answer = Tuple[int, str, str]
+
+# The time limit of every job in minutes
+TIME_LIMIT = 60
+
+
+@dataclass
+class _Job:
+    name: str
+    submitted_at: float
+    held: bool = False
+    released_at: Optional[float] = None
+    cancelled: bool = False
+
+
+class FakeSlurm:
+    """
+    Answers sbatch, sacct, squeue, scancel and scontrol release from memory, with the output
+    the Slurm controller expects. Jobs wait in the queue for `queue_time` seconds, then run
+    for `run_time` seconds and complete.
+    """
+
+    def __init__(self, queue_time: float = 0.0, run_time: float = 0.5) -> None:
+        """
+        Args:
+            queue_time (float): The seconds a job is pending before it runs
+            run_time (float): The seconds a job runs
+        """
+        self.queue_time = queue_time
+        self.run_time = run_time
+        self.commands: List[str] = []
+        self._jobs: Dict[str, _Job] = {}
+        self._ids = itertools.count(1000)
+        self._lock = threading.Lock()
+        self._handlers: Dict[str, Callable[[List[str]], Answer]] = {
+            "sbatch": self._sbatch,
+            "sacct": self._sacct,
+            "squeue": self._squeue,
+            "scancel": self._scancel,
+            "scontrol": self._scontrol,
+        }
+
+    def handle(self, command: str) -> Optional[Answer]:
+        """
+        Runs a Slurm command.
+
+        Args:
+            command (str): The command line, optionally with leading environment variables
+
+        Returns:
+            Optional[Answer]: None if the command is not a Slurm command
+        """
+        try:
+            arguments = shlex.split(command)
+        except ValueError:
+            return None
+
+        # Leading VARIABLE=value assignments
+        while arguments and "=" in arguments[0] and not arguments[0].startswith("-"):
+            arguments = arguments[1:]
+
+        if not arguments or arguments[0] not in self._handlers:
+            return None
+
+        with self._lock:
+            self.commands.append(command)
+            return self._handlers[arguments[0]](arguments[1:])
+
+    def submit(self, name: str = "job") -> str:
+        """
+        Submits a job without going through sbatch, e.g. to fill the queue.
+        """
+        with self._lock:
+            return self._submit(name, held=False)
+
+    def _submit(self, name: str, held: bool) -> str:
+        jobid = str(next(self._ids))
+        self._jobs[jobid] = _Job(name, time.time(), held)
+        return jobid
+
+    def _sbatch(self, arguments: List[str]) -> Answer:
+        held = "--hold" in arguments
+        scripts = [argument for argument in arguments if not argument.startswith("-")]
+        if not scripts:
+            return 1, "", "sbatch: error: no batch script\n"
+
+        jobid = self._submit(os.path.basename(scripts[-1]), held)
+        return 0, f"Submitted batch job {jobid}\n", ""
+
+    def _sacct(self, arguments: List[str]) -> Answer:
+        lines = []
+        for jobid in self._requested_jobs(arguments, ("-j", "--jobs")):
+            job = self._jobs[jobid]
+            state, start = self._state(job)
+            start_field = str(int(start)) if start is not None else "Unknown"
+            lines.append(f"{jobid}|{job.name}|{state}|{start_field}|{TIME_LIMIT}\n")
+            if start is not None:
+                lines.append(f"{jobid}.batch|batch|{state}|{start_field}|\n")
+
+        return 0, "".join(lines), ""
+
+    def _squeue(self, arguments: List[str]) -> Answer:
+        with_format = "--format" in arguments or "-o" in arguments
+        lines = []
+        for jobid in self._requested_jobs(arguments, ("-j", "--jobs")):
+            job = self._jobs[jobid]
+            state, start = self._state(job)
+            if state not in ("PENDING", "RUNNING"):
+                continue
+
+            if not with_format:
+                lines.append(f"{state}\n")
+                continue
+
+            start_field = str(int(start)) if start is not None else "N/A"
+            lines.append(f"{jobid}|{job.name}|{state}|{start_field}|1:00:00\n")
+
+        return 0, "".join(lines), ""
+
+    def _scancel(self, arguments: List[str]) -> Answer:
+        for jobid in arguments:
+            if jobid in self._jobs:
+                self._jobs[jobid].cancelled = True
+
+        return 0, "", ""
+
+    def _scontrol(self, arguments: List[str]) -> Answer:
+        if arguments[:1] != ["release"]:
+            return 1, "", f"scontrol: unsupported arguments {arguments}\n"
+
+        now = time.time()
+        for jobid in arguments[1:]:
+            job = self._jobs.get(jobid)
+            if job is not None and job.held:
+                job.held = False
+                job.released_at = now
+
+        return 0, "", ""
+
+    def _requested_jobs(
+        self, arguments: List[str], options: Tuple[str, ...]
+    ) -> List[str]:
+        for option, value in zip(arguments, arguments[1:]):
+            if option in options:
+                return [jobid for jobid in value.split(",") if jobid in self._jobs]
+
+        return []
+
+    def _state(self, job: _Job) -> Tuple[str, Optional[float]]:
+        """
+        Returns the state of the job and the time it started, None if it did not start.
+        """
+        if job.held:
+            return ("CANCELLED" if job.cancelled else "PENDING"), None
+
+        start = (job.released_at or job.submitted_at) + self.queue_time
+        now = time.time()
+        if job.cancelled:
+            return "CANCELLED", start if start <= now else None
+        if now < start:
+            return "PENDING", None
+        if now < start + self.run_time:
+            return "RUNNING", start
+
+        return "COMPLETED", start
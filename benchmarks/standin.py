@@ -0,0 +1,317 @@
+import os
+import socket
+import subprocess
+import threading
+from typing import IO, Any, Callable, List, Optional
+
+import paramiko as pm
+
+from rcc.core.ssh import ConnectionData
+
+from .fakeslurm import FakeSlurm
+
+USERNAME = "bench"
+PASSWORD = "bench"
+
+# Paramiko's default is far below what a real server offers, it would dominate the transfer benchmarks
+_WINDOW_SIZE = 2**27
+_BUFFER_SIZE = 2**16
+
+
+class StandInServer:
+    """
+    An SSH server in the current process that serves a local directory over SFTP and runs commands
+    in it. Slurm commands are answered by a FakeSlurm, everything else runs in bash.
+    Accepts any user with the password PASSWORD.
+    """
+
+    def __init__(self, root: str, slurm: Optional[FakeSlurm] = None) -> None:
+        """
+        Args:
+            root (str): The directory served as the remote home directory
+            slurm (FakeSlurm): Answers the Slurm commands, a FakeSlurm with default settings if None
+        """
+        self.root = root
+        self.slurm = slurm or FakeSlurm()
+        self._host_key = pm.RSAKey.generate(2048)
+        self._listener = socket.socket()
+        self._transports: List[pm.Transport] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self) -> "StandInServer":
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    @property
+    def port(self) -> int:
+        return self._listener.getsockname()[1]
+
+    def connection(self) -> ConnectionData:
+        return ConnectionData("127.0.0.1", USERNAME, password=PASSWORD, port=self.port)
+
+    def start(self) -> None:
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind(("127.0.0.1", 0))
+        self._listener.listen(64)
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            transports, self._transports = self._transports, []
+
+        self._listener.close()
+        for transport in transports:
+            transport.close()
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                sock, _ = self._listener.accept()
+            except OSError:
+                return
+
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _serve(self, sock: socket.socket) -> None:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        transport = pm.Transport(sock, default_window_size=_WINDOW_SIZE)
+        transport.add_server_key(self._host_key)
+        transport.set_subsystem_handler(
+            "sftp", pm.SFTPServer, _DirectorySFTP, root=self.root
+        )
+        with self._lock:
+            if self._closed:
+                transport.close()
+                return
+            self._transports.append(transport)
+
+        transport.start_server(server=_Authenticator(self._run))
+        # Channels are handled by the callbacks of the server interface, but paramiko closes
+        # a channel once it is garbage collected, so they are kept until they are closed
+        channels: List[pm.Channel] = []
+        while transport.is_active():
+            channel = transport.accept(1)
+            channels = [
+                open_channel for open_channel in channels if not open_channel.closed
+            ]
+            if channel is not None:
+                channels.append(channel)
+
+    def _run(self, channel: pm.Channel, command: str) -> None:
+        answer = self.slurm.handle(command)
+        if answer is None:
+            _run_in_bash(channel, command, self.root)
+            return
+
+        exit_code, stdout, stderr = answer
+        try:
+            channel.sendall(stdout.encode())
+            channel.sendall_stderr(stderr.encode())
+            _close(channel, exit_code)
+        except OSError:
+            pass
+
+
+class _Authenticator(pm.ServerInterface):
+    def __init__(self, run: Callable[[pm.Channel, str], None]) -> None:
+        self._run = run
+
+    def get_allowed_auths(self, username: str) -> str:
+        return "password"
+
+    def check_auth_password(self, username: str, password: str) -> int:
+        if password == PASSWORD:
+            return pm.AUTH_SUCCESSFUL
+        return pm.AUTH_FAILED
+
+    def check_channel_request(self, kind: str, chanid: int) -> int:
+        return pm.OPEN_SUCCEEDED
+
+    def check_channel_exec_request(self, channel: pm.Channel, command: bytes) -> bool:
+        threading.Thread(
+            target=self._run, args=(channel, command.decode()), daemon=True
+        ).start()
+        return True
+
+
+class _DirectorySFTP(pm.SFTPServerInterface):
+    """
+    Serves a local directory, relative paths are relative to it
+    """
+
+    def __init__(self, server: Any, *args: Any, root: str, **kwargs: Any) -> None:
+        super().__init__(server, *args, **kwargs)
+        self._root = root
+
+    def canonicalize(self, path: str) -> str:
+        if not os.path.isabs(path):
+            path = os.path.join(self._root, path)
+        return os.path.normpath(path)
+
+    def list_folder(self, path: str) -> Any:
+        path = self.canonicalize(path)
+        try:
+            entries = []
+            for name in os.listdir(path):
+                attributes = pm.SFTPAttributes.from_stat(
+                    os.lstat(os.path.join(path, name))
+                )
+                attributes.filename = name
+                entries.append(attributes)
+            return entries
+        except OSError as err:
+            return pm.SFTPServer.convert_errno(err.errno)
+
+    def stat(self, path: str) -> Any:
+        try:
+            return pm.SFTPAttributes.from_stat(os.stat(self.canonicalize(path)))
+        except OSError as err:
+            return pm.SFTPServer.convert_errno(err.errno)
+
+    def lstat(self, path: str) -> Any:
+        try:
+            return pm.SFTPAttributes.from_stat(os.lstat(self.canonicalize(path)))
+        except OSError as err:
+            return pm.SFTPServer.convert_errno(err.errno)
+
+    def open(self, path: str, flags: int, attr: Any) -> Any:
+        path = self.canonicalize(path)
+        try:
+            mode = getattr(attr, "st_mode", None)
+            descriptor = os.open(path, flags, mode if mode is not None else 0o666)
+        except OSError as err:
+            return pm.SFTPServer.convert_errno(err.errno)
+
+        if flags & os.O_CREAT and attr is not None:
+            attr._flags &= ~attr.FLAG_PERMISSIONS
+            pm.SFTPServer.set_file_attr(path, attr)
+
+        if flags & os.O_WRONLY:
+            file_mode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            file_mode = "a+b" if flags & os.O_APPEND else "r+b"
+        else:
+            file_mode = "rb"
+
+        handle = _FileHandle(flags)
+        handle.filename = path
+        handle.readfile = handle.writefile = os.fdopen(descriptor, file_mode)
+        return handle
+
+    def remove(self, path: str) -> int:
+        return _sftp_call(os.remove, self.canonicalize(path))
+
+    def rename(self, oldpath: str, newpath: str) -> int:
+        return _sftp_call(
+            os.rename, self.canonicalize(oldpath), self.canonicalize(newpath)
+        )
+
+    def posix_rename(self, oldpath: str, newpath: str) -> int:
+        return _sftp_call(
+            os.replace, self.canonicalize(oldpath), self.canonicalize(newpath)
+        )
+
+    def mkdir(self, path: str, attr: Any) -> int:
+        return _sftp_call(os.mkdir, self.canonicalize(path))
+
+    def rmdir(self, path: str) -> int:
+        return _sftp_call(os.rmdir, self.canonicalize(path))
+
+    def chattr(self, path: str, attr: Any) -> int:
+        return _sftp_call(pm.SFTPServer.set_file_attr, self.canonicalize(path), attr)
+
+
+class _FileHandle(pm.SFTPHandle):
+    filename: str
+
+    def stat(self) -> Any:
+        try:
+            return pm.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+        except OSError as err:
+            return pm.SFTPServer.convert_errno(err.errno)
+
+    def chattr(self, attr: Any) -> int:
+        return _sftp_call(pm.SFTPServer.set_file_attr, self.filename, attr)
+
+
+def _sftp_call(function: Callable[..., Any], *args: Any) -> int:
+    try:
+        function(*args)
+    except OSError as err:
+        return pm.SFTPServer.convert_errno(err.errno)
+    return pm.SFTP_OK
+
+
+def _run_in_bash(channel: pm.Channel, command: str, cwd: str) -> None:
+    process = subprocess.Popen(
+        ["bash", "-c", command],
+        cwd=cwd,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    threads = [
+        threading.Thread(
+            target=_pump_stdin, args=(channel, process.stdin), daemon=True
+        ),
+        threading.Thread(
+            target=_pump, args=(process.stderr, channel.sendall_stderr), daemon=True
+        ),
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        _pump(process.stdout, channel.sendall)
+    except OSError:
+        # The client closed the channel
+        process.kill()
+
+    threads[1].join()
+    try:
+        _close(channel, process.wait())
+    except OSError:
+        pass
+
+
+def _pump_stdin(channel: pm.Channel, stdin: Optional[IO[bytes]]) -> None:
+    if stdin is None:
+        return
+
+    try:
+        while True:
+            data = channel.recv(_BUFFER_SIZE)
+            if not data:
+                break
+            stdin.write(data)
+            stdin.flush()
+    except OSError:
+        pass
+    finally:
+        try:
+            stdin.close()
+        except OSError:
+            pass
+
+
+def _pump(source: Optional[IO[bytes]], send: Callable[[bytes], Any]) -> None:
+    if source is None:
+        return
+
+    while True:
+        data = os.read(source.fileno(), _BUFFER_SIZE)
+        if not data:
+            return
+        send(data)
+
+
+def _close(channel: pm.Channel, exit_code: int) -> None:
+    # Closing the channel here could overtake paramiko's reply to the exec request, which the
+    # client treats as a failed request. The client closes the channel once it read everything.
+    channel.send_exit_status(exit_code)
+    channel.shutdown_write()
@@ -0,0 +1,269 @@
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+from rcc.cluster.slurm.controller import SlurmController
+from rcc.core.application import Application
+from rcc.core.filesystem import (
+    CopyInstruction,
+    Filesystem,
+    PyFilesystemFactory,
+    localfilesystem,
+    progressive_copy,
+)
+from rcc.core.filesystem.sshfs import sshfilesystem
+from rcc.core.ssh import ConnectionPool, SSHExecutor
+from rcc.core.ui import NullUI
+from rcc.core.utils import LaunchOptions, TransferOptions
+
+from .standin import StandInServer
+
+# Metric names end in one of these, they tell whether a larger value is better
+LOWER_IS_BETTER = ("_seconds", "_ms")
+HIGHER_IS_BETTER = ("_per_second",)
+
+Metrics = Dict[str, float]
+
+_SMALL_FILES = 500
+_SMALL_FILE_SIZE = 1024
+_LARGE_FILE_SIZE = 64 * 2**20
+_TREE_DEPTH = 5
+_TREE_FANOUT = 4
+_FILES_PER_DIRECTORY = 2
+_QUEUED_JOBS = 100
+_POLLS = 20
+
+
+@dataclass
+class Environment:
+    """
+    The stand-in server and a local directory shared by all benchmarks of a run.
+    Benchmarks create their fixtures in unique subdirectories, so runs can be repeated.
+    """
+
+    server: StandInServer
+    local_dir: str
+    # Connections to the server, they simulate the link conditions the run was started with
+    pool: ConnectionPool
+
+    @property
+    def remote_dir(self) -> str:
+        return self.server.root
+
+    def local_filesystem(self) -> Filesystem:
+        return localfilesystem(self.local_dir)
+
+    def remote_filesystem(self) -> Filesystem:
+        transfer = TransferOptions()
+        return sshfilesystem(
+            self.server.connection(),
+            pool=self.pool,
+            chunk_size=transfer.chunk_size,
+            window_size=transfer.window_size,
+            prefetch_requests=transfer.prefetch_requests,
+        )
+
+
+Benchmark = Callable[[Environment], Metrics]
+
+
+def copy_small_files(environment: Environment) -> Metrics:
+    """
+    Uploads many small files with the default transfer options, which bundle them into one archive stream.
+    """
+    return _copy_small_files(environment, TransferOptions().bundle_threshold)
+
+
+def copy_small_files_sftp(environment: Environment) -> Metrics:
+    """
+    Uploads many small files one by one over SFTP.
+    """
+    return _copy_small_files(environment, None)
+
+
+def copy_large_file(environment: Environment) -> Metrics:
+    """
+    Uploads a large file and downloads it again.
+    """
+    directory = _unique_directory(environment.local_dir)
+    _write_file(os.path.join(directory, "large.bin"), _LARGE_FILE_SIZE)
+    name = os.path.basename(directory)
+    local, remote = environment.local_filesystem(), environment.remote_filesystem()
+    megabytes = _LARGE_FILE_SIZE / 2**20
+
+    start = time.perf_counter()
+    _copy(local, remote, [CopyInstruction(f"{name}/large.bin", f"{name}/large.bin")])
+    upload = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _copy(remote, local, [CopyInstruction(f"{name}/large.bin", f"{name}/back.bin")])
+    download = time.perf_counter() - start
+
+    return {
+        "upload_seconds": upload,
+        "upload_megabytes_per_second": megabytes / upload,
+        "download_seconds": download,
+        "download_megabytes_per_second": megabytes / download,
+    }
+
+
+def glob_deep_tree(environment: Environment) -> Metrics:
+    """
+    Matches recursive and single level patterns against a deep tree on the remote side.
+    """
+    directory = _unique_directory(environment.remote_dir)
+    _make_tree(directory, _TREE_DEPTH)
+    name = os.path.basename(directory)
+    remote = environment.remote_filesystem()
+
+    start = time.perf_counter()
+    recursive = remote.glob(f"{name}/**/*.dat")
+    recursive_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    remote.glob(f"{name}/*/*/*.dat")
+    single_level_seconds = time.perf_counter() - start
+
+    return {
+        "recursive_seconds": recursive_seconds,
+        "recursive_files_per_second": len(recursive) / recursive_seconds,
+        "single_level_seconds": single_level_seconds,
+    }
+
+
+def poll_status(environment: Environment) -> Metrics:
+    """
+    Polls the status of a single job and of a full queue.
+    """
+    jobids = [environment.server.slurm.submit() for _ in range(_QUEUED_JOBS)]
+    with SSHExecutor(
+        environment.server.connection(), pool=environment.pool
+    ) as executor:
+        controller = SlurmController(executor)
+        controller.poll_status(jobids[0])
+
+        start = time.perf_counter()
+        for _ in range(_POLLS):
+            controller.poll_status(jobids[0])
+        single = (time.perf_counter() - start) / _POLLS
+
+        start = time.perf_counter()
+        for _ in range(_POLLS):
+            controller.poll_statuses(jobids)
+        queue = (time.perf_counter() - start) / _POLLS
+
+    return {"single_job_ms": single * 1000, "full_queue_ms": queue * 1000}
+
+
+def launch_workflow(environment: Environment) -> Metrics:
+    """
+    Uploads the inputs of a job, submits it and watches it until it completed.
+    """
+    directory = _unique_directory(environment.local_dir)
+    os.makedirs(os.path.join(directory, "input"))
+    for index in range(20):
+        _write_file(os.path.join(directory, "input", f"{index}.dat"), _SMALL_FILE_SIZE)
+    _write_text(os.path.join(directory, "job.sh"), "#!/bin/bash\necho done\n")
+
+    name = os.path.basename(directory)
+    options = LaunchOptions(
+        sbatch=f"{name}/job.sh",
+        connection=environment.server.connection(),
+        copy_files=[
+            CopyInstruction("input/*", f"{name}/input"),
+            CopyInstruction("job.sh", f"{name}/job.sh"),
+        ],
+        transfer=TransferOptions(journal_file=None),
+        watch=True,
+        poll_interval=1,
+    )
+    application = Application(
+        SSHExecutor(options.connection, pool=environment.pool),
+        PyFilesystemFactory(options, pool=environment.pool, workdir=directory),
+        NullUI(),
+    )
+
+    start = time.perf_counter()
+    exit_code = application.run(options)
+    seconds = time.perf_counter() - start
+    if exit_code != 0:
+        raise RuntimeError(f"The launch workflow failed with exit code {exit_code}")
+
+    return {"end_to_end_seconds": seconds}
+
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    "copy_small_files": copy_small_files,
+    "copy_small_files_sftp": copy_small_files_sftp,
+    "copy_large_file": copy_large_file,
+    "glob_deep_tree": glob_deep_tree,
+    "poll_status": poll_status,
+    "launch_workflow": launch_workflow,
+}
+
+
+def _copy_small_files(environment: Environment, bundle_threshold: object) -> Metrics:
+    directory = _unique_directory(environment.local_dir)
+    for index in range(_SMALL_FILES):
+        _write_file(os.path.join(directory, f"{index}.dat"), _SMALL_FILE_SIZE)
+
+    name = os.path.basename(directory)
+    local, remote = environment.local_filesystem(), environment.remote_filesystem()
+    start = time.perf_counter()
+    _copy(
+        local,
+        remote,
+        [CopyInstruction(f"{name}/*", name)],
+        bundle_threshold=bundle_threshold,
+    )
+    seconds = time.perf_counter() - start
+    return {"elapsed_seconds": seconds, "files_per_second": _SMALL_FILES / seconds}
+
+
+def _copy(
+    source: Filesystem,
+    target: Filesystem,
+    instructions: List[CopyInstruction],
+    bundle_threshold: object = None,
+) -> None:
+    transfer = TransferOptions()
+    for result in progressive_copy(
+        source,
+        target,
+        instructions,
+        workers=transfer.workers,
+        bundle_threshold=bundle_threshold,  # type: ignore[arg-type]
+    ):
+        if result.errors:
+            raise result.errors[0]
+
+
+def _make_tree(directory: str, depth: int) -> None:
+    for index in range(_FILES_PER_DIRECTORY):
+        _write_file(os.path.join(directory, f"{index}.dat"), 16)
+
+    if depth == 0:
+        return
+
+    for index in range(_TREE_FANOUT):
+        subdirectory = os.path.join(directory, f"d{index}")
+        os.mkdir(subdirectory)
+        _make_tree(subdirectory, depth - 1)
+
+
+def _unique_directory(parent: str) -> str:
+    directory = os.path.join(parent, f"bench-{uuid.uuid4().hex[:8]}")
+    os.makedirs(directory)
+    return directory
+
+
+def _write_file(path: str, size: int) -> None:
+    with open(path, "wb") as file:
+        file.write(os.urandom(size))
+
+
+def _write_text(path: str, text: str) -> None:
+    with open(path, "w") as file:
+        file.write(text)
@@ -0,0 +1,129 @@
+import os
+import socket
+from typing import Any, Dict
+
+from rcc.cli.protocol import (
+    UI_METHODS,
+    Message,
+    MessageReader,
+    read_messages,
+    status_from_dict,
+    write_message,
+)
+from rcc.core.ui import UI, NullUI
+
+# The exit code if the connection to the server drops before the command finished
+CONNECTION_LOST = 1
+
+# How long to wait for the server to accept a connection
+CONNECT_TIMEOUT = 1.0
+
+
+class ServerClient:
+    """
+    Runs commands on a running `rcc server` instead of in the current process,
+    so they use the server's open connections instead of connecting on their own.
+    """
+
+    def __init__(self, socket_path: str) -> None:
+        """
+        Args:
+            socket_path (str): The Unix domain socket the server listens on
+        """
+        self._socket_path = socket_path
+
+    def is_available(self) -> bool:
+        """
+        Checks whether a server is listening on the socket.
+        """
+        try:
+            with self._connect():
+                return True
+        except OSError:
+            return False
+
+    def run(self, command: str, config: Dict[str, Any], ui: UI, jobid: str = "") -> int:
+        """
+        Runs a command on the server and shows its progress in the UI. Interrupting the
+        command with Ctrl+C cancels it on the server, like it does for commands run locally.
+
+        Args:
+            command (str): One of "launch", "watch", "status" and "cancel"
+            config (dict): The config of the command. Environment variables are expanded here,
+                paths on the local machine are relative to the current working directory.
+            ui (UI): Shows the UI calls the server forwards
+            jobid (str): The job the command is about, unused for "launch"
+
+        Returns:
+            int: The exit code of the command
+        """
+        request = {
+            "command": command,
+            "config": _expand_variables(config),
+            "jobid": jobid,
+            "cwd": os.getcwd(),
+        }
+        with self._connect() as connection:
+            stream = connection.makefile("rwb")
+            write_message(stream, request)
+            try:
+                return _show_until_exit(stream, ui)
+            except KeyboardInterrupt:
+                write_message(stream, {"cancel": True})
+                return _show_until_exit(stream, ui)
+
+    def shutdown(self) -> int:
+        """
+        Stops the server, aborting the commands it still runs.
+
+        Returns:
+            int: The exit code of the request
+        """
+        with self._connect() as connection:
+            stream = connection.makefile("rwb")
+            write_message(stream, {"command": "shutdown"})
+            return _show_until_exit(stream, NullUI())
+
+    def _connect(self) -> socket.socket:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.settimeout(CONNECT_TIMEOUT)
+            connection.connect(self._socket_path)
+            # Commands may run for hours
+            connection.settimeout(None)
+        except OSError:
+            connection.close()
+            raise
+
+        return connection
+
+
+def _show_until_exit(stream: MessageReader, ui: UI) -> int:
+    for message in read_messages(stream):
+        if "exit" in message:
+            return int(message["exit"])
+
+        _show(message, ui)
+
+    ui.error("Lost the connection to the server")
+    return CONNECTION_LOST
+
+
+def _show(message: Message, ui: UI) -> None:
+    method = message.get("ui")
+    if method == "update":
+        ui.update(status_from_dict(message["status"]))
+    elif method in UI_METHODS:
+        getattr(ui, method)(message["text"])
+
+
+def _expand_variables(config: Any) -> Any:
+    # Variables in the config refer to the client's environment, not the server's
+    if isinstance(config, str):
+        return os.path.expandvars(config)
+    if isinstance(config, dict):
+        return {key: _expand_variables(value) for key, value in config.items()}
+    if isinstance(config, list):
+        return [_expand_variables(value) for value in config]
+
+    return config
@@ -0,0 +1,61 @@
+import os
+from typing import Any, Dict, Optional, cast
+
+from omegaconf import OmegaConf
+
+from rcc.core.job.registry import DEFAULT_REGISTRY_PATH
+
+# Only what the thin client needs to read the config files. The client must stay fast to import,
+# the options, SSH and filesystem code are only imported when a command runs in this process.
+
+
+def parse_config(config_filepath: str) -> Dict[str, Any]:
+    return cast(Dict[str, Any], OmegaConf.to_container(OmegaConf.load(config_filepath)))
+
+
+def merge_dicts(*dicts: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Merges multiple dictionaries into one dictionary.
+
+    Args:
+    *dicts: An arbitrary number of dictionaries to merge.
+
+    Returns:
+    A single dictionary containing all keys and values from the input dictionaries.
+    If the same key appears in more than one dictionary, the value from the last
+    dictionary with that key is used.
+
+    Example usage:
+    >>> d1 = {'a': 1, 'b': 2}
+    >>> d2 = {'b': 3, 'c': 4}
+    >>> merge_dicts(d1, d2)
+    {'a': 1, 'b': 3, 'c': 4}
+    """
+    merged_dict: Dict[str, Any] = {}
+    for dictionary in dicts:
+        merged_dict.update(dictionary)
+    return merged_dict
+
+
+def expand_or_none(config_entry: Optional[str]) -> Optional[str]:
+    if not config_entry:
+        return None
+
+    return os.path.expandvars(config_entry)
+
+
+def job_registry_path(config: Dict[str, Any]) -> str:
+    """
+    Returns the path of the local job registry, an empty string if recording jobs is disabled.
+    """
+    return expand_or_none(config.get("job_registry", DEFAULT_REGISTRY_PATH)) or ""
+
+
+def host_address(config: Dict[str, Any]) -> str:
+    """
+    Returns the address the jobs of a host are recorded under in the job registry,
+    the same as `ConnectionData.address` of the host's connection.
+    """
+    hostname = expand_or_none(config["host"])
+    username = expand_or_none(config["user"])
+    return f"{username}@{hostname}:{int(config.get('port', 22))}"
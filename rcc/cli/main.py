@@ -1,41 +1,159 @@
 import typer
-from typing import Any
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 import signal
 import sys
+from rich.console import Console
+from rich.table import Table
+from rcc.core.job import JobRecord, open_registry
+from rcc.core.job.registry import DEFAULT_REGISTRY_PATH
 from rcc.core.ui import RichUI
-from rcc.cli.utils import (
-    create_application,
-    construct_launch_options,
-    ProductionServiceRegistry,
-    parse_config,
-    merge_dicts,
-)
+from rcc.cli.client import ServerClient
+from rcc.cli.config import host_address, job_registry_path, merge_dicts, parse_config
+from rcc.cli.protocol import default_socket_path, status_from_dict
 
 app = typer.Typer()
 
+_SOCKET_HELP = "The Unix domain socket of the rcc server"
+
 
 @app.command()
 def launch(
     job: str = typer.Option(..., help="Path to the config file"),
     host: str = typer.Option(..., help="Path to the host file"),
-):
+    socket: str = typer.Option(default_socket_path(), help=_SOCKET_HELP),
+) -> None:
     job_config = parse_config(job)
     host_config = parse_config(host)
     config = merge_dicts(job_config, host_config)
-    options = construct_launch_options(config, True)
-    service_registry = ProductionServiceRegistry()
-    # fs = service_registry.local_filesystem()
+    raise typer.Exit(_run("launch", config, socket))
+
+
+@app.command()
+def status(
+    jobid: str = typer.Option(..., help="The ID of the job"),
+    host: str = typer.Option(..., help="Path to the host file"),
+    socket: str = typer.Option(default_socket_path(), help=_SOCKET_HELP),
+) -> None:
+    config = parse_config(host)
+    record = _finished_job(config, jobid)
+    if record is not None and record.status is not None:
+        # Finished jobs do not change anymore, there is no need to ask the cluster
+        with RichUI() as ui:
+            ui.update(status_from_dict(record.status))
+        raise typer.Exit(0)
+
+    raise typer.Exit(_run("status", config, socket, jobid))
+
+
+@app.command()
+def cancel(
+    jobid: str = typer.Option(..., help="The ID of the job"),
+    host: str = typer.Option(..., help="Path to the host file"),
+    socket: str = typer.Option(default_socket_path(), help=_SOCKET_HELP),
+) -> None:
+    raise typer.Exit(_run("cancel", parse_config(host), socket, jobid))
+
+
+@app.command()
+def watch(
+    jobid: str = typer.Option(..., help="The ID of the job"),
+    host: str = typer.Option(..., help="Path to the host file"),
+    socket: str = typer.Option(default_socket_path(), help=_SOCKET_HELP),
+) -> None:
+    raise typer.Exit(_run("watch", parse_config(host), socket, jobid))
+
+
+@app.command("list")
+def list_jobs(
+    host: Optional[str] = typer.Option(
+        None, help="Path to a host file, only list jobs on this host"
+    ),
+    registry: Optional[str] = typer.Option(
+        None,
+        help="Path to the local job registry, by default the one the host file configures",
+    ),
+    limit: int = typer.Option(50, help="The maximum number of jobs"),
+) -> None:
+    config = parse_config(host) if host is not None else {}
+    address = host_address(config) if config else None
+    path = registry or job_registry_path(config) or DEFAULT_REGISTRY_PATH
+    _print_jobs(open_registry(path).jobs(address, limit))
+
 
+@app.command()
+def server(
+    socket: str = typer.Option(default_socket_path(), help=_SOCKET_HELP),
+    stop: bool = typer.Option(False, help="Stop the server listening on the socket"),
+) -> None:
+    if stop:
+        raise typer.Exit(ServerClient(socket).shutdown())
+
+    # Imported here, the other commands only need the client
+    from rcc.cli.server import Server
+
+    with Server(socket) as daemon:
+        typer.echo(f"Listening on {socket}")
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def _run(command: str, config: Dict[str, Any], socket: str, jobid: str = "") -> int:
+    # Commands run on the server if one is running, otherwise in this process
+    client = ServerClient(socket)
     with RichUI() as ui:
-        application = create_application(options, service_registry, ui)
+        if client.is_available():
+            return client.run(command, config, ui, jobid)
+
+        # Imported here, clients of a running server start without the SSH and workflow code
+        from rcc.cli.utils import (
+            ProductionServiceRegistry,
+            construct_options,
+            create_application,
+        )
+
+        options = construct_options(command, config, jobid)
+        application = create_application(options, ProductionServiceRegistry(), ui)
 
         def on_cancel(*args: Any, **kwargs: Any) -> None:
-            sys.exit(app.cancel())
+            sys.exit(application.cancel())
 
         signal.signal(signal.SIGINT, on_cancel)
         return application.run(options)
 
 
-@app.command()
-def server():
-    typer.echo("Server not implemented yet")
+def _finished_job(config: Dict[str, Any], jobid: str) -> Optional[JobRecord]:
+    path = job_registry_path(config)
+    if not path:
+        return None
+
+    address = host_address(config)
+    record = open_registry(path).get(address, jobid)
+    return record if record is not None and record.finished else None
+
+
+def _print_jobs(records: List[JobRecord]) -> None:
+    table = Table(style="bold")
+    for column in ("ID", "Host", "Name", "State", "Submitted", "Updated"):
+        table.add_column(column)
+
+    for record in records:
+        table.add_row(
+            record.jobid,
+            record.host,
+            record.name,
+            record.state,
+            _format_time(record.submitted_at),
+            _format_time(record.updated_at),
+        )
+
+    Console().print(table)
+
+
+def _format_time(timestamp: Optional[float]) -> str:
+    if timestamp is None:
+        return ""
+
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
@@ -0,0 +1,82 @@
+import dataclasses
+import json
+import os
+import tempfile
+from typing import Any, Dict, Iterator, Optional, Protocol, cast
+
+from rcc.cluster.slurm.job import SlurmJobStatus
+from rcc.core.job import BaseJobStatus
+
+# Messages are JSON objects, one per line. A client sends a request
+#   {"command": "launch" | "watch" | "status" | "cancel", "config": {...}, "jobid": "...", "cwd": "..."}
+# or {"command": "shutdown"}, and may follow it with {"cancel": true} to cancel the workflow.
+# The server answers with UI calls, {"ui": "info", "text": "..."} or {"ui": "update", "status": {...}},
+# and ends with {"exit": <exit code>}.
+Message = Dict[str, Any]
+
+UI_METHODS = ("error", "info", "success", "launch", "output")
+
+
+class MessageReader(Protocol):
+    """
+    The reading side of a connection, e.g. a socket's file
+    """
+
+    def readline(self) -> bytes:
+        ...
+
+
+class MessageWriter(Protocol):
+    """
+    The writing side of a connection, e.g. a socket's file
+    """
+
+    def write(self, data: bytes, /) -> Any:
+        ...
+
+    def flush(self) -> Any:
+        ...
+
+
+def default_socket_path() -> str:
+    """
+    Returns the path of the server's Unix domain socket, $RCC_SOCKET if it is set.
+    """
+    if "RCC_SOCKET" in os.environ:
+        return os.environ["RCC_SOCKET"]
+
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f"rcc-{os.getuid()}.sock")
+
+
+def write_message(stream: MessageWriter, message: Message) -> None:
+    stream.write(json.dumps(message).encode() + b"\n")
+    stream.flush()
+
+
+def read_message(stream: MessageReader) -> Optional[Message]:
+    """
+    Reads the next message, None once the other side closed the connection.
+    """
+    line = stream.readline()
+    if not line:
+        return None
+
+    return cast(Message, json.loads(line))
+
+
+def read_messages(stream: MessageReader) -> Iterator[Message]:
+    while True:
+        message = read_message(stream)
+        if message is None:
+            return
+
+        yield message
+
+
+def status_to_dict(status: BaseJobStatus) -> Dict[str, Any]:
+    return dataclasses.asdict(status)
+
+
+def status_from_dict(status: Dict[str, Any]) -> SlurmJobStatus:
+    return SlurmJobStatus.from_dict(status)
@@ -0,0 +1,306 @@
+import dataclasses
+import os
+import socket
+import socketserver
+import threading
+from typing import Callable, Dict, Optional
+
+from rcc.cli.protocol import (
+    Message,
+    MessageReader,
+    MessageWriter,
+    read_message,
+    status_to_dict,
+    write_message,
+)
+from rcc.cli.utils import construct_options
+from rcc.cluster.slurm.controller import SlurmController
+from rcc.core.application import make_controller
+from rcc.core.filesystem import PyFilesystemFactory
+from rcc.core.job import BaseJobStatus
+from rcc.core.ssh import ConnectionData, SSHExecutor
+from rcc.core.ssh.pool import PoolKey, pool_key
+from rcc.core.ui import UI
+from rcc.core.utils import (
+    FinalizeOptions,
+    ImmediateCommandOptions,
+    LaunchOptions,
+    Options,
+    StatusOptions,
+    WatchOptions,
+    get_error_message,
+)
+from rcc.core.workflow import Workflow, make_workflow
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    A long-lived daemon that runs the commands of the CLI on behalf of thin clients, see `ServerClient`.
+    It keeps one authenticated SSH connection per cluster and proxy chain open between commands,
+    together with the controllers and their status caches. All watched jobs share the process wide
+    StatusPoller. The socket is only accessible by the user who started the server.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str) -> None:
+        """
+        Args:
+            socket_path (str): The path of the Unix domain socket to listen on
+
+        Raises:
+            OSError: Another server is listening on the socket already
+        """
+        self._socket_path = socket_path
+        self._hosts: Dict[PoolKey, _Host] = {}
+        self._hosts_lock = threading.Lock()
+        _remove_stale_socket(socket_path)
+        super().__init__(socket_path, _RequestHandler)
+
+    def server_bind(self) -> None:
+        # Create the socket without permissions for anybody else, it runs commands as this user
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+
+    def server_close(self) -> None:
+        super().server_close()
+        with self._hosts_lock:
+            hosts, self._hosts = self._hosts, {}
+
+        for host in hosts.values():
+            host.close()
+
+        if os.path.exists(self._socket_path):
+            os.remove(self._socket_path)
+
+    def run(
+        self, request: Message, ui: "_ForwardingUI", requests: MessageReader
+    ) -> int:
+        """
+        Runs the workflow of a command and reports to the client through the UI.
+
+        Args:
+            request (Message): The command and its config
+            ui (UI): Forwards every UI call to the client
+            requests (MessageReader): The rest of the client's messages, which may cancel the workflow
+
+        Returns:
+            int: The exit code of the command
+        """
+        try:
+            options = _resolve_local_paths(
+                construct_options(
+                    request["command"], request["config"], request.get("jobid", "")
+                ),
+                request.get("cwd"),
+            )
+            controller = self._host(options).controller(options)
+            fs_factory = PyFilesystemFactory(options, workdir=request.get("cwd"))
+            workflow = make_workflow(fs_factory, controller, options)
+        except Exception as err:
+            ui.error(get_error_message(err))
+            return 1
+
+        threading.Thread(
+            target=_cancel_on_request, args=(requests, workflow, ui), daemon=True
+        ).start()
+        try:
+            return 0 if workflow.run(ui) else 1
+        except Exception as err:
+            ui.error(get_error_message(err))
+            return 1
+
+    def _host(self, options: Options) -> "_Host":
+        key = pool_key(options.connection, options.proxyjumps)
+        with self._hosts_lock:
+            if key not in self._hosts:
+                self._hosts[key] = _Host(
+                    SSHExecutor(options.connection, options.proxyjumps)
+                )
+
+            return self._hosts[key]
+
+
+class _Host:
+    """
+    The connection to one cluster that stays open between commands, and the controllers using it
+    """
+
+    def __init__(self, executor: SSHExecutor) -> None:
+        self._executor = executor
+        self._controllers: Dict[StatusOptions, SlurmController] = {}
+        self._lock = threading.Lock()
+
+    def controller(self, options: Options) -> SlurmController:
+        with self._lock:
+            self._reconnect_if_inactive()
+            # Commands querying statuses the same way share a controller and its caches
+            if options.status not in self._controllers:
+                self._controllers[options.status] = make_controller(
+                    self._executor, options
+                )
+
+            return self._controllers[options.status]
+
+    def close(self) -> None:
+        with self._lock:
+            self._executor.close()
+
+    def _reconnect_if_inactive(self) -> None:
+        if self._executor.is_connected:
+            transport = self._executor.client.get_transport()
+            if transport is not None and transport.is_active():
+                return
+
+            self._executor.close()
+
+        # The pool replaces connections that dropped
+        self._executor.connect()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    server: Server
+
+    def handle(self) -> None:
+        request = read_message(self.rfile)
+        if request is None:
+            return
+
+        ui = _ForwardingUI(self.wfile)
+        if request.get("command") == "shutdown":
+            ui.exit(0)
+            # shutdown() waits for serve_forever to return, which cannot happen in a request thread
+            threading.Thread(target=self.server.shutdown).start()
+            return
+
+        ui.exit(self.server.run(request, ui, self.rfile))
+
+
+class _ForwardingUI(UI):
+    """
+    Sends every UI call to the client. Once the client is gone the workflow continues without a UI.
+    """
+
+    def __init__(self, stream: MessageWriter) -> None:
+        self._stream = stream
+        self._lock = threading.Lock()
+        self._exited = False
+
+    def update(self, job: BaseJobStatus) -> None:
+        self._send({"ui": "update", "status": status_to_dict(job)})
+
+    def error(self, text: str) -> None:
+        self._send({"ui": "error", "text": text})
+
+    def info(self, text: str) -> None:
+        self._send({"ui": "info", "text": text})
+
+    def success(self, text: str) -> None:
+        self._send({"ui": "success", "text": text})
+
+    def launch(self, text: str) -> None:
+        self._send({"ui": "launch", "text": text})
+
+    def output(self, line: str) -> None:
+        self._send({"ui": "output", "text": line})
+
+    def exit(self, code: int) -> None:
+        """
+        Sends the exit code of the command. The client stops listening, so only the first one arrives.
+        """
+        self._send({"exit": code})
+        with self._lock:
+            self._exited = True
+
+    def _send(self, message: Message) -> None:
+        with self._lock:
+            if self._exited:
+                return
+
+            try:
+                write_message(self._stream, message)
+            except OSError:
+                self._exited = True
+
+
+def _cancel_on_request(
+    requests: MessageReader, workflow: Workflow, ui: _ForwardingUI
+) -> None:
+    try:
+        message = read_message(requests)
+    except (OSError, ValueError):
+        return
+
+    if message is None or not message.get("cancel"):
+        return
+
+    try:
+        workflow.cancel(ui)
+    except Exception as err:
+        ui.error(get_error_message(err))
+    ui.exit(130)
+
+
+def _resolve_local_paths(options: Options, cwd: Optional[str]) -> Options:
+    # Paths on the client's machine are relative to the client's working directory, not the server's.
+    # Copied and collected files are resolved by the local filesystem, which is rooted at it.
+    if not cwd:
+        return options
+
+    def resolve(path: str) -> str:
+        return os.path.join(cwd, os.path.expanduser(path)) if path else path
+
+    options = dataclasses.replace(
+        options,
+        connection=_resolve_keyfile(options.connection, resolve),
+        proxyjumps=[_resolve_keyfile(proxy, resolve) for proxy in options.proxyjumps],
+    )
+    if (
+        isinstance(options, (LaunchOptions, FinalizeOptions))
+        and options.transfer.journal_file
+    ):
+        transfer = dataclasses.replace(
+            options.transfer, journal_file=resolve(options.transfer.journal_file)
+        )
+        options = dataclasses.replace(options, transfer=transfer)
+    if isinstance(options, (LaunchOptions, WatchOptions)):
+        options = dataclasses.replace(options, output_log=resolve(options.output_log))
+    if isinstance(options, LaunchOptions):
+        options = dataclasses.replace(options, job_id_file=resolve(options.job_id_file))
+    if isinstance(options, (LaunchOptions, WatchOptions, ImmediateCommandOptions)):
+        options = dataclasses.replace(
+            options, job_registry=resolve(options.job_registry)
+        )
+    status = dataclasses.replace(
+        options.status, cache_dir=resolve(options.status.cache_dir)
+    )
+    options = dataclasses.replace(options, status=status)
+
+    return options
+
+
+def _resolve_keyfile(
+    connection: ConnectionData, resolve: Callable[[str], str]
+) -> ConnectionData:
+    if not connection.keyfile:
+        return connection
+
+    return dataclasses.replace(connection, keyfile=resolve(connection.keyfile))
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    if not os.path.exists(socket_path):
+        return
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            # Left behind by a server that did not shut down cleanly
+            os.remove(socket_path)
+            return
+
+    raise OSError(f"A server is already listening on {socket_path}")
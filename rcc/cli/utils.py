@@ -5,14 +5,22 @@ from rcc.core.filesystem import (
     FilesystemFactory,
     PyFilesystemFactory,
     CopyInstruction,
+    SyncMode,
+)
+from rcc.core.utils import (
+    Options,
+    LaunchOptions,
+    ImmediateCommandOptions,
+    WatchOptions,
+    TransferOptions,
+    StatusOptions,
 )
-from rcc.core.utils import Options, LaunchOptions
 from rcc.core.executor import CommandExecutor
 from rcc.core.ssh import SSHExecutor, ConnectionData
 from rcc.core.ui import UI
 from rcc.core.application import Application
+from rcc.cli.config import expand_or_none, job_registry_path
 from typing import Any, Dict, List, Union, cast, Optional, Protocol, Tuple
-from omegaconf import OmegaConf
 
 
 class ServiceRegistry(Protocol):
@@ -66,13 +74,6 @@ def proxyjumps(proxyjumps: List[Dict[str, str]]) -> List[ConnectionData]:
     return [connection_data_from_dict(proxy) for proxy in proxyjumps]
 
 
-def expand_or_none(config_entry: Optional[str]) -> Optional[str]:
-    if not config_entry:
-        return None
-
-    return os.path.expandvars(config_entry)
-
-
 def copy_instructions(copy_list: List[Dict[str, str]]) -> List[CopyInstruction]:
     return [copy_instruction_from_dict(cp) for cp in copy_list]
 
@@ -83,6 +84,7 @@ def connection_data_from_dict(config: Dict[str, str]) -> ConnectionData:
         username=cast(str, expand_or_none(config["user"])),
         keyfile=expand_or_none(config.get("private_keyfile")),
         password=expand_or_none(str(config.get("password"))),
+        port=int(config.get("port", 22)),
     )
 
 
@@ -93,6 +95,45 @@ def copy_instruction_from_dict(
         os.path.expandvars(cp["from"]),
         os.path.expandvars(cp[dest_keyname]),
         bool(cp.get("overwrite", False)),
+        sync_mode(cp.get("sync", False)),
+    )
+
+
+def sync_mode(config_entry: Union[bool, str]) -> SyncMode:
+    if isinstance(config_entry, bool):
+        return SyncMode.metadata if config_entry else SyncMode.off
+
+    try:
+        return SyncMode[config_entry]
+    except KeyError:
+        modes = ", ".join(mode.name for mode in SyncMode)
+        raise ValueError(f"Unknown sync mode {config_entry}, expected one of {modes}")
+
+
+def transfer_options_from_dict(config: Dict[str, Any]) -> TransferOptions:
+    defaults = TransferOptions()
+    return TransferOptions(
+        workers=int(config.get("workers", defaults.workers)),
+        bundle_threshold=config.get("bundle_threshold", defaults.bundle_threshold),
+        chunk_size=int(config.get("chunk_size", defaults.chunk_size)),
+        window_size=config.get("window_size", defaults.window_size),
+        prefetch_requests=int(
+            config.get("prefetch_requests", defaults.prefetch_requests)
+        ),
+        journal_file=config.get("journal_file", defaults.journal_file),
+        checkpoint_interval=int(
+            config.get("checkpoint_interval", defaults.checkpoint_interval)
+        ),
+    )
+
+
+def status_options_from_dict(config: Dict[str, Any]) -> StatusOptions:
+    defaults = StatusOptions()
+    return StatusOptions(
+        backend=config.get("status_backend", defaults.backend),
+        push_updates=config.get("push_updates", defaults.push_updates),
+        cache_ttl=float(config.get("status_cache_ttl", defaults.cache_ttl)),
+        cache_dir=expand_or_none(config.get("status_cache_dir")) or defaults.cache_dir,
     )
 
 
@@ -120,7 +161,7 @@ def parse_sbatch(config: Dict[str, Any]) -> Tuple[str, Optional[CopyInstruction]
     return script, copy
 
 
-def construct_launch_options(config: Dict, watch: bool) -> Options:
+def construct_launch_options(config: Dict[str, Any], watch: bool) -> Options:
     sbatch, sbatch_copy_instruction = parse_sbatch(config)
     files_to_copy = copy_instructions(config.get("copy", []))
     if sbatch_copy_instruction:
@@ -131,35 +172,65 @@ def construct_launch_options(config: Dict, watch: bool) -> Options:
         copy_files=files_to_copy,
         clean_files=clean_instructions(config.get("clean", [])),
         collect_files=copy_instructions(config.get("collect", [])),
+        transfer=transfer_options_from_dict(config.get("transfer", {})),
         continue_if_job_fails=config.get("continue_if_job_fails", False),
-        job_id_file="test",
+        hold_during_upload=config.get("hold_during_upload", False),
+        follow_output=config.get("follow_output", False),
+        output_log=expand_or_none(config.get("output_log")) or "",
+        status=status_options_from_dict(config),
+        job_id_file=expand_or_none(config.get("job_id_file")) or "",
+        job_registry=job_registry_path(config),
         **connection_dict(config),  # type: ignore
     )
 
 
-def parse_config(config_filepath: str) -> Dict:
-    return OmegaConf.to_container(OmegaConf.load(config_filepath))
+def construct_immediate_options(
+    config: Dict[str, Any], jobid: str, action: ImmediateCommandOptions.Action
+) -> ImmediateCommandOptions:
+    return ImmediateCommandOptions(
+        jobid=jobid,
+        action=action,
+        status=status_options_from_dict(config),
+        job_registry=job_registry_path(config),
+        **connection_dict(config),  # type: ignore
+    )
+
 
+def construct_watch_options(config: Dict[str, Any], jobid: str) -> WatchOptions:
+    return WatchOptions(
+        jobid=jobid,
+        poll_interval=int(config.get("poll_interval", 5)),
+        follow_output=config.get("follow_output", False),
+        output_log=expand_or_none(config.get("output_log")) or "",
+        status=status_options_from_dict(config),
+        job_registry=job_registry_path(config),
+        **connection_dict(config),  # type: ignore
+    )
 
-def merge_dicts(*dicts):
+
+def construct_options(command: str, config: Dict[str, Any], jobid: str = "") -> Options:
     """
-    Merges multiple dictionaries into one dictionary.
+    Constructs the options for one of the CLI commands.
 
     Args:
-    *dicts: An arbitrary number of dictionaries to merge.
+        command (str): One of "launch", "watch", "status" and "cancel"
+        config (dict): The merged job and host config, only the host config for commands on existing jobs
+        jobid (str): The job the command is about, unused for "launch"
 
     Returns:
-    A single dictionary containing all keys and values from the input dictionaries.
-    If the same key appears in more than one dictionary, the value from the last
-    dictionary with that key is used.
-
-    Example usage:
-    >>> d1 = {'a': 1, 'b': 2}
-    >>> d2 = {'b': 3, 'c': 4}
-    >>> merge_dicts(d1, d2)
-    {'a': 1, 'b': 3, 'c': 4}
+        Options
+
+    Raises:
+        ValueError: The command is unknown
     """
-    merged_dict = {}
-    for dictionary in dicts:
-        merged_dict.update(dictionary)
-    return merged_dict
+    if command == "launch":
+        return construct_launch_options(config, True)
+    if command == "watch":
+        return construct_watch_options(config, jobid)
+
+    try:
+        action = ImmediateCommandOptions.Action[command]
+    except KeyError:
+        raise ValueError(f"Unknown command {command}")
+
+    return construct_immediate_options(config, jobid, action)
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Optional
-from rcc.core.executor import CommandExecutor
+from typing import List, Mapping, Optional
+from rcc.core.executor import CommandExecutor, RunningCommand
 from rcc.core.job.job_watcher import JobWatcherFactory, JobWatcherImpl
 from rcc.core.job.batch_job import BaseBatchJob
 from rcc.core.job import BaseJobStatus
@@ -16,10 +16,84 @@ class Controller(ABC):
         self._watcher_factory = watcher_factory or JobWatcherImpl
 
     @abstractmethod
-    def submit(self, jobfile: str) -> "BaseBatchJob": ...
+    def submit(self, jobfile: str, hold: bool = False) -> "BaseBatchJob":
+        """
+        Submits a batch job.
+
+        Args:
+            jobfile (str): The path of the batch script on the cluster
+            hold (bool): Whether the job is kept from starting until it is released
+
+        Returns:
+            BaseBatchJob: The submitted job
+        """
+        ...
+
+    @abstractmethod
+    def batch_job(self, jobid: str) -> "BaseBatchJob":
+        """
+        Returns a handle for a job that was submitted before, e.g. by an earlier call of rcc.
+
+        Args:
+            jobid (str): The ID of the job
+
+        Returns:
+            BaseBatchJob
+        """
+        ...
 
     @abstractmethod
     def poll_status(self, jobid: str) -> "BaseJobStatus": ...
 
+    def poll_statuses(self, jobids: List[str]) -> Mapping[str, "BaseJobStatus"]:
+        """
+        Polls the status of several jobs. Controllers should override this
+        if the cluster can answer for many jobs with a single query.
+
+        Args:
+            jobids (list[str]): The IDs of the jobs to poll
+
+        Returns:
+            Mapping[str, BaseJobStatus]: The status of every job, keyed by job ID
+        """
+        return {jobid: self.poll_status(jobid) for jobid in jobids}
+
+    def stream_state_changes(self, jobid: str) -> RunningCommand:
+        """
+        Starts a long-lived command on the cluster that prints a line whenever the state of the job
+        changes, and an empty line as a heartbeat in between. The command exits once the job finished.
+        Controllers that cannot do this raise NotImplementedError, their jobs are polled instead.
+
+        Args:
+            jobid (str): The ID of the job to watch
+
+        Returns:
+            RunningCommand: The running command, its output can be read with `lines()`
+        """
+        raise NotImplementedError()
+
+    def stream_output(self, jobid: str) -> RunningCommand:
+        """
+        Starts a command on the cluster that prints the output of the job as it is written,
+        beginning with what was written so far. The command exits shortly after the job finished.
+
+        Args:
+            jobid (str): The ID of the job
+
+        Returns:
+            RunningCommand: The running command, its output can be read with `lines()`
+        """
+        raise NotImplementedError()
+
     @abstractmethod
     def cancel(self, jobid: str) -> None: ...
+
+    @abstractmethod
+    def release(self, jobid: str) -> None:
+        """
+        Allows a job that was submitted on hold to start.
+
+        Args:
+            jobid (str): The ID of the held job
+        """
+        ...
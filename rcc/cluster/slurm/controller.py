@@ -1,10 +1,12 @@
-from typing import Optional
+import shlex
+from typing import Dict, List, Optional, Union
 from rcc.core.executor import CommandExecutor, RunningCommand
 from rcc.core.job import JobWatcherFactory, JobWatcherImpl
 from rcc.core.utils import ClusterError
 from rcc.cluster._base import Controller
 
 from .job import SlurmJobStatus, SlurmBatchJob
+from .status import StatusBackend, make_status_backend
 
 
 class SlurmController(Controller):
@@ -12,25 +14,60 @@ class SlurmController(Controller):
         self,
         executor: CommandExecutor,
         watcher_factory: Optional[JobWatcherFactory] = None,
+        status_backend: Union[str, StatusBackend] = "sacct",
     ) -> None:
+        """
+        Args:
+            executor (CommandExecutor): Runs the Slurm commands on the cluster
+            watcher_factory (JobWatcherFactory): Creates the watchers of submitted jobs
+            status_backend (str | StatusBackend): How job statuses are queried, a backend or one of the names
+                in STATUS_BACKENDS
+
+        Raises:
+            ValueError: The status backend is unknown
+        """
         self._executor = executor
         self._watcher_factory = watcher_factory or JobWatcherImpl
+        self._status_backend = (
+            make_status_backend(status_backend, executor)
+            if isinstance(status_backend, str)
+            else status_backend
+        )
 
-    def submit(self, jobfile: str) -> SlurmBatchJob:
-        cmd = self._execute_and_wait_or_raise_on_error(f"sbatch {jobfile}")
+    def submit(self, jobfile: str, hold: bool = False) -> SlurmBatchJob:
+        sbatch = "sbatch --hold" if hold else "sbatch"
+        cmd = self._execute_and_wait_or_raise_on_error(f"{sbatch} {jobfile}")
         jobid = _parse_jobid(cmd)
 
+        return self.batch_job(jobid)
+
+    def batch_job(self, jobid: str) -> SlurmBatchJob:
         return SlurmBatchJob(self, jobid, self._watcher_factory)
 
     def poll_status(self, jobid: str) -> SlurmJobStatus:
-        cmd = self._execute_and_wait_or_raise_on_error(
-            f"sacct -j {jobid} -o jobid,jobname%30,state --noheader"
+        return self.poll_statuses([jobid])[jobid]
+
+    def poll_statuses(self, jobids: List[str]) -> Dict[str, SlurmJobStatus]:
+        return self._status_backend.poll_statuses(jobids)
+
+    def stream_state_changes(self, jobid: str) -> RunningCommand:
+        # squeue asks the controller daemon instead of the accounting database, which makes
+        # polling it every second cheap. The script exits once the job is no longer active.
+        script = _STATE_STREAM_SCRIPT.format(
+            jobid=shlex.quote(jobid), interval=_STATE_STREAM_INTERVAL
         )
-        return SlurmJobStatus.from_output(cmd.stdout())
+        return self._executor.exec_command(f"bash -c {shlex.quote(script)}")
+
+    def stream_output(self, jobid: str) -> RunningCommand:
+        script = _OUTPUT_STREAM_SCRIPT.format(jobid=shlex.quote(jobid))
+        return self._executor.exec_command(f"bash -c {shlex.quote(script)}")
 
     def cancel(self, jobid: str) -> None:
         self._execute_and_wait_or_raise_on_error(f"scancel {jobid}")
 
+    def release(self, jobid: str) -> None:
+        self._execute_and_wait_or_raise_on_error(f"scontrol release {jobid}")
+
     def _execute_and_wait_or_raise_on_error(self, command: str) -> RunningCommand:
         cmd = self._executor.exec_command(command)
         exit_code = cmd.wait_until_exit()
@@ -40,6 +77,37 @@ class SlurmController(Controller):
         return cmd
 
 
+_STATE_STREAM_INTERVAL = 0.5
+
+_STATE_STREAM_SCRIPT = """
+last=
+while :; do
+    state=$(squeue --noheader --jobs {jobid} --format %T 2>/dev/null | sort -u | tr '\\n' ' ')
+    if [ "$state" != "$last" ]; then echo "$state"; last=$state; else echo; fi
+    case " $state " in
+        *" PENDING "*|*" CONFIGURING "*|*" RUNNING "*|*" COMPLETING "*|*" SUSPENDED "*|*" REQUEUED "*)
+            sleep {interval} ;;
+        *) break ;;
+    esac
+done
+"""
+
+
+# tail follows the output files until the job left the queue. If rcc stops reading,
+# tail is ended by the next line it cannot write, or when the job finished.
+_OUTPUT_STREAM_SCRIPT = """
+mapfile -t paths < <(scontrol show job {jobid} | sed -n 's/^ *Std\\(Out\\|Err\\)=//p' | sort -u)
+[ ${{#paths[@]}} -gt 0 ] || exit 1
+tail --lines=+1 --quiet --follow=name --retry --sleep-interval=0.5 -- "${{paths[@]}}" 2>/dev/null &
+tail_pid=$!
+while [ -n "$(squeue --noheader --jobs {jobid} --states=PD,CF,R,CG,S --format %T 2>/dev/null)" ]; do
+    sleep 2
+done
+sleep 1
+kill $tail_pid
+"""
+
+
 def _parse_jobid(cmd: RunningCommand) -> str:
     first_line = cmd.stdout()[0]
     split_line = first_line.split()
@@ -1,7 +1,9 @@
+import re
 from dataclasses import dataclass
-from typing import List, Optional, TYPE_CHECKING
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
 from rcc.core.job import (
     BaseJobStatus,
+    TaskRange,
     TaskStatus,
     JobWatcherFactory,
     JobWatcherImpl,
@@ -20,13 +22,68 @@ class SlurmJobStatus(BaseJobStatus):
         return SlurmJobStatus("", "", "", [])
 
     @classmethod
-    def from_output(cls, output: List[str]) -> "SlurmJobStatus":
-        tasks = [TaskStatus(*line.split()[:3]) for line in output if line]
+    def from_dict(cls, status: Dict[str, Any]) -> "SlurmJobStatus":
+        """
+        Restores a status from the dictionary `dataclasses.asdict` returns for it,
+        after it was serialized, e.g. to JSON.
+        """
+        return SlurmJobStatus(
+            id=status["id"],
+            name=status["name"],
+            state=status["state"],
+            tasks=[TaskStatus(**task) for task in status["tasks"]],
+            time_limit_end=status.get("time_limit_end"),
+            array_tasks=[
+                TaskRange(*task_range) for task_range in status["array_tasks"]
+            ],
+        )
 
-        main_task = tasks[0] if tasks else TaskStatus("", "", "")
+    @classmethod
+    def from_output(cls, output: List[str]) -> "SlurmJobStatus":
+        """
+        Parses the `--parsable2` output of sacct for the fields in SACCT_FIELDS.
+        Steps of array tasks are left out, array tasks are merged into TaskRanges.
+        """
+        tasks: List[TaskStatus] = []
+        ranges = _TaskRangeBuilder()
+        first_fields: Optional[List[str]] = None
+        for line in output:
+            fields = line.rstrip("\n").split("|")
+            if len(fields) < 3:
+                continue
+
+            first_fields = first_fields or fields
+            task_id, name, state = fields[0], fields[1], _base_state(fields[2])
+            array_task = _ARRAY_TASK.match(task_id)
+            if array_task is None:
+                tasks.append(TaskStatus(task_id, name, state))
+            elif array_task.group("step") is not None:
+                continue
+            elif array_task.group("index") is not None:
+                index = int(array_task.group("index"))
+                ranges.add(index, index, state)
+            elif array_task.group("indices") is not None:
+                for first, last in _parse_indices(array_task.group("indices")):
+                    ranges.add(first, last, state)
+
+        if first_fields is None:
+            return SlurmJobStatus.empty()
+
+        array_tasks = ranges.build()
+        if tasks:
+            main_task = tasks[0]
+            jobid, state = main_task.id, main_task.state
+        else:
+            jobid = first_fields[0].split("_")[0]
+            state = _array_state(array_tasks)
 
         return SlurmJobStatus(
-            id=main_task.id, name=main_task.name, state=main_task.state, tasks=tasks
+            id=jobid,
+            name=first_fields[1],
+            state=state,
+            tasks=tasks,
+            time_limit_end=_time_limit_end(first_fields) if tasks else None,
+            array_tasks=array_tasks,
         )
 
     id: str
@@ -48,8 +105,10 @@ class SlurmJobStatus(BaseJobStatus):
 
     @property
     def success(self) -> bool:
-        return self.state == "COMPLETED" and all(
-            task.state == "COMPLETED" for task in self.tasks
+        return (
+            self.state == "COMPLETED"
+            and all(task.state == "COMPLETED" for task in self.tasks)
+            and all(task_range.state == "COMPLETED" for task_range in self.array_tasks)
         )
 
 
@@ -67,8 +126,90 @@ class SlurmBatchJob(BaseBatchJob):
     def cancel(self) -> None:
         self._controller.cancel(self.jobid)
 
+    def release(self) -> None:
+        self._controller.release(self.jobid)
+
     def poll_status(self) -> SlurmJobStatus:
         return self._controller.poll_status(self.jobid)
 
     def get_watcher(self) -> JobWatcher:
         return self._watcher_factory(self)
+
+
+# The fields requested from sacct, in the order from_output expects them. They do not change
+# while a job stays in the same state, with times requested as seconds since the epoch.
+SACCT_FIELDS = "jobid,jobname,state,start,timelimitraw"
+
+# Array tasks are listed as 123_4, pending ones are collapsed into 123_[5-9,12%4]
+_ARRAY_TASK = re.compile(
+    r"^\d+_(?:(?P<index>\d+)|\[(?P<indices>[^\]]*)\])(?P<step>\..*)?$"
+)
+
+_ACTIVE_STATES = ("RUNNING", "PENDING")
+
+
+class _TaskRangeBuilder:
+    """
+    Merges array tasks into ranges of consecutive tasks with the same state
+    """
+
+    def __init__(self) -> None:
+        self._ranges: List[TaskRange] = []
+        self._sorted = True
+
+    def add(self, first: int, last: int, state: str) -> None:
+        if self._ranges:
+            previous = self._ranges[-1]
+            if previous.state == state and previous.last + 1 == first:
+                self._ranges[-1] = TaskRange(previous.first, last, state)
+                return
+
+            self._sorted = self._sorted and previous.last < first
+
+        self._ranges.append(TaskRange(first, last, state))
+
+    def build(self) -> List[TaskRange]:
+        if self._sorted:
+            return self._ranges
+
+        merged = _TaskRangeBuilder()
+        for task_range in sorted(self._ranges):
+            merged.add(*task_range)
+
+        return merged._ranges
+
+
+def _parse_indices(indices: str) -> List[Tuple[int, int]]:
+    # A trailing %4 limits the number of tasks running at once
+    parsed = []
+    for part in indices.split("%")[0].split(","):
+        if not part:
+            continue
+
+        first, _, last = part.partition("-")
+        parsed.append((int(first), int(last or first)))
+
+    return parsed
+
+
+def _base_state(state: str) -> str:
+    # Cancelled jobs are reported as "CANCELLED by <uid>"
+    return state.split(" ", 1)[0]
+
+
+def _array_state(array_tasks: List[TaskRange]) -> str:
+    for state in _ACTIVE_STATES:
+        if any(task_range.state == state for task_range in array_tasks):
+            return state
+
+    failed = [task.state for task in array_tasks if task.state != "COMPLETED"]
+    return failed[0] if failed else "COMPLETED"
+
+
+def _time_limit_end(fields: List[str]) -> Optional[float]:
+    # The start time in seconds since the epoch and the time limit in minutes,
+    # which are not numbers for pending jobs and jobs without a limit
+    if len(fields) < 5 or not (fields[3].isdigit() and fields[4].isdigit()):
+        return None
+
+    return int(fields[3]) + int(fields[4]) * 60
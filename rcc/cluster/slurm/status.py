@@ -0,0 +1,344 @@
+import dataclasses
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, cast
+
+from rcc.core.executor import CommandExecutor
+from rcc.core.utils import ClusterError
+
+from .job import SACCT_FIELDS, SlurmJobStatus
+
+try:
+    from typing import Protocol
+except ImportError:  # pragma: no cover
+    from typing_extensions import Protocol  # type: ignore
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+DEFAULT_STATUS_CACHE_DIR = os.path.join("~", ".cache", "rcc", "status")
+
+
+class StatusBackend(Protocol):
+    def poll_statuses(self, jobids: List[str]) -> Dict[str, SlurmJobStatus]:
+        """
+        Queries the status of several jobs.
+
+        Args:
+            jobids (list[str]): The IDs of the jobs
+
+        Returns:
+            dict[str, SlurmJobStatus]: The status of every job, keyed by job ID
+        """
+        ...
+
+
+class SacctBackend:
+    """
+    Queries job statuses from the accounting database with sacct, which knows every job
+    including its steps, but puts load on slurmdbd.
+    """
+
+    def __init__(self, executor: CommandExecutor) -> None:
+        self._executor = executor
+        self._cache = _StatusCache()
+
+    def poll_statuses(self, jobids: List[str]) -> Dict[str, SlurmJobStatus]:
+        command = (
+            f"SLURM_TIME_FORMAT=%s sacct -j {','.join(jobids)} -o {SACCT_FIELDS}"
+            " --parsable2 --noheader"
+        )
+        cmd = self._executor.exec_command(command)
+        if cmd.wait_until_exit() != 0:
+            raise ClusterError(command)
+
+        return self._cache.statuses(jobids, cmd.stdout())
+
+
+class SqueueBackend:
+    """
+    Queries pending and running jobs with squeue, which is answered from the memory of the
+    Slurm controller. Jobs that squeue does not report as pending or running, e.g. because
+    they left the queue, are queried once more with sacct for their final status.
+    squeue does not list steps, and finished tasks of an array job only show up in the final status.
+    """
+
+    def __init__(self, executor: CommandExecutor) -> None:
+        self._executor = executor
+        self._cache = _StatusCache()
+        self._sacct = SacctBackend(executor)
+
+    def poll_statuses(self, jobids: List[str]) -> Dict[str, SlurmJobStatus]:
+        # squeue fails for IDs it does not know anymore, those jobs are left to sacct
+        cmd = self._executor.exec_command(
+            f"SLURM_TIME_FORMAT=%s squeue --noheader --jobs {','.join(jobids)}"
+            f" --format '{_SQUEUE_FORMAT}'"
+        )
+        output = cmd.stdout() if cmd.wait_until_exit() == 0 else []
+        statuses = self._cache.statuses(
+            jobids, [_as_sacct_line(line) for line in output]
+        )
+
+        left_queue = [
+            jobid
+            for jobid, status in statuses.items()
+            if not (status.is_running or status.is_pending)
+        ]
+        if left_queue:
+            statuses.update(self._sacct.poll_statuses(left_queue))
+
+        return statuses
+
+
+class SharedStatusCache:
+    """
+    Shares the statuses a backend polls with the other processes on this machine, through one file
+    per job in a cache directory. A status is reused until it is older than the TTL, the status of a
+    finished job for as long as the file exists. Only one process at a time refreshes the statuses of
+    a cluster, the others wait for it and read what it wrote, so the cluster is queried at most once
+    per TTL for a job, no matter how many processes poll it. Without fcntl, e.g. on Windows, statuses
+    are still shared, but processes may refresh them at the same time.
+    Implements the StatusBackend protocol.
+    """
+
+    def __init__(
+        self,
+        backend: StatusBackend,
+        cluster: str,
+        ttl: float,
+        directory: str = DEFAULT_STATUS_CACHE_DIR,
+    ) -> None:
+        """
+        Args:
+            backend (StatusBackend): Polls the statuses that are not cached
+            cluster (str): Identifies the cluster, e.g. as user@host:port
+            ttl (float): The time in seconds a status of a job that did not finish is reused
+            directory (str): The cache directory, created if it does not exist
+        """
+        self._backend = backend
+        self._ttl = ttl
+        self._directory = os.path.join(
+            os.path.expanduser(directory),
+            hashlib.blake2b(cluster.encode(), digest_size=8).hexdigest(),
+        )
+        os.makedirs(self._directory, exist_ok=True)
+        self._pruned_at = 0.0
+
+    def poll_statuses(self, jobids: List[str]) -> Dict[str, SlurmJobStatus]:
+        statuses = self._read_fresh(jobids)
+        stale = [jobid for jobid in jobids if jobid not in statuses]
+        if not stale:
+            return statuses
+
+        with _locked(os.path.join(self._directory, ".lock")):
+            # Another process may have refreshed them while this one waited for the lock
+            refreshed = self._read_fresh(stale)
+            statuses.update(refreshed)
+            stale = [jobid for jobid in stale if jobid not in refreshed]
+            if stale:
+                polled = self._backend.poll_statuses(stale)
+                for jobid, status in polled.items():
+                    self._write(jobid, status)
+                statuses.update(polled)
+
+            self._prune()
+
+        return statuses
+
+    def _read_fresh(self, jobids: List[str]) -> Dict[str, SlurmJobStatus]:
+        fresh = {}
+        now = time.time()
+        for jobid in jobids:
+            entry = self._read(jobid)
+            if entry is None:
+                continue
+
+            status = SlurmJobStatus.from_dict(entry["status"])
+            if status.is_finished or now - entry["polled_at"] < self._ttl:
+                fresh[jobid] = status
+
+        return fresh
+
+    def _read(self, jobid: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._entry(jobid)) as entry:
+                return cast(Dict[str, Any], json.load(entry))
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, jobid: str, status: SlurmJobStatus) -> None:
+        entry = {"polled_at": time.time(), "status": dataclasses.asdict(status)}
+        # Readers do not take the lock, they must never see a partially written file
+        descriptor, temporary = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w") as file:
+                json.dump(entry, file)
+            os.replace(temporary, self._entry(jobid))
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    def _entry(self, jobid: str) -> str:
+        return os.path.join(self._directory, re.sub(r"[^\w.-]", "_", jobid) + ".json")
+
+    def _prune(self) -> None:
+        # Entries of finished jobs are never rewritten, remove them once they are old
+        now = time.time()
+        if now - self._pruned_at < _PRUNE_INTERVAL:
+            return
+
+        self._pruned_at = now
+        with os.scandir(self._directory) as entries:
+            for entry in entries:
+                # The lock file must stay, other processes may hold it
+                if not entry.name.endswith((".json", ".tmp")):
+                    continue
+
+                try:
+                    if now - entry.stat().st_mtime > _PRUNE_AGE:
+                        os.remove(entry.path)
+                except OSError:
+                    pass
+
+
+StatusBackendFactory = Callable[[CommandExecutor], StatusBackend]
+
+STATUS_BACKENDS: Dict[str, StatusBackendFactory] = {
+    "sacct": SacctBackend,
+    "squeue": SqueueBackend,
+}
+
+
+def make_status_backend(name: str, executor: CommandExecutor) -> StatusBackend:
+    try:
+        backend = STATUS_BACKENDS[name]
+    except KeyError:
+        backends = ", ".join(STATUS_BACKENDS)
+        raise ValueError(f"Unknown status backend {name}, expected one of {backends}")
+
+    return backend(executor)
+
+
+# How often each process removes cache entries that were written more than _PRUNE_AGE seconds ago
+_PRUNE_INTERVAL = 60 * 60
+_PRUNE_AGE = 24 * 60 * 60
+
+
+@contextmanager
+def _locked(path: str) -> Iterator[None]:
+    with open(path, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# The squeue counterparts of SACCT_FIELDS: job ID, name, state, start time and time limit
+_SQUEUE_FORMAT = "%i|%j|%T|%S|%l"
+
+
+def _as_sacct_line(line: str) -> str:
+    fields = line.rstrip("\n").split("|")
+    if len(fields) < 5:
+        return line
+
+    fields[4] = _minutes(fields[4])
+    return "|".join(fields) + "\n"
+
+
+def _minutes(time_limit: str) -> str:
+    # squeue shows limits as [days-]hours:minutes:seconds, or UNLIMITED
+    days, _, clock = time_limit.rpartition("-")
+    parts = clock.split(":")
+    if not (days or "0").isdigit() or not all(part.isdigit() for part in parts):
+        return time_limit
+
+    seconds = 0
+    for part in parts:
+        seconds = seconds * 60 + int(part)
+
+    return str(int(days or 0) * 24 * 60 + seconds // 60)
+
+
+class _StatusCache:
+    """
+    Remembers the output of the last poll, so output that did not change is neither
+    parsed nor compared again. Unchanged jobs keep their previous status object, which
+    watchers recognize by identity.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._last_poll: Optional[Tuple[Tuple[str, ...], bytes]] = None
+        self._jobs: Dict[str, Tuple[bytes, SlurmJobStatus]] = {}
+
+    def statuses(
+        self, jobids: List[str], output: List[str]
+    ) -> Dict[str, SlurmJobStatus]:
+        poll = (tuple(jobids), _digest(output))
+        with self._lock:
+            if poll == self._last_poll and all(jobid in self._jobs for jobid in jobids):
+                return {jobid: self._jobs[jobid][1] for jobid in jobids}
+
+        statuses = {}
+        grouped = _group_by_job(output, jobids)
+        with self._lock:
+            for jobid in jobids:
+                digest = _digest(grouped[jobid])
+                cached = self._jobs.get(jobid)
+                if cached is None or cached[0] != digest:
+                    cached = (digest, SlurmJobStatus.from_output(grouped[jobid]))
+
+                status = cached[1]
+                statuses[jobid] = status
+                # Finished jobs are rarely polled again, they are parsed anew if they are
+                if status.is_running or status.is_pending:
+                    self._jobs[jobid] = cached
+                else:
+                    self._jobs.pop(jobid, None)
+
+            self._last_poll = poll
+
+        return statuses
+
+
+def _digest(lines: List[str]) -> bytes:
+    return hashlib.blake2b("".join(lines).encode(), digest_size=16).digest()
+
+
+def _group_by_job(output: List[str], jobids: List[str]) -> Dict[str, List[str]]:
+    grouped: Dict[str, List[str]] = {jobid: [] for jobid in jobids}
+    for line in output:
+        if not line.strip():
+            continue
+
+        jobid = _owning_jobid(line.split("|", 1)[0], grouped)
+        if jobid is not None:
+            grouped[jobid].append(line)
+
+    return grouped
+
+
+def _owning_jobid(task_id: str, jobids: Dict[str, List[str]]) -> Optional[str]:
+    # Steps (123.batch) belong to their job, array tasks (123_4) belong
+    # to the task if it was requested directly, otherwise to the array job
+    allocation = task_id.split(".")[0]
+    if allocation in jobids:
+        return allocation
+
+    base_id = re.match(r"\d+", allocation)
+    if base_id and base_id.group() in jobids:
+        return base_id.group()
+
+    return None
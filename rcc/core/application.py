@@ -1,8 +1,15 @@
 from rcc.core.utils import get_error_message
 from rcc.core.executor import CommandExecutor
+from rcc.core.job import push_job_watcher
 from rcc.core.filesystem import FilesystemFactory
 from rcc.core.utils import Options
 from rcc.cluster.slurm.controller import SlurmController
+from rcc.cluster.slurm.status import (
+    DEFAULT_STATUS_CACHE_DIR,
+    SharedStatusCache,
+    StatusBackend,
+    make_status_backend,
+)
 
 from rcc.core.workflow import Workflow
 from rcc.core.workflow import make_workflow
@@ -32,9 +39,35 @@ class Application:
             return 0 if success else 1
 
     def _get_workflow(self, executor: CommandExecutor, options: Options) -> Workflow:
-        controller = SlurmController(executor)
+        controller = make_controller(executor, options)
         return make_workflow(self.fs_factory, controller, options)
 
     def cancel(self) -> int:
         self._workflow.cancel(self._ui)
         return 130
+
+
+def make_controller(executor: CommandExecutor, options: Options) -> SlurmController:
+    """
+    Creates the controller for the cluster the options point to.
+
+    Args:
+        executor (CommandExecutor): Runs the commands on the cluster
+        options (Options): The options of the command
+
+    Returns:
+        SlurmController
+    """
+    watcher_factory = push_job_watcher if options.status.push_updates else None
+    status_backend: StatusBackend = make_status_backend(
+        options.status.backend, executor
+    )
+    if options.status.cache_ttl > 0:
+        status_backend = SharedStatusCache(
+            status_backend,
+            options.connection.address,
+            options.status.cache_ttl,
+            options.status.cache_dir or DEFAULT_STATUS_CACHE_DIR,
+        )
+
+    return SlurmController(executor, watcher_factory, status_backend=status_backend)
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import List, Mapping, Optional
 from .executor import CommandExecutor, RunningCommand
 from rcc.core.utils import ClusterError
 from .job import JobWatcherFactory, JobWatcherImpl, BaseBatchJob, BaseJobStatus
@@ -15,14 +15,29 @@ class BaseController(ABC):
         self._watcher_factory = watcher_factory or JobWatcherImpl
 
     @abstractmethod
-    def submit(self, jobfile: str) -> BaseBatchJob: ...
+    def submit(self, jobfile: str, hold: bool = False) -> BaseBatchJob: ...
+
+    @abstractmethod
+    def batch_job(self, jobid: str) -> BaseBatchJob: ...
 
     @abstractmethod
     def poll_status(self, jobid: str) -> BaseJobStatus: ...
 
+    def poll_statuses(self, jobids: List[str]) -> Mapping[str, BaseJobStatus]:
+        return {jobid: self.poll_status(jobid) for jobid in jobids}
+
+    def stream_state_changes(self, jobid: str) -> RunningCommand:
+        raise NotImplementedError()
+
+    def stream_output(self, jobid: str) -> RunningCommand:
+        raise NotImplementedError()
+
     @abstractmethod
     def cancel(self, jobid: str) -> None: ...
 
+    @abstractmethod
+    def release(self, jobid: str) -> None: ...
+
     def _execute_and_wait_or_raise_on_error(self, command: str) -> RunningCommand:
         cmd = self._executor.exec_command(command)
         exit_code = cmd.wait_until_exit()
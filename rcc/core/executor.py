@@ -1,11 +1,22 @@
 from abc import ABC, abstractmethod
-from typing import List, Type
+from typing import Iterator, List, Optional, Type
 
 
 class RunningCommand(ABC):
     @abstractmethod
-    def wait_until_exit(self) -> int:
-        pass
+    def wait_until_exit(self, timeout: Optional[float] = None) -> int:
+        """
+        Blocks until the command has exited and collects its output.
+
+        Args:
+            timeout (float): The maximum number of seconds to wait. Waits indefinitely if None.
+
+        Returns:
+            int: The exit status of the command
+
+        Raises:
+            TimeoutError: The command did not exit within `timeout` seconds
+        """
 
     @property
     @abstractmethod
@@ -20,6 +31,25 @@ class RunningCommand(ABC):
     def stderr(self) -> List[str]:
         pass
 
+    def lines(self, timeout: Optional[float] = None) -> Iterator[str]:
+        """
+        Yields the lines of stdout. Commands that can stream their output
+        yield every line as soon as it arrived.
+
+        Args:
+            timeout (float): The maximum number of seconds to wait for the next line. Waits indefinitely if None.
+
+        Raises:
+            TimeoutError: No line arrived within `timeout` seconds
+        """
+        self.wait_until_exit(timeout)
+        yield from self.stdout()
+
+    def close(self) -> None:
+        """
+        Stops waiting for the command. The command may be terminated.
+        """
+
 
 class CommandExecutor(ABC):
     def __enter__(self) -> "CommandExecutor":
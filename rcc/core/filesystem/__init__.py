@@ -1,5 +1,11 @@
-from ._base import FilesystemFactory, Filesystem
-from .progressive import progressive_copy, progressive_clean, CopyInstruction
+from ._base import FilesystemFactory, Filesystem, FileStat, SyncMode
+from .progressive import (
+    progressive_copy,
+    progressive_clean,
+    CopyInstruction,
+    CopyResult,
+)
+from .resumable import ResumableCopier, TransferJournal
 from .localfs import localfilesystem
 from .pyfsbased import PyFilesystemBased
 from .factory import PyFilesystemFactory
@@ -7,9 +13,14 @@ from .factory import PyFilesystemFactory
 __all__ = [
     "FilesystemFactory",
     "Filesystem",
+    "FileStat",
+    "SyncMode",
     "progressive_copy",
     "progressive_clean",
     "CopyInstruction",
+    "CopyResult",
+    "ResumableCopier",
+    "TransferJournal",
     "localfilesystem",
     "PyFilesystemBased",
     "PyFilesystemFactory",
@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from enum import Enum, auto
 from io import TextIOWrapper
-from typing import List, Optional
+from typing import ContextManager, List, NamedTuple, Optional, Tuple
 
 
 class FilesystemFactory(ABC):
@@ -13,6 +15,25 @@ class FilesystemFactory(ABC):
         pass
 
 
+class FileStat(NamedTuple):
+    size: int
+    is_dir: bool
+
+
+class SyncMode(Enum):
+    """
+    Decides whether an existing target file is up to date and does not need to be copied again.
+
+    off: Always copy
+    metadata: Skip files with the same size and modification time
+    checksum: Skip files with the same size and SHA-256 checksum
+    """
+
+    off = auto()
+    metadata = auto()
+    checksum = auto()
+
+
 class Filesystem(ABC):
     """
     Abstract base class for all Filesystems
@@ -37,7 +58,8 @@ class Filesystem(ABC):
         target: str,
         overwrite: bool = False,
         filesystem: Optional["Filesystem"] = None,
-    ) -> None:
+        sync: SyncMode = SyncMode.off,
+    ) -> bool:
         """Copies the `source` file to the `target` location.
         Can transfer between filesystems if `filesystem` argument is specified.
 
@@ -45,12 +67,38 @@ class Filesystem(ABC):
             source (str): The path to the file to be copied
             target (str): The path to the copy destination
             filesystem (Filesystem): An optional different filesystem to copy to
+            sync (SyncMode): Skips files that are up to date on the target and overwrites outdated ones
+
+        Returns:
+            bool: False if nothing was copied because the target was already up to date
 
         Raises:
             FileNotFoundError: The `source` file does not exist
             FileExistsError: The `target` file already exists and overwrite is False
         """
 
+    def copy_bundle(
+        self,
+        files: List[Tuple[str, str]],
+        overwrite: bool = False,
+        filesystem: Optional["Filesystem"] = None,
+    ) -> Optional[List[Optional[Exception]]]:
+        """Copies many files at once as a single archive stream, if both filesystems support it.
+
+        Args:
+            files (list[tuple[str, str]]): Pairs of source and target paths
+            overwrite (bool): Replace existing target files
+            filesystem (Filesystem): An optional different filesystem to copy to
+
+        Returns:
+            Optional[list[Optional[Exception]]]: None if bundled copies are not supported,
+                otherwise the error of every file, None if it was copied
+
+        Raises:
+            OSError: The transfer failed in a way that cannot be attributed to single files
+        """
+        return None
+
     @abstractmethod
     def delete(self, path: str) -> None:
         """Deletes a file from the Filesystem
@@ -83,3 +131,38 @@ class Filesystem(ABC):
         Returns:
             TextIOWrapper: A TextIOWrapper to the file
         """
+
+    @abstractmethod
+    def stat(self, path: str) -> FileStat:
+        """Returns size and type of a file. Directories have size 0.
+
+        Args:
+            path (str): The path to a file
+
+        Returns:
+            FileStat: The file's metadata
+
+        Raises:
+            FileNotFoundError: The file does not exist
+        """
+
+    def clone(self) -> "Filesystem":
+        """Returns an independent handle to the same filesystem that can be used concurrently,
+        e.g. with its own SFTP channel. Filesystems that are safe to share return themselves.
+
+        Returns:
+            Filesystem: The handle, which should be closed when it is no longer needed
+        """
+        return self
+
+    def cached(self) -> ContextManager[None]:
+        """Caches file metadata while the context is active, so repeated existence and type checks
+        do not need to ask the filesystem. Only changes made through this handle are noticed.
+
+        Returns:
+            ContextManager[None]: The context during which metadata is cached
+        """
+        return nullcontext()
+
+    def close(self) -> None:
+        """Releases the resources held by this handle"""
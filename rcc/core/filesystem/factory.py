@@ -1,21 +1,51 @@
 import os
 from rcc.core.filesystem import Filesystem, FilesystemFactory
 from .localfs import localfilesystem
+from .resumable import TransferJournal
 from .sshfs import sshfilesystem
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 if TYPE_CHECKING:
+    from rcc.core.ssh.pool import ConnectionPool
     from rcc.core.utils import Options
 
 
 class PyFilesystemFactory(FilesystemFactory):
-    def __init__(self, options: "Options") -> None:
+    def __init__(
+        self,
+        options: "Options",
+        pool: Optional["ConnectionPool"] = None,
+        workdir: Optional[str] = None,
+    ) -> None:
+        """
+        Args:
+            options (Options): The options of the command the filesystems are used for
+            pool (ConnectionPool): The pool to take the SSH connection from. Defaults to the process wide pool.
+            workdir (str): The directory local paths are relative to. Defaults to the current working directory.
+        """
         self._options = options
+        self._pool = pool
+        self._workdir = workdir
 
     def create_local_filesystem(self) -> Filesystem:
-        return localfilesystem(os.getcwd())
+        return localfilesystem(self._workdir or os.getcwd())
 
     def create_ssh_filesystem(self) -> Filesystem:
         connection = self._options.connection
         proxyjumps = self._options.proxyjumps
-        return sshfilesystem(connection, proxyjumps)
+        transfer = getattr(self._options, "transfer", None)
+        if transfer is None:
+            return sshfilesystem(connection, proxyjumps, pool=self._pool)
+
+        return sshfilesystem(
+            connection,
+            proxyjumps,
+            pool=self._pool,
+            chunk_size=transfer.chunk_size,
+            window_size=transfer.window_size,
+            prefetch_requests=transfer.prefetch_requests,
+            journal=TransferJournal(transfer.journal_file)
+            if transfer.journal_file
+            else None,
+            checkpoint_interval=transfer.checkpoint_interval,
+        )
@@ -0,0 +1,237 @@
+import threading
+from typing import Any, Collection, Dict, Optional, Text
+
+import fs.errors
+import fs.path
+from fs.base import FS
+from fs.info import Info
+from fs.lrucache import LRUCache
+from fs.wrapfs import WrapFS
+
+# Placeholder for entries that were changed by our own writes and have to be fetched again
+_UNKNOWN = None
+_NOT_A_DIRECTORY: Dict[str, Optional[Info]] = {}
+_CACHED_NAMESPACES = {"basic", "details"}
+
+Listing = Dict[str, Optional[Info]]
+
+
+class MetadataCache(WrapFS[FS]):
+    """
+    Answers existence, type and stat queries from directory listings instead of asking the wrapped
+    filesystem every time. A directory is listed with a single scandir the first time one of its
+    entries is queried. Writes and deletes through the cache update it, changes made by others
+    are not noticed, so the cache should only live as long as a single operation.
+    """
+
+    def __init__(
+        self, wrap_fs: FS, max_dirs: int = 1024, close_wrapped: bool = True
+    ) -> None:
+        """
+        Args:
+            wrap_fs (FS): The filesystem to cache
+            max_dirs (int): The number of directory listings to keep
+            close_wrapped (bool): Closing the cache closes `wrap_fs` as well
+        """
+        super().__init__(wrap_fs)
+        self._close_wrapped = close_wrapped
+        self._listings: "LRUCache[str, Listing]" = LRUCache(max_dirs)
+        self._lock = threading.RLock()
+
+    def getinfo(
+        self, path: Text, namespaces: Optional[Collection[Text]] = None
+    ) -> Info:
+        path = fs.path.abspath(fs.path.normpath(path))
+        if path == "/" or not _CACHED_NAMESPACES.issuperset(namespaces or []):
+            return super().getinfo(path, namespaces)
+
+        dir, name = fs.path.split(path)
+        with self._lock:
+            listing = self._listing(dir)
+            if name not in listing:
+                raise fs.errors.ResourceNotFound(path)
+
+            info = listing[name]
+            if info is _UNKNOWN:
+                info = self._refresh(listing, path, name)
+
+        return info
+
+    def exists(self, path: Text) -> bool:
+        try:
+            self.getinfo(path)
+        except fs.errors.ResourceNotFound:
+            return False
+
+        return True
+
+    def isdir(self, path: Text) -> bool:
+        try:
+            return self.getinfo(path).is_dir
+        except fs.errors.ResourceNotFound:
+            return False
+
+    def isfile(self, path: Text) -> bool:
+        try:
+            return not self.getinfo(path).is_dir
+        except fs.errors.ResourceNotFound:
+            return False
+
+    def clear(self) -> None:
+        """
+        Forgets everything, e.g. after the wrapped filesystem was changed by other means.
+        """
+        with self._lock:
+            self._listings.clear()
+
+    def close(self) -> None:
+        if self._close_wrapped:
+            self._wrap_fs.close()
+        super().close()
+
+    def _listing(self, dir: Text) -> Listing:
+        if dir in self._listings:
+            return self._listings[dir]
+
+        listing: Listing
+        try:
+            listing = {
+                info.name: info
+                for info in self._wrap_fs.scandir(dir, namespaces=["details"])
+            }
+        except (fs.errors.ResourceNotFound, fs.errors.DirectoryExpected):
+            listing = _NOT_A_DIRECTORY
+
+        self._listings[dir] = listing
+        return listing
+
+    def _refresh(self, listing: Listing, path: Text, name: Text) -> Info:
+        try:
+            info = self._wrap_fs.getinfo(path, namespaces=["details"])
+        except fs.errors.ResourceNotFound:
+            del listing[name]
+            raise
+
+        listing[name] = info
+        return info
+
+    def _forget(
+        self, path: Text, recursive: bool = False, parents: bool = False
+    ) -> None:
+        path = fs.path.abspath(fs.path.normpath(path))
+        with self._lock:
+            if parents:
+                for dir in fs.path.recursepath(fs.path.dirname(path)):
+                    self._mark_unknown(dir)
+
+            self._mark_unknown(path)
+            if recursive:
+                prefix = fs.path.forcedir(path)
+                for dir in [dir for dir in self._listings if dir.startswith(prefix)]:
+                    del self._listings[dir]
+
+    def _mark_unknown(self, path: Text) -> None:
+        if path == "/":
+            return
+
+        dir, name = fs.path.split(path)
+        listing = self._listings.get(dir)
+        if listing is _NOT_A_DIRECTORY:
+            del self._listings[dir]
+        elif listing is not None:
+            listing[name] = _UNKNOWN
+
+        if path in self._listings:
+            del self._listings[path]
+
+    # Every write and delete forgets what it changes before it is passed on
+
+    def openbin(
+        self, path: Text, mode: Text = "r", buffering: int = -1, **options: Any
+    ) -> Any:
+        if mode != "r" and mode != "rb":
+            self._forget(path)
+        return super().openbin(path, mode, buffering, **options)
+
+    def open(self, path: Text, mode: Text = "r", *args: Any, **kwargs: Any) -> Any:
+        if mode != "r" and mode != "rt" and mode != "rb":
+            self._forget(path)
+        return super().open(path, mode, *args, **kwargs)
+
+    def upload(self, path: Text, *args: Any, **kwargs: Any) -> None:
+        self._forget(path)
+        super().upload(path, *args, **kwargs)
+
+    def writebytes(self, path: Text, *args: Any, **kwargs: Any) -> None:
+        self._forget(path)
+        super().writebytes(path, *args, **kwargs)
+
+    def writefile(self, path: Text, *args: Any, **kwargs: Any) -> None:
+        self._forget(path)
+        super().writefile(path, *args, **kwargs)
+
+    def appendbytes(self, path: Text, *args: Any, **kwargs: Any) -> None:
+        self._forget(path)
+        super().appendbytes(path, *args, **kwargs)
+
+    def appendtext(self, path: Text, *args: Any, **kwargs: Any) -> None:
+        self._forget(path)
+        super().appendtext(path, *args, **kwargs)
+
+    def create(self, path: Text, *args: Any, **kwargs: Any) -> bool:
+        self._forget(path)
+        return super().create(path, *args, **kwargs)
+
+    def touch(self, path: Text) -> None:
+        self._forget(path)
+        super().touch(path)
+
+    def setinfo(self, path: Text, info: Any) -> None:
+        self._forget(path)
+        super().setinfo(path, info)
+
+    def settimes(self, path: Text, *args: Any, **kwargs: Any) -> None:
+        self._forget(path)
+        super().settimes(path, *args, **kwargs)
+
+    def makedir(self, path: Text, *args: Any, **kwargs: Any) -> Any:
+        self._forget(path)
+        return super().makedir(path, *args, **kwargs)
+
+    def makedirs(self, path: Text, *args: Any, **kwargs: Any) -> Any:
+        self._forget(path, parents=True)
+        return super().makedirs(path, *args, **kwargs)
+
+    def remove(self, path: Text) -> None:
+        self._forget(path)
+        super().remove(path)
+
+    def removedir(self, path: Text) -> None:
+        self._forget(path, recursive=True)
+        super().removedir(path)
+
+    def removetree(self, dir_path: Text) -> None:
+        self._forget(dir_path, recursive=True)
+        super().removetree(dir_path)
+
+    def move(self, src_path: Text, dst_path: Text, *args: Any, **kwargs: Any) -> None:
+        self._forget(src_path)
+        self._forget(dst_path)
+        super().move(src_path, dst_path, *args, **kwargs)
+
+    def movedir(
+        self, src_path: Text, dst_path: Text, *args: Any, **kwargs: Any
+    ) -> None:
+        self._forget(src_path, recursive=True)
+        self._forget(dst_path, recursive=True)
+        super().movedir(src_path, dst_path, *args, **kwargs)
+
+    def copy(self, src_path: Text, dst_path: Text, *args: Any, **kwargs: Any) -> None:
+        self._forget(dst_path)
+        super().copy(src_path, dst_path, *args, **kwargs)
+
+    def copydir(
+        self, src_path: Text, dst_path: Text, *args: Any, **kwargs: Any
+    ) -> None:
+        self._forget(dst_path, recursive=True)
+        super().copydir(src_path, dst_path, *args, **kwargs)
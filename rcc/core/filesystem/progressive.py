@@ -1,11 +1,16 @@
 import functools
 import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
-from typing import Generator, List, NamedTuple, Optional
+from typing import Dict, Generator, List, NamedTuple, Optional, Tuple
 
-from ._base import Filesystem
+from ._base import Filesystem, SyncMode
 from .glob import is_glob, path_after_wildcard
 
+# Whether a file was copied or skipped as up to date, or the error that prevented the copy
+_Outcome = Tuple[bool, Optional[Exception]]
+
 
 class CopyInstruction(NamedTuple):
     """
@@ -15,6 +20,7 @@ class CopyInstruction(NamedTuple):
     source: str
     destination: str
     overwrite: bool = False
+    sync: SyncMode = SyncMode.off
 
     def unglob(self, filesystem: Filesystem) -> List["CopyInstruction"]:
         if is_glob(self.source):
@@ -26,13 +32,14 @@ class CopyInstruction(NamedTuple):
     def _unglobbed_sub_instruction(self, file: str) -> "CopyInstruction":
         filename = path_after_wildcard(self.source, file)
         final_dest = os.path.join(self.destination, filename)
-        return CopyInstruction(file, final_dest, self.overwrite)
+        return self._replace(source=file, destination=final_dest)
 
 
 @dataclass
 class CopyResult:
     copied_files: List[str]
     errors: List[Exception] = field(default_factory=list)
+    skipped_files: List[str] = field(default_factory=list)
 
     @classmethod
     def empty(cls, errors: Optional[List[Exception]] = None) -> "CopyResult":
@@ -46,44 +53,286 @@ class _Copier:
         target_fs: Filesystem,
         *,
         abort_on_error: bool = True,
+        bundle_threshold: Optional[int] = None,
     ) -> None:
         self._src_fs = src_fs
         self._target_fs = target_fs
         self._abort_on_error = abort_on_error
+        self._bundle_threshold = bundle_threshold
 
     def __call__(self, copy_instruction: CopyInstruction) -> CopyResult:
         try:
             unpacked_instructions = copy_instruction.unglob(self._src_fs)
-            return functools.reduce(
-                self._accumulate_copy_result, unpacked_instructions, CopyResult([])
-            )
+            return self.copy_unglobbed(unpacked_instructions)
         except FileNotFoundError as err:
             return CopyResult.empty([err])
 
+    def copy_unglobbed(self, instructions: List[CopyInstruction]) -> CopyResult:
+        if _should_bundle(instructions, self._bundle_threshold):
+            bundled = _try_copy_bundle(self._src_fs, self._target_fs, instructions)
+            if bundled is not None:
+                return bundled
+
+        return functools.reduce(
+            self._accumulate_copy_result, instructions, CopyResult([])
+        )
+
     def _accumulate_copy_result(
         self, current_result: CopyResult, instruction: CopyInstruction
     ) -> CopyResult:
         if current_result.errors and self._abort_on_error:
             return current_result
 
-        error = self._try_copy(instruction)
+        copied, error = self._try_copy(instruction)
 
         errors = current_result.errors
-        if error is None:
+        if error is not None:
+            errors.append(error)
+        elif copied:
             current_result.copied_files.append(instruction.destination)
         else:
-            errors.append(error)
+            current_result.skipped_files.append(instruction.destination)
 
-        return CopyResult(current_result.copied_files, errors)
+        return CopyResult(
+            current_result.copied_files, errors, current_result.skipped_files
+        )
 
-    def _try_copy(self, instruction: CopyInstruction) -> Optional[Exception]:
+    def _try_copy(self, instruction: CopyInstruction) -> _Outcome:
         try:
-            self._src_fs.copy(*instruction, filesystem=self._target_fs)
+            copied = self._src_fs.copy(
+                instruction.source,
+                instruction.destination,
+                instruction.overwrite,
+                filesystem=self._target_fs,
+                sync=instruction.sync,
+            )
         except (FileNotFoundError, FileExistsError) as err:
-            return err
+            return False, err
+
+        return copied, None
 
+
+def _should_bundle(
+    instructions: List[CopyInstruction], bundle_threshold: Optional[int]
+) -> bool:
+    # Syncing compares every file on its own, which a bundle cannot do
+    return (
+        bundle_threshold is not None
+        and len(instructions) >= bundle_threshold
+        and all(instruction.sync is SyncMode.off for instruction in instructions)
+    )
+
+
+def _try_copy_bundle(
+    src_fs: Filesystem, target_fs: Filesystem, instructions: List[CopyInstruction]
+) -> Optional[CopyResult]:
+    files = [
+        (instruction.source, instruction.destination) for instruction in instructions
+    ]
+    try:
+        errors = src_fs.copy_bundle(
+            files, instructions[0].overwrite, filesystem=target_fs
+        )
+    except OSError as err:
+        # It is unknown how far the transfer got, so a rollback has to consider every file
+        return CopyResult([destination for _, destination in files], [err])
+
+    if errors is None:
         return None
 
+    result = CopyResult([])
+    for (_, destination), error in zip(files, errors):
+        if error is None:
+            result.copied_files.append(destination)
+        else:
+            result.errors.append(error)
+
+    return result
+
+
+# The instructions copied by a single worker, either one file or a bundle
+_Task = Tuple[int, List[CopyInstruction]]
+
+
+class _ParallelCopier:
+    """
+    Copies the files of all instructions with a pool of workers, largest files first.
+    Every worker thread uses its own clones of the filesystems, e.g. its own SFTP channel.
+    Instructions that expand to many files are copied as a bundle by a single worker.
+    """
+
+    def __init__(
+        self,
+        src_fs: Filesystem,
+        target_fs: Filesystem,
+        workers: int,
+        *,
+        abort_on_error: bool = True,
+        bundle_threshold: Optional[int] = None,
+    ) -> None:
+        self._src_fs = src_fs
+        self._target_fs = target_fs
+        self._workers = workers
+        self._abort_on_error = abort_on_error
+        self._bundle_threshold = bundle_threshold
+        self._abort = threading.Event()
+        self._local = threading.local()
+        self._clones: List[Filesystem] = []
+        self._clones_lock = threading.Lock()
+
+    def __call__(
+        self, instructions: List[CopyInstruction]
+    ) -> Generator[CopyResult, None, None]:
+        results = [CopyResult([]) for _ in instructions]
+        tasks = self._unglob_all(instructions, results)
+        pending = [0] * len(instructions)
+        for index, _ in tasks:
+            pending[index] += 1
+
+        if self._abort.is_set():
+            yield from self._results_until_first_error(results)
+            return
+
+        try:
+            with ThreadPoolExecutor(self._workers) as pool:
+                try:
+                    tasks = self._largest_first(pool, tasks)
+                    futures = {pool.submit(self._copy, task): task for task in tasks}
+                    yield from self._collect(futures, results, pending)
+                finally:
+                    # Queued files are skipped once the consumer stopped listening
+                    self._abort.set()
+        finally:
+            self._close_clones()
+
+    def _unglob_all(
+        self, instructions: List[CopyInstruction], results: List[CopyResult]
+    ) -> List[_Task]:
+        tasks: List[_Task] = []
+        for index, instruction in enumerate(instructions):
+            try:
+                unpacked = instruction.unglob(self._src_fs)
+            except FileNotFoundError as err:
+                results[index].errors.append(err)
+                if self._abort_on_error:
+                    self._abort.set()
+                    break
+                continue
+
+            if _should_bundle(unpacked, self._bundle_threshold):
+                tasks.append((index, unpacked))
+            else:
+                tasks.extend((index, [sub_instruction]) for sub_instruction in unpacked)
+
+        return tasks
+
+    def _largest_first(
+        self, pool: ThreadPoolExecutor, tasks: List[_Task]
+    ) -> List[_Task]:
+        # Bundles and directories sort before files, their size is unknown but likely large
+        keys = list(pool.map(self._sort_key, tasks))
+        order = sorted(range(len(tasks)), key=keys.__getitem__, reverse=True)
+        return [tasks[position] for position in order]
+
+    def _sort_key(self, task: _Task) -> Tuple[bool, int]:
+        instructions = task[1]
+        if len(instructions) > 1:
+            return True, 0
+
+        src_fs, _ = self._worker_filesystems()
+        try:
+            stat = src_fs.stat(instructions[0].source)
+        except FileNotFoundError:
+            return False, 0
+
+        return stat.is_dir, stat.size
+
+    def _copy(self, task: _Task) -> CopyResult:
+        if self._abort.is_set():
+            return CopyResult.empty([_NotCopied()])
+
+        src_fs, target_fs = self._worker_filesystems()
+        copier = _Copier(
+            src_fs,
+            target_fs,
+            abort_on_error=self._abort_on_error,
+            bundle_threshold=self._bundle_threshold,
+        )
+        result = copier.copy_unglobbed(task[1])
+        if result.errors and self._abort_on_error:
+            self._abort.set()
+
+        return result
+
+    def _collect(
+        self,
+        futures: Dict["Future[CopyResult]", _Task],
+        results: List[CopyResult],
+        pending: List[int],
+    ) -> Generator[CopyResult, None, None]:
+        next_result = 0
+        for future in as_completed(futures):
+            index = futures[future][0]
+            result = future.result()
+            results[index].copied_files.extend(result.copied_files)
+            results[index].skipped_files.extend(result.skipped_files)
+            results[index].errors.extend(
+                error for error in result.errors if not isinstance(error, _NotCopied)
+            )
+            pending[index] -= 1
+
+            # Results are handed out in the order of the instructions. After an abort,
+            # everything is held back until the workers that are still copying finished.
+            while (
+                not self._abort.is_set()
+                and next_result < len(results)
+                and pending[next_result] == 0
+            ):
+                yield results[next_result]
+                next_result += 1
+
+        yield from self._results_until_first_error(results[next_result:])
+
+    def _results_until_first_error(
+        self, results: List[CopyResult]
+    ) -> Generator[CopyResult, None, None]:
+        if not self._abort_on_error:
+            yield from results
+            return
+
+        for position, result in enumerate(results):
+            if result.errors:
+                # Files of later instructions that were already copied must still
+                # be reported, otherwise a rollback would miss them
+                for later in results[position + 1 :]:
+                    result.copied_files.extend(later.copied_files)
+                yield result
+                return
+
+            yield result
+
+    def _worker_filesystems(self) -> Tuple[Filesystem, Filesystem]:
+        filesystems = getattr(self._local, "filesystems", None)
+        if filesystems is None:
+            filesystems = (self._src_fs.clone(), self._target_fs.clone())
+            self._local.filesystems = filesystems
+            with self._clones_lock:
+                self._clones.extend(filesystems)
+
+        return filesystems
+
+    def _close_clones(self) -> None:
+        for clone in self._clones:
+            if clone is not self._src_fs and clone is not self._target_fs:
+                clone.close()
+        self._clones.clear()
+
+
+class _NotCopied(Exception):
+    """
+    Marks a file that was skipped because the copy was aborted
+    """
+
 
 def progressive_copy(
     source_filesystem: Filesystem,
@@ -91,6 +340,8 @@ def progressive_copy(
     files: List[CopyInstruction],
     *,
     abort_on_error: bool = True,
+    workers: int = 1,
+    bundle_threshold: Optional[int] = None,
 ) -> Generator[CopyResult, None, None]:
     """
     Copies the files to the target filesystem.
@@ -99,18 +350,35 @@ def progressive_copy(
         source_filesystem (Filesystem): The filesystem to copy FROM
         target_filesystem (Filesystem): The filesystem to copy TO
         files (list[CopyInstruction]): A list of CopyInstructions
+        workers (int): The number of files to copy concurrently
+        bundle_threshold (int): Instructions that expand to at least this many files are copied
+            as a single archive stream, if the filesystems support it. Never bundles if None.
 
     Returns:
         Generator[CopyResult]: A generator yielding individual copy results
     """
-    copier = _Copier(
-        source_filesystem, target_filesystem, abort_on_error=abort_on_error
-    )
-    for copy_instruction in files:
-        tmp_result = copier(copy_instruction)
-        yield tmp_result
-        if tmp_result.errors and abort_on_error:
-            break
+    with source_filesystem.cached(), target_filesystem.cached():
+        if workers > 1:
+            yield from _ParallelCopier(
+                source_filesystem,
+                target_filesystem,
+                workers,
+                abort_on_error=abort_on_error,
+                bundle_threshold=bundle_threshold,
+            )(files)
+            return
+
+        copier = _Copier(
+            source_filesystem,
+            target_filesystem,
+            abort_on_error=abort_on_error,
+            bundle_threshold=bundle_threshold,
+        )
+        for copy_instruction in files:
+            tmp_result = copier(copy_instruction)
+            yield tmp_result
+            if tmp_result.errors and abort_on_error:
+                break
 
 
 def progressive_clean(
@@ -126,8 +394,9 @@ def progressive_clean(
     Returns:
         Generator[Exception]: A generator yielding exceptions that occured during cleaning
     """
-    for file in files:
-        try:
-            filesystem.delete(file)
-        except FileNotFoundError as err:
-            yield err
+    with filesystem.cached():
+        for file in files:
+            try:
+                filesystem.delete(file)
+            except FileNotFoundError as err:
+                yield err
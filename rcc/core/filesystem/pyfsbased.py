@@ -1,20 +1,37 @@
 import os
+from contextlib import contextmanager
 from io import TextIOWrapper
 from pathlib import PurePath
-from typing import Generator, List, Optional, cast
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Generator,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    cast,
+)
 
 import fs.base
 import fs.copy as fscp
 import fs.errors
 import fs.glob
+import fs.path
 
-from ._base import Filesystem
+from ._base import Filesystem, FileStat, SyncMode
+from .metadatacache import MetadataCache
+from .resumable import ResumableCopier
 from .glob import (
     is_glob,
     path_after_wildcard,
     split_at_first_wildcard,
 )
 
+if TYPE_CHECKING:
+    from rcc.core.ssh.remotefind import RemoteFind
+    from rcc.core.ssh.tarstream import RemoteTar
+
 
 class PyFilesystemBased(Filesystem):
     """
@@ -22,11 +39,34 @@ class PyFilesystemBased(Filesystem):
     """
 
     def __init__(
-        self, internal_fs: fs.base.FS, dir: str = "/", home: str = "/"
+        self,
+        internal_fs: fs.base.FS,
+        dir: str = "/",
+        home: str = "/",
+        reopen: Optional[Callable[[], fs.base.FS]] = None,
+        remote_tar: Optional["RemoteTar"] = None,
+        remote_find: Optional["RemoteFind"] = None,
+        resumable: Optional[ResumableCopier] = None,
     ) -> None:
+        """
+        Args:
+            internal_fs (fs.base.FS): The PyFilesystem to operate on
+            dir (str): The directory relative paths are resolved against
+            home (str): The directory `~` expands to
+            reopen (Callable): Opens another instance of `internal_fs` for concurrent use.
+                Without it, clones share `internal_fs`.
+            remote_tar (RemoteTar): Streams bundled copies from and to the machine `internal_fs` is on
+            remote_find (RemoteFind): Lists directory trees for globs on the machine `internal_fs` is on
+            resumable (ResumableCopier): Copies large files from and to `internal_fs` in a way
+                that can be resumed after an interruption
+        """
         self._internal_fs = internal_fs
         self._curdir = PurePath(dir)
         self._homedir = PurePath(home)
+        self._reopen = reopen
+        self._remote_tar = remote_tar
+        self._remote_find = remote_find
+        self._resumable = resumable
 
     @property
     def current_dir(self) -> PurePath:
@@ -53,9 +93,12 @@ class PyFilesystemBased(Filesystem):
     def _expandhome(self, path: str, filesystem: "PyFilesystemBased") -> str:
         return path.replace("~", str(filesystem.home))
 
-    def openread(self, path: str) -> TextIOWrapper:
+    def _absolute(self, path: str) -> str:
         path = self._expandhome(path, self)
-        path = str(self._curdir.joinpath(path))
+        return str(self.current_dir.joinpath(path))
+
+    def openread(self, path: str) -> TextIOWrapper:
+        path = self._absolute(path)
         try:
             return cast(TextIOWrapper, self.internal_fs.open(path, mode="r"))
         except fs.errors.ResourceNotFound:
@@ -69,19 +112,65 @@ class PyFilesystemBased(Filesystem):
         target: str,
         overwrite: bool = False,
         filesystem: Optional["Filesystem"] = None,
-    ) -> None:
+        sync: SyncMode = SyncMode.off,
+    ) -> bool:
         self._raise_if_no_pyfilesystem(filesystem)
         other_pyfs_based = cast(PyFilesystemBased, filesystem) or self
         source = self._expandhome(source, self)
         target = self._expandhome(target, other_pyfs_based)
         source_fs = self._open_fs(self, source)
         target_fs = self._open_fs(other_pyfs_based, target)
+        resumable = self._resumable or other_pyfs_based._resumable
 
         if is_glob(source):
-            self._copy_glob(source_fs, source, target_fs, target, overwrite)
-            return
+            return self._copy_glob(
+                source_fs, source, target_fs, target, overwrite, sync, resumable
+            )
+
+        return self._copy_single_file(
+            source_fs, source, target_fs, target, overwrite, sync, resumable
+        )
+
+    def copy_bundle(
+        self,
+        files: List[Tuple[str, str]],
+        overwrite: bool = False,
+        filesystem: Optional["Filesystem"] = None,
+    ) -> Optional[List[Optional[Exception]]]:
+        self._raise_if_no_pyfilesystem(filesystem)
+        other_pyfs_based = cast(PyFilesystemBased, filesystem) or self
+        # Bundles are streamed between the local machine and a remote machine running tar
+        if self._remote_tar is None and other_pyfs_based._remote_tar is not None:
+            local_paths = self._syspaths([source for source, _ in files])
+            remote_paths = [other_pyfs_based._absolute(target) for _, target in files]
+            if local_paths is None:
+                return None
+
+            try:
+                return other_pyfs_based._remote_tar.extract(
+                    list(zip(local_paths, remote_paths)), overwrite
+                )
+            finally:
+                # tar writes around the cache
+                other_pyfs_based._clear_cache()
+
+        if self._remote_tar is not None and other_pyfs_based._remote_tar is None:
+            remote_paths = [self._absolute(source) for source, _ in files]
+            local_paths = other_pyfs_based._syspaths([target for _, target in files])
+            if local_paths is None:
+                return None
+
+            return self._remote_tar.create(
+                list(zip(remote_paths, local_paths)), overwrite
+            )
+
+        return None
 
-        self._copy_single_file(source_fs, source, target_fs, target, overwrite)
+    def _syspaths(self, paths: List[str]) -> Optional[List[str]]:
+        if not self.internal_fs.hassyspath("/"):
+            return None
+
+        return [self.internal_fs.getsyspath(self._absolute(path)) for path in paths]
 
     def _open_fs(self, fs: "PyFilesystemBased", path: str) -> fs.base.FS:
         if os.path.isabs(path):
@@ -99,11 +188,28 @@ class PyFilesystemBased(Filesystem):
 
         self._raise_if_does_not_exist(dir, fs)
 
-        fs = fs.opendir(dir)
-        for match in fs.glob(pattern):
-            joined_path = os.path.join(dir, match.path.lstrip(os.path.sep))
+        matches = self._glob_remotely(dir, pattern)
+        if matches is None:
+            matches = [match.path for match in fs.opendir(dir).glob(pattern)]
+
+        for match in matches:
+            joined_path = os.path.join(dir, match.lstrip(os.path.sep))
             yield joined_path
 
+    def _glob_remotely(self, dir: str, pattern: str) -> Optional[List[str]]:
+        if self._remote_find is None:
+            return None
+
+        # Same depth limit and matching as fs.glob, which marks directories with a trailing slash
+        components = list(fs.path.iteratepath(pattern))
+        max_depth = None if "**" in components else len(components)
+        entries = self._remote_find.walk(self._absolute(dir), max_depth)
+        if entries is None:
+            return None
+
+        paths = (path + "/" if is_dir else path for path, is_dir in entries)
+        return [path for path in paths if fs.glob.match(pattern, path)]
+
     def _copy_glob(
         self,
         source_fs: fs.base.FS,
@@ -111,7 +217,10 @@ class PyFilesystemBased(Filesystem):
         target_fs: fs.base.FS,
         target: str,
         overwrite: bool,
-    ) -> None:
+        sync: SyncMode = SyncMode.off,
+        resumable: Optional[ResumableCopier] = None,
+    ) -> bool:
+        copied = False
         glob = self._glob_with_pyfs(source_fs, source)
         for match in glob:
             if source_fs.isdir(match):
@@ -119,7 +228,11 @@ class PyFilesystemBased(Filesystem):
 
             filename = path_after_wildcard(source, match)
             target_path = os.path.join(target, filename)
-            self._copy_single_file(source_fs, match, target_fs, target_path, overwrite)
+            copied |= self._copy_single_file(
+                source_fs, match, target_fs, target_path, overwrite, sync, resumable
+            )
+
+        return copied
 
     def _copy_single_file(
         self,
@@ -128,16 +241,82 @@ class PyFilesystemBased(Filesystem):
         target_fs: fs.base.FS,
         target: str,
         overwrite: bool = False,
-    ) -> None:
+        sync: SyncMode = SyncMode.off,
+        resumable: Optional[ResumableCopier] = None,
+    ) -> bool:
         self._raise_if_does_not_exist(source, source_fs)
-        self._raise_if_target_exists(target, overwrite, target_fs)
+        if sync is not SyncMode.off:
+            return self._sync(source_fs, source, target_fs, target, sync, resumable)
+
+        # The target of an interrupted copy is our own partial file
+        if resumable is None or not resumable.is_interrupted(
+            source_fs, source, target_fs, target
+        ):
+            self._raise_if_target_exists(target, overwrite, target_fs)
+        self._create_missing_target_dirs(target, target_fs)
+        self._try_copy_to_filesystem(source_fs, source, target_fs, target, resumable)
+        return True
+
+    def _sync(
+        self,
+        source_fs: fs.base.FS,
+        source: str,
+        target_fs: fs.base.FS,
+        target: str,
+        sync: SyncMode,
+        resumable: Optional[ResumableCopier] = None,
+    ) -> bool:
+        if source_fs.isdir(source):
+            return self._sync_dir(source_fs, source, target_fs, target, sync, resumable)
+
+        target = self._append_filename_if_target_is_dir(target_fs, source, target)
+        if _is_up_to_date(source_fs, source, target_fs, target, sync):
+            return False
+
         self._create_missing_target_dirs(target, target_fs)
-        self._try_copy_to_filesystem(source_fs, source, target_fs, target)
+        # The modification time is kept, so the next sync can compare it
+        _copy_file(source_fs, source, target_fs, target, resumable, preserve_time=True)
+        return True
+
+    def _sync_dir(
+        self,
+        source_fs: fs.base.FS,
+        source: str,
+        target_fs: fs.base.FS,
+        target: str,
+        sync: SyncMode,
+        resumable: Optional[ResumableCopier] = None,
+    ) -> bool:
+        copied = False
+        for path in source_fs.opendir(source).walk.files():
+            relative_path = path.lstrip("/")
+            copied |= self._sync(
+                source_fs,
+                os.path.join(source, relative_path),
+                target_fs,
+                os.path.join(target, relative_path),
+                sync,
+                resumable,
+            )
+
+        return copied
 
     def _create_missing_target_dirs(self, target: str, target_fs: fs.base.FS) -> None:
         target_parent_dir = os.path.dirname(target)
-        if not target_fs.exists(target_parent_dir):
-            target_fs.makedirs(target_parent_dir, recreate=True)
+        if target_fs.exists(target_parent_dir):
+            return
+
+        # Concurrent copies race to create the same directories, which makes makedirs fail
+        # on a level that appeared in the meantime. Every retry gets at least one level further.
+        for _ in PurePath(target_parent_dir).parts:
+            try:
+                target_fs.makedirs(target_parent_dir, recreate=True)
+                return
+            except fs.errors.OperationFailed:
+                if target_fs.isdir(target_parent_dir):
+                    return
+
+        target_fs.makedirs(target_parent_dir, recreate=True)
 
     def delete(self, path: str) -> None:
         fs = self.internal_fs.opendir(str(self.current_dir))
@@ -172,19 +351,73 @@ class PyFilesystemBased(Filesystem):
         _fs.removetree(path)
 
     def exists(self, path: str) -> bool:
-        path = self._expandhome(path, self)
-        path = str(self.current_dir.joinpath(path))
+        path = self._absolute(path)
         return self.internal_fs.exists(path)
 
+    def stat(self, path: str) -> FileStat:
+        path = self._absolute(path)
+        try:
+            info = self.internal_fs.getinfo(path, namespaces=["details"])
+        except fs.errors.ResourceNotFound:
+            raise FileNotFoundError(path)
+
+        return FileStat(0 if info.is_dir else info.size, info.is_dir)
+
+    def clone(self) -> "PyFilesystemBased":
+        if self._reopen is None:
+            return self
+
+        internal_fs = self._reopen()
+        if isinstance(self.internal_fs, MetadataCache):
+            internal_fs = MetadataCache(internal_fs)
+
+        return PyFilesystemBased(
+            internal_fs,
+            str(self.current_dir),
+            str(self.home),
+            self._reopen,
+            self._remote_tar,
+            self._remote_find,
+            self._resumable,
+        )
+
+    def close(self) -> None:
+        self.internal_fs.close()
+
+    @contextmanager
+    def cached(self) -> Iterator[None]:
+        # Local checks are cheap and tar bundles write local files around the cache
+        is_local = self.internal_fs.hassyspath("/")
+        if is_local or isinstance(self.internal_fs, MetadataCache):
+            yield
+            return
+
+        uncached_fs = self._internal_fs
+        # The cache only lives for the block, the filesystem stays open after it
+        self._internal_fs = MetadataCache(uncached_fs, close_wrapped=False)
+        try:
+            yield
+        finally:
+            self._internal_fs = uncached_fs
+
+    def _clear_cache(self) -> None:
+        if isinstance(self.internal_fs, MetadataCache):
+            self.internal_fs.clear()
+
     def _try_copy_to_filesystem(
-        self, source_fs: fs.base.FS, source: str, target_fs: fs.base.FS, target: str
+        self,
+        source_fs: fs.base.FS,
+        source: str,
+        target_fs: fs.base.FS,
+        target: str,
+        resumable: Optional[ResumableCopier] = None,
     ) -> None:
         if source_fs.isdir(source):
             fscp.copy_dir(source_fs, source, target_fs, target)
             return
 
         target = self._append_filename_if_target_is_dir(target_fs, source, target)
-        fscp.copy_file(source_fs, source, target_fs, target)
+        _copy_file(source_fs, source, target_fs, target, resumable)
 
     def _append_filename_if_target_is_dir(
         self, fs: fs.base.FS, source: str, target: str
@@ -212,3 +445,48 @@ class PyFilesystemBased(Filesystem):
             raise RuntimeError(
                 f"{str(type(self))} currently only works with PyFilesystem2 based Filesystems"
             )
+
+
+def _copy_file(
+    source_fs: fs.base.FS,
+    source: str,
+    target_fs: fs.base.FS,
+    target: str,
+    resumable: Optional[ResumableCopier],
+    preserve_time: bool = False,
+) -> None:
+    if resumable is None:
+        fscp.copy_file(
+            source_fs, source, target_fs, target, preserve_time=preserve_time
+        )
+        return
+
+    resumable.copy_file(source_fs, source, target_fs, target, preserve_time)
+
+
+def _is_up_to_date(
+    source_fs: fs.base.FS,
+    source: str,
+    target_fs: fs.base.FS,
+    target: str,
+    sync: SyncMode,
+) -> bool:
+    try:
+        target_info = target_fs.getinfo(target, namespaces=["details"])
+    except fs.errors.ResourceNotFound:
+        return False
+
+    source_info = source_fs.getinfo(source, namespaces=["details"])
+    if target_info.is_dir or source_info.size != target_info.size:
+        return False
+
+    if sync is SyncMode.checksum:
+        return source_fs.hash(source, "sha256") == target_fs.hash(target, "sha256")
+
+    # SFTP only transfers whole seconds
+    source_modified, target_modified = source_info.modified, target_info.modified
+    return (
+        source_modified is not None
+        and target_modified is not None
+        and int(source_modified.timestamp()) == int(target_modified.timestamp())
+    )
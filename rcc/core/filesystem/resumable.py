@@ -0,0 +1,311 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, NamedTuple, Optional, Tuple, cast
+
+import fs.base
+import fs.copy as fscp
+import fs.errors
+
+if TYPE_CHECKING:
+    from _typeshed import ReadableBuffer
+
+# Files of at least this size are journaled, with a checkpoint whenever this much more was transferred
+DEFAULT_CHECKPOINT_INTERVAL = 64 * 1024 * 1024
+# Independent of the working directory, so every run finds the transfers an earlier one left behind
+DEFAULT_JOURNAL_FILE = os.path.join("~", ".cache", "rcc", "transfers.json")
+
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+# Source and target URL of a transfer
+_Key = Tuple[str, str]
+
+
+class JournalEntry(NamedTuple):
+    """
+    The progress of a single transfer.
+
+    size: The size of the source file
+    modified: The modification time of the source file in whole seconds
+    offset: The number of bytes that are confirmed to be written at the target
+    checksum: The SHA-256 checksum of the first `offset` bytes
+    """
+
+    size: int
+    modified: Optional[int]
+    offset: int
+    checksum: str
+
+
+class TransferJournal:
+    """
+    Remembers the progress of large transfers in a local JSON file, so a transfer that was interrupted,
+    e.g. by a dropped connection, can be resumed by a later run. A transfer is removed from the journal
+    once it finished, the file is deleted when no transfer is left.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): The journal file, created on demand, `~` is expanded
+        """
+        self._path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+        self._entries = _load(self._path)
+
+    def get(self, source: str, target: str) -> Optional[JournalEntry]:
+        with self._lock:
+            return self._entries.get((source, target))
+
+    def record(self, source: str, target: str, entry: JournalEntry) -> None:
+        with self._lock:
+            self._entries[(source, target)] = entry
+            self._save((source, target), entry)
+
+    def remove(self, source: str, target: str) -> None:
+        with self._lock:
+            if self._entries.pop((source, target), None) is not None:
+                self._save((source, target), None)
+
+    def _save(self, key: _Key, entry: Optional[JournalEntry]) -> None:
+        # The journal is shared by all runs, only our own transfer replaces what the file holds
+        entries = _load(self._path)
+        if entry is None:
+            entries.pop(key, None)
+        else:
+            entries[key] = entry
+
+        if not entries:
+            if os.path.exists(self._path):
+                os.remove(self._path)
+            return
+
+        transfers = [
+            {"source": source, "target": target, **recorded._asdict()}
+            for (source, target), recorded in entries.items()
+        ]
+        # Replacing the file in one step keeps the journal intact if we are interrupted while writing it
+        temporary_path = f"{self._path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+        with open(temporary_path, "w") as file:
+            json.dump({"transfers": transfers}, file, indent=2)
+        os.replace(temporary_path, self._path)
+
+
+class ResumableCopier:
+    """
+    Copies large files between the local machine and a remote filesystem, recording the progress
+    in a TransferJournal. A copy that finds its transfer in the journal continues at the last
+    confirmed offset, if the source did not change and the prefix on the local side still has
+    the recorded checksum. Everything else is copied with `fs.copy.copy_file`.
+
+    The remote filesystem has to support the `offset`, `on_progress` and `progress_interval` options
+    of `upload` and `download`, like PermissionChangingSSHFSDecorator.
+    """
+
+    def __init__(
+        self,
+        journal: TransferJournal,
+        checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+    ) -> None:
+        """
+        Args:
+            journal (TransferJournal): The journal to record the transfers in
+            checkpoint_interval (int): Files of at least this size are journaled, and their progress
+                is recorded whenever this many more bytes were transferred
+        """
+        self._journal = journal
+        self._checkpoint_interval = checkpoint_interval
+
+    def is_interrupted(
+        self, source_fs: fs.base.FS, source: str, target_fs: fs.base.FS, target: str
+    ) -> bool:
+        """
+        Checks whether an earlier copy of `source` to `target` was interrupted.
+        The partial target file may be overwritten by resuming the copy.
+        """
+        key = _key(source_fs, source, target_fs, target)
+        return key is not None and self._journal.get(*key) is not None
+
+    def copy_file(
+        self,
+        source_fs: fs.base.FS,
+        source: str,
+        target_fs: fs.base.FS,
+        target: str,
+        preserve_time: bool = False,
+    ) -> None:
+        """
+        Copies a file like `fs.copy.copy_file`, resuming an interrupted transfer if possible.
+        """
+        key = _key(source_fs, source, target_fs, target)
+        info = source_fs.getinfo(source, namespaces=["details"])
+        is_upload = source_fs.hassyspath(source) and not target_fs.hassyspath(target)
+        is_download = target_fs.hassyspath(target) and not source_fs.hassyspath(source)
+        if (
+            key is None
+            or not (is_upload or is_download)
+            or info.size < self._checkpoint_interval
+        ):
+            fscp.copy_file(
+                source_fs, source, target_fs, target, preserve_time=preserve_time
+            )
+            return
+
+        local_path = (
+            source_fs.getsyspath(source) if is_upload else target_fs.getsyspath(target)
+        )
+        entry = JournalEntry(info.size, _seconds(info.modified), 0, "")
+        offset, digest = self._resume_point(key, entry, target_fs, target, local_path)
+        entry = entry._replace(offset=offset, checksum=digest.hexdigest())
+        self._journal.record(*key, entry)
+
+        def checkpoint(confirmed_offset: int) -> None:
+            self._journal.record(
+                *key,
+                entry._replace(offset=confirmed_offset, checksum=digest.hexdigest()),
+            )
+
+        options: Dict[str, Any] = {
+            "offset": offset,
+            "on_progress": checkpoint,
+            "progress_interval": self._checkpoint_interval,
+        }
+        if is_upload:
+            with open(local_path, "rb") as local_file:
+                local_file.seek(offset)
+                with _HashingReader(local_file, digest) as reader:
+                    target_fs.upload(target, cast(BinaryIO, reader), **options)
+        else:
+            with open(local_path, "r+b" if offset else "wb") as partial_file:
+                partial_file.truncate(offset)
+                partial_file.seek(offset)
+                with _HashingWriter(partial_file, digest) as writer:
+                    source_fs.download(source, cast(BinaryIO, writer), **options)
+
+        self._journal.remove(*key)
+        if preserve_time:
+            fscp.copy_modified_time(source_fs, source, target_fs, target)
+
+    def _resume_point(
+        self,
+        key: _Key,
+        entry: JournalEntry,
+        target_fs: fs.base.FS,
+        target: str,
+        local_path: str,
+    ) -> Tuple[int, "hashlib._Hash"]:
+        recorded = self._journal.get(*key)
+        if (
+            recorded is None
+            or recorded.size != entry.size
+            or recorded.modified != entry.modified
+        ):
+            return 0, hashlib.sha256()
+
+        try:
+            target_size = target_fs.getsize(target)
+        except fs.errors.ResourceNotFound:
+            return 0, hashlib.sha256()
+
+        # Resumed uploads overwrite the partial file without truncating it first
+        if not recorded.offset <= target_size <= recorded.size:
+            return 0, hashlib.sha256()
+
+        digest = _hash_prefix(local_path, recorded.offset)
+        if digest is None or digest.hexdigest() != recorded.checksum:
+            return 0, hashlib.sha256()
+
+        return recorded.offset, digest
+
+
+class _HashingReader(io.RawIOBase):
+    """
+    Hashes everything that is read from a file. Closing it leaves the file open.
+    """
+
+    def __init__(self, file: BinaryIO, digest: "hashlib._Hash") -> None:
+        super().__init__()
+        self._file = file
+        self._digest = digest
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._file.read(size)
+        self._digest.update(data)
+        return data
+
+
+class _HashingWriter(io.RawIOBase):
+    """
+    Hashes everything that is written to a file. Closing it leaves the file open.
+    """
+
+    def __init__(self, file: BinaryIO, digest: "hashlib._Hash") -> None:
+        super().__init__()
+        self._file = file
+        self._digest = digest
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: "ReadableBuffer") -> int:
+        self._digest.update(data)
+        return self._file.write(data)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+
+def _key(
+    source_fs: fs.base.FS, source: str, target_fs: fs.base.FS, target: str
+) -> Optional[_Key]:
+    try:
+        return source_fs.geturl(source), target_fs.geturl(target)
+    except fs.errors.NoURL:
+        return None
+
+
+def _seconds(modified: Optional[datetime]) -> Optional[int]:
+    # SFTP only transfers whole seconds
+    return None if modified is None else int(modified.timestamp())
+
+
+def _hash_prefix(path: str, length: int) -> Optional["hashlib._Hash"]:
+    digest = hashlib.sha256()
+    remaining = length
+    with open(path, "rb") as file:
+        while remaining > 0:
+            block = file.read(min(remaining, _HASH_BLOCK_SIZE))
+            if not block:
+                return None
+
+            digest.update(block)
+            remaining -= len(block)
+
+    return digest
+
+
+def _load(path: str) -> Dict[_Key, JournalEntry]:
+    try:
+        with open(path) as file:
+            transfers = json.load(file)["transfers"]
+        return {
+            (transfer["source"], transfer["target"]): JournalEntry(
+                transfer["size"],
+                transfer["modified"],
+                transfer["offset"],
+                transfer["checksum"],
+            )
+            for transfer in transfers
+        }
+    except FileNotFoundError:
+        return {}
+    except (ValueError, KeyError, TypeError):
+        # A damaged journal only costs the progress of interrupted transfers
+        return {}
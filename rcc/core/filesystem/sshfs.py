@@ -1,40 +1,90 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from fs.errors import CreateFailed
+import paramiko as pm
+from paramiko import SSHException
 
 import rcc.core.ssh.chmodsshfs as sshfs
 from rcc.core.ssh.connectiondata import ConnectionData
-from rcc.core.ssh.sshexecutor import build_channel_with_proxyjumps
+from rcc.core.ssh.pool import ConnectionPool, default_pool
+from rcc.core.ssh.remotefind import RemoteFind
+from rcc.core.ssh.tarstream import RemoteTar
 from rcc.core.utils import SSHError
 from ._base import Filesystem
 from .pyfsbased import PyFilesystemBased
+from .resumable import DEFAULT_CHECKPOINT_INTERVAL, ResumableCopier, TransferJournal
 
 
 def sshfilesystem(
     connection_data: ConnectionData,
     proxyjumps: Optional[List[ConnectionData]] = None,
     dir: Optional[str] = None,
+    pool: Optional[ConnectionPool] = None,
+    chunk_size: int = sshfs.DEFAULT_CHUNK_SIZE,
+    window_size: Optional[int] = None,
+    prefetch_requests: int = sshfs.DEFAULT_PREFETCH_REQUESTS,
+    journal: Optional[TransferJournal] = None,
+    checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
 ) -> Filesystem:
     """
-    A PyFilesystem2 based Filesystem that connects to a remote machine via SSH
+    A PyFilesystem2 based Filesystem that connects to a remote machine via SSH.
+    The connection is taken from the pool and given back once the filesystem is closed.
 
     Args:
         user (str): The user on the remote machine
         host (str): The address of the remote machine
         password (str): The user's password on the remote machine. Alternative to `private_key`.
         private_key (str): The user's private SSH key. Alternative to `password`.
+        pool (ConnectionPool): The pool to take the SSH connection from. Defaults to the process wide pool.
+        chunk_size (int): The size of a single SFTP read or write request
+        window_size (int): The SSH window of every SFTP channel, i.e. how much data may be in flight.
+            Paramiko's default if None.
+        prefetch_requests (int): The maximum number of concurrent read requests of a download
+        journal (TransferJournal): Records the progress of large transfers, so they can be resumed
+            after an interruption. Transfers always start over if None.
+        checkpoint_interval (int): Files of at least this size are journaled, and their progress
+            is recorded whenever this many more bytes were transferred
     """
+    pool = pool or default_pool()
+
+    def connect() -> Tuple[sshfs.PermissionChangingSSHFSDecorator, pm.SSHClient]:
+        # Every SFTP session holds its own reference to the pooled client
+        client = pool.acquire(connection_data, proxyjumps)
+        try:
+            filesystem = sshfs.PermissionChangingSSHFSDecorator.from_client(
+                client,
+                connection_data,
+                chunk_size=chunk_size,
+                window_size=window_size,
+                prefetch_requests=prefetch_requests,
+                release=lambda: pool.release(client),
+            )
+        except BaseException:
+            pool.release(client)
+            raise
+
+        return filesystem, client
+
+    def open_sftp() -> sshfs.PermissionChangingSSHFSDecorator:
+        return connect()[0]
+
     try:
-        channel = build_channel_with_proxyjumps(connection_data, proxyjumps or [])
-        fs = sshfs.PermissionChangingSSHFSDecorator(
-            host=connection_data.hostname,
-            user=connection_data.username,
-            passwd=connection_data.password,
-            pkey=connection_data.key or connection_data.keyfile,
-            port=connection_data.port,
-            sock=channel,
-        )
+        fs, client = connect()
+    except (CreateFailed, SSHException, OSError) as err:
+        raise SSHError(f"Could not connect to {connection_data.hostname}") from err
 
+    try:
         dir = dir or fs.homedir()
-        return PyFilesystemBased(fs, dir, fs.homedir())
-    except CreateFailed as err:
+        return PyFilesystemBased(
+            fs,
+            dir,
+            fs.homedir(),
+            reopen=open_sftp,
+            remote_tar=RemoteTar(client),
+            remote_find=RemoteFind(client),
+            resumable=ResumableCopier(journal, checkpoint_interval)
+            if journal is not None
+            else None,
+        )
+    except (CreateFailed, SSHException, OSError) as err:
+        fs.close()
         raise SSHError(f"Could not connect to {connection_data.hostname}") from err
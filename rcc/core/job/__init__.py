@@ -1,22 +1,63 @@
 from .batch_job import BaseBatchJob
-from .job_status import TaskStatus, BaseJobStatus
+from .job_status import (
+    TaskStatus,
+    TaskRange,
+    BaseJobStatus,
+    FAILED_STATES,
+    is_failed_state,
+)
 from .job_watcher import (
     JobWatcherFactory,
     JobWatcherImpl,
     JobWatcher,
     JobStatusCallback,
+    NotWatchingError,
 )
 from .watcher_thread import WatcherThreadImpl
+from .status_poller import StatusPoller, PollerSubscription, default_poller
 from .job_watcher import WatcherThreadFactory
+from .push_watcher import PushWatcherThread, push_job_watcher
+from .output_follower import OutputFollower, OutputCallback
+from .status_diff import (
+    StatusDiff,
+    RangeTransition,
+    StatusDiffCallback,
+    DiffingCallback,
+    diff_statuses,
+)
+from .poll_policy import PollPolicy, FixedPollPolicy, AdaptivePollPolicy
+from .registry import JobRegistry, JobRecord, open_registry
 
 __all__ = [
     "BaseBatchJob",
     "BaseJobStatus",
     "TaskStatus",
+    "TaskRange",
+    "FAILED_STATES",
+    "is_failed_state",
     "JobWatcherFactory",
     "JobWatcherImpl",
     "WatcherThreadFactory",
+    "NotWatchingError",
     "WatcherThreadImpl",
+    "StatusPoller",
+    "PollerSubscription",
+    "default_poller",
+    "PushWatcherThread",
+    "push_job_watcher",
+    "OutputFollower",
+    "OutputCallback",
+    "StatusDiff",
+    "RangeTransition",
+    "StatusDiffCallback",
+    "DiffingCallback",
+    "diff_statuses",
+    "PollPolicy",
+    "FixedPollPolicy",
+    "AdaptivePollPolicy",
+    "JobRegistry",
+    "JobRecord",
+    "open_registry",
     "JobWatcher",
     "JobStatusCallback",
 ]
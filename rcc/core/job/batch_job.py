@@ -18,10 +18,18 @@ class BaseBatchJob:
         self._watcher_factory = watcher_factory or JobWatcherImpl
         self.jobid = jobid
 
+    @property
+    def controller(self) -> "BaseController":
+        return self._controller
+
     @abstractmethod
     def cancel(self) -> None:
         pass
 
+    @abstractmethod
+    def release(self) -> None:
+        pass
+
     @abstractmethod
     def poll_status(self) -> "BaseJobStatus":
         pass
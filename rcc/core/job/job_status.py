@@ -1,6 +1,20 @@
+import time
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, field
+from typing import List, NamedTuple, Optional
+
+# The states of tasks that ended without success. sacct appends details
+# to some states, e.g. "CANCELLED by 1000", only the first word is compared.
+FAILED_STATES = {
+    "BOOT_FAIL",
+    "CANCELLED",
+    "DEADLINE",
+    "FAILED",
+    "NODE_FAIL",
+    "OUT_OF_MEMORY",
+    "PREEMPTED",
+    "TIMEOUT",
+}
 
 
 @dataclass
@@ -10,12 +24,29 @@ class TaskStatus:
     state: str
 
 
+class TaskRange(NamedTuple):
+    """
+    Consecutive tasks of an array job that are in the same state
+    """
+
+    first: int
+    last: int
+    state: str
+
+    def __len__(self) -> int:
+        return self.last - self.first + 1
+
+
 @dataclass
 class BaseJobStatus(ABC):
     id: str
     name: str
     state: str
     tasks: List[TaskStatus]
+    # The time (seconds since the epoch) at which the job reaches its time limit, if known
+    time_limit_end: Optional[float] = field(default=None, compare=False)
+    # The tasks of an array job, merged into ranges of tasks in the same state
+    array_tasks: List[TaskRange] = field(default_factory=list)
 
     @classmethod
     @abstractmethod
@@ -27,6 +58,16 @@ class BaseJobStatus(ABC):
     def from_output(cls, output: List[str]) -> "BaseJobStatus":
         pass
 
+    @property
+    def time_left(self) -> Optional[float]:
+        """
+        Seconds until the job reaches its time limit, if known
+        """
+        if self.time_limit_end is None:
+            return None
+
+        return max(self.time_limit_end - time.time(), 0)
+
     @property
     @abstractmethod
     def is_pending(self) -> bool:
@@ -46,3 +87,28 @@ class BaseJobStatus(ABC):
     @abstractmethod
     def success(self) -> bool:
         pass
+
+    @property
+    def is_finished(self) -> bool:
+        """
+        Whether the job left the queue, successful or not. Jobs the cluster does not know
+        (yet or anymore) have an empty state and are not finished.
+        """
+        return bool(self.state) and not (self.is_running or self.is_pending)
+
+
+def is_failed_state(state: str) -> bool:
+    """
+    Checks whether a job or task ended without success in this state.
+    """
+    return state.split(" ", 1)[0] in FAILED_STATES
+
+
+def status_changed(
+    previous: Optional[BaseJobStatus], status: Optional[BaseJobStatus]
+) -> bool:
+    """
+    Checks whether a freshly polled status differs from the previous one. Controllers return
+    the previous status object for output that did not change, which skips comparing every task.
+    """
+    return status is not previous and status != previous
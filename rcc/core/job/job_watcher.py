@@ -1,7 +1,7 @@
 from typing import TYPE_CHECKING, Callable, Optional
 
-from rcc.core.utils import get_or_raise, NotWatchingError
-from .watcher_thread import WatcherThread, WatcherThreadImpl
+from .watcher_thread import WatcherThread
+from .status_poller import default_poller
 
 try:
     from typing import Protocol
@@ -15,7 +15,9 @@ if TYPE_CHECKING:
 
 
 JobStatusCallback = Callable[["BaseJobStatus"], None]
-WatcherThreadFactory = Callable[["BaseBatchJob", JobStatusCallback, int], WatcherThread]
+WatcherThreadFactory = Callable[
+    ["BaseBatchJob", JobStatusCallback, float], WatcherThread
+]
 
 
 class JobWatcher(Protocol):
@@ -31,6 +33,9 @@ class JobWatcher(Protocol):
     def wait_until_done(self) -> None:
         """
         Blocks until the job has been completed.
+
+        Raises:
+            Exception: The error that ended watching before the job completed, e.g. because polling kept failing
         """
 
     def stop(self) -> None:
@@ -42,14 +47,25 @@ class JobWatcher(Protocol):
 JobWatcherFactory = Callable[["BaseBatchJob"], JobWatcher]
 
 
+class NotWatchingError(RuntimeError):
+    def __init__(self, *args: object) -> None:
+        super().__init__(*args)
+
+
 class JobWatcherImpl:
     def __init__(
         self,
         runner: "BaseBatchJob",
-        thread_factory: WatcherThreadFactory = WatcherThreadImpl,
+        thread_factory: Optional[WatcherThreadFactory] = None,
     ) -> None:
+        """
+        Args:
+            runner (BaseBatchJob): The job to watch
+            thread_factory (WatcherThreadFactory): Creates the watcher of the job.
+                By default all jobs are polled by the StatusPoller shared by the process.
+        """
         self.runner = runner
-        self.factory = thread_factory
+        self.factory = thread_factory or default_poller().subscribe
         self.watching_thread: Optional[WatcherThread] = None
 
     def watch(self, callback: JobStatusCallback, poll_interval: int) -> None:
@@ -57,18 +73,26 @@ class JobWatcherImpl:
         self.watching_thread.start()
 
     def is_done(self) -> bool:
-        watching_thread = get_or_raise(self.watching_thread, NotWatchingError)
+        watching_thread = self._get_watching_thread()
         return watching_thread.is_done()
 
     def wait_until_done(self) -> None:
-        watching_thread = get_or_raise(self.watching_thread, NotWatchingError)
+        watching_thread = self._get_watching_thread()
         self._try_join(watching_thread)
+        if watching_thread.error is not None:
+            raise watching_thread.error
 
     def stop(self) -> None:
-        watching_thread = get_or_raise(self.watching_thread, NotWatchingError)
+        watching_thread = self._get_watching_thread()
         watching_thread.stop()
         self._try_join(watching_thread)
 
+    def _get_watching_thread(self) -> WatcherThread:
+        if self.watching_thread is None:
+            raise NotWatchingError()
+
+        return self.watching_thread
+
     def _try_join(self, watching_thread: WatcherThread) -> None:
         try:
             watching_thread.join()
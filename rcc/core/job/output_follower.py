@@ -0,0 +1,91 @@
+import threading
+from typing import IO, TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    from rcc.core.executor import RunningCommand
+    from .batch_job import BaseBatchJob
+
+OutputCallback = Callable[[str], None]
+
+# Time to wait for the rest of the output once the job finished
+DEFAULT_DRAIN_TIMEOUT = 5.0
+
+
+class OutputFollower:
+    """
+    Follows the output files of a job over a single command on the cluster,
+    see `Controller.stream_output`, and passes every line to a callback.
+    """
+
+    def __init__(
+        self,
+        batch_job: "BaseBatchJob",
+        callback: OutputCallback,
+        mirror_file: Optional[str] = None,
+    ) -> None:
+        """
+        Args:
+            batch_job (BaseBatchJob): The job whose output to follow
+            callback (OutputCallback): Receives every line of output without the line break
+            mirror_file (str): A local file every line is appended to as well
+        """
+        self._batch_job = batch_job
+        self._callback = callback
+        self._mirror_file = mirror_file
+        self._lock = threading.Lock()
+        self._command: Optional["RunningCommand"] = None
+        self._stopped = False
+        self._thread = threading.Thread(target=self._follow, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def finish(self, timeout: float = DEFAULT_DRAIN_TIMEOUT) -> None:
+        """
+        Waits for the command to pass on the last lines after the job finished, then stops following.
+
+        Args:
+            timeout (float): The maximum number of seconds to wait
+        """
+        self._thread.join(timeout)
+        self.stop()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stopped = True
+            command = self._command
+
+        if command is not None:
+            command.close()
+
+    def _follow(self) -> None:
+        try:
+            command = self._batch_job.controller.stream_output(self._batch_job.jobid)
+        except Exception:
+            # Following the output is a convenience, the job is watched either way
+            return
+
+        with self._lock:
+            if self._stopped:
+                command.close()
+                return
+
+            self._command = command
+
+        mirror: Optional[IO[str]] = None
+        try:
+            if self._mirror_file:
+                mirror = open(self._mirror_file, "a")
+
+            for line in command.lines():
+                if mirror is not None:
+                    mirror.write(line)
+                    mirror.flush()
+                self._callback(line.rstrip("\n"))
+        except Exception:
+            # A dropped channel only ends following the output
+            pass
+        finally:
+            if mirror is not None:
+                mirror.close()
+            command.close()
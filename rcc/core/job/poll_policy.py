@@ -0,0 +1,119 @@
+import random
+from typing import TYPE_CHECKING
+
+try:
+    from typing import Protocol
+except ImportError:  # pragma: no cover
+    from typing_extensions import Protocol  # type: ignore
+
+
+if TYPE_CHECKING:
+    from .job_status import BaseJobStatus
+
+
+class PollPolicy(Protocol):
+    def next_interval(
+        self,
+        requested: float,
+        previous: float,
+        status: "BaseJobStatus",
+        changed: bool,
+    ) -> float:
+        """
+        Decides how long to wait before the job is polled again.
+
+        Args:
+            requested (float): The poll interval requested by the job's watcher
+            previous (float): The interval used before the last poll
+            status (BaseJobStatus): The status returned by the last poll
+            changed (bool): Whether the last poll returned a different status than the one before
+
+        Returns:
+            float: The time until the next poll
+        """
+        ...
+
+    def delay(self, interval: float) -> float:
+        """
+        Returns the actual time to wait for a poll interval, e.g. with some randomness added.
+
+        Args:
+            interval (float): The interval returned by `next_interval`
+
+        Returns:
+            float
+        """
+        ...
+
+
+class FixedPollPolicy:
+    """
+    Polls every job at the interval requested by its watcher.
+    """
+
+    def next_interval(
+        self,
+        requested: float,
+        previous: float,
+        status: "BaseJobStatus",
+        changed: bool,
+    ) -> float:
+        return requested
+
+    def delay(self, interval: float) -> float:
+        return interval
+
+
+class AdaptivePollPolicy:
+    """
+    Adapts the poll interval of every job to its state. Pending jobs are polled less and less often,
+    running jobs back off up to the interval requested by their watcher. A changed status and a job
+    that is about to reach its time limit are polled at the minimum interval again. Every delay is
+    randomized a little, so jobs watched at the same interval do not all poll at once.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 1,
+        max_interval: float = 300,
+        backoff: float = 2,
+        jitter: float = 0.1,
+    ) -> None:
+        """
+        Args:
+            min_interval (float): The interval right after a status change. Watchers that request
+                a shorter interval are polled at their interval instead.
+            max_interval (float): The longest interval for pending jobs. Watchers that request
+                a longer interval are polled at their interval instead.
+            backoff (float): The factor the interval grows by while the status does not change
+            jitter (float): The fraction every delay is randomly lengthened or shortened by
+        """
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._backoff = backoff
+        self._jitter = jitter
+
+    def next_interval(
+        self,
+        requested: float,
+        previous: float,
+        status: "BaseJobStatus",
+        changed: bool,
+    ) -> float:
+        lower = min(self._min_interval, requested)
+        if changed:
+            return lower
+
+        upper = requested
+        if status.is_pending:
+            upper = max(self._max_interval, requested)
+
+        interval = min(max(previous * self._backoff, lower), upper)
+        if status.is_running and status.time_left is not None:
+            # Poll shortly after the job hits its time limit instead of up to an interval later
+            interval = min(interval, max(status.time_left, lower))
+
+        return interval
+
+    def delay(self, interval: float) -> float:
+        return interval * random.uniform(1 - self._jitter, 1 + self._jitter)
@@ -0,0 +1,155 @@
+import threading
+from typing import TYPE_CHECKING, Callable, Optional
+
+from .job_status import status_changed
+from .job_watcher import JobWatcherImpl, WatcherThreadFactory
+from .status_poller import default_poller
+from .watcher_thread import WatcherThread
+
+if TYPE_CHECKING:
+    from rcc.core.executor import RunningCommand
+    from .batch_job import BaseBatchJob
+    from .job_status import BaseJobStatus
+
+# The remote command sends a heartbeat about every second, a longer silence means the channel dropped
+DEFAULT_HEARTBEAT_TIMEOUT = 15.0
+
+
+class PushWatcherThread(threading.Thread):
+    """
+    Watches a job through a long-lived command on the cluster that reports every state change
+    as soon as it happens, see `Controller.stream_state_changes`. The full status is only polled
+    when the state changed. If the controller cannot stream, the channel drops, or the job still
+    looks active once the stream ended, the job is polled like any other job instead.
+    Implements the WatcherThread protocol.
+    """
+
+    def __init__(
+        self,
+        runner: "BaseBatchJob",
+        callback: Callable[["BaseJobStatus"], None],
+        interval: float,
+        fallback_factory: Optional[WatcherThreadFactory] = None,
+        heartbeat_timeout: float = DEFAULT_HEARTBEAT_TIMEOUT,
+    ) -> None:
+        """
+        Args:
+            runner (BaseBatchJob): The job to watch
+            callback (Callable): Receives every status change of the job
+            interval (float): The poll interval if the job has to be polled
+            fallback_factory (WatcherThreadFactory): Creates the watcher that polls the job,
+                the process-wide StatusPoller by default
+            heartbeat_timeout (float): The time without any output after which the channel counts as dropped
+        """
+        super().__init__(target=self.watch, daemon=True)
+        self.runner = runner
+        self.callback = callback
+        self.interval = interval
+        self._fallback_factory = fallback_factory or default_poller().subscribe
+        self._heartbeat_timeout = heartbeat_timeout
+        self._lock = threading.Lock()
+        self._command: Optional["RunningCommand"] = None
+        self._fallback: Optional[WatcherThread] = None
+        self._last_status: Optional["BaseJobStatus"] = None
+        self._stopped = False
+        self._done = False
+
+    def watch(self) -> None:
+        try:
+            if self._watch_stream():
+                return
+        except Exception:
+            # Polling below finds out whether the job is still running
+            pass
+        finally:
+            self._close_command()
+
+        with self._lock:
+            if self._stopped:
+                return
+
+            self._fallback = self._fallback_factory(
+                self.runner, self._on_polled, self.interval
+            )
+            self._fallback.start()
+
+    def _watch_stream(self) -> bool:
+        command = self.runner.controller.stream_state_changes(self.runner.jobid)
+        with self._lock:
+            if self._stopped:
+                command.close()
+                return True
+
+            self._command = command
+
+        streamed_state = ""
+        for line in command.lines(self._heartbeat_timeout):
+            if self._stopped:
+                return True
+
+            # Empty lines are heartbeats, the status is only polled when the streamed state changed
+            state = line.strip()
+            if not state or state == streamed_state:
+                continue
+
+            streamed_state = state
+            if self._update(self.runner.poll_status()):
+                return True
+
+        # The job left the queue, the accounting database has the final state
+        return self._stopped or self._update(self.runner.poll_status())
+
+    def _update(self, status: "BaseJobStatus") -> bool:
+        # The stream can report a job before the accounting database knows it, an empty state is not done
+        self._done = status.is_finished
+        if status_changed(self._last_status, status):
+            self.callback(status)
+            self._last_status = status
+
+        return self._done
+
+    def _on_polled(self, status: "BaseJobStatus") -> None:
+        self._update(status)
+
+    def _close_command(self) -> None:
+        with self._lock:
+            command, self._command = self._command, None
+
+        if command is not None:
+            command.close()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stopped = True
+            fallback = self._fallback
+
+        self._close_command()
+        if fallback is not None:
+            fallback.stop()
+
+    def is_done(self) -> bool:
+        return self._done
+
+    @property
+    def error(self) -> Optional[BaseException]:
+        # The stream itself falls back to polling on errors, only polling can fail for good
+        with self._lock:
+            fallback = self._fallback
+
+        return fallback.error if fallback is not None else None
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        super().join(timeout)
+        with self._lock:
+            fallback = self._fallback
+
+        if fallback is not None:
+            fallback.join(timeout)
+
+
+def push_job_watcher(runner: "BaseBatchJob") -> JobWatcherImpl:
+    """
+    A JobWatcherFactory for watchers that learn about state changes from the cluster
+    instead of polling for them.
+    """
+    return JobWatcherImpl(runner, thread_factory=PushWatcherThread)
@@ -0,0 +1,276 @@
+import atexit
+import dataclasses
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .job_status import BaseJobStatus
+
+DEFAULT_REGISTRY_PATH = os.path.join("~", ".rcc", "jobs.db")
+
+# Statuses of running jobs are written at most this often, statuses of finished jobs right away
+DEFAULT_FLUSH_INTERVAL = 2.0
+
+# How long to wait for another process that writes to the database
+_BUSY_TIMEOUT = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    host TEXT NOT NULL,
+    jobid TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    state TEXT NOT NULL DEFAULT '',
+    finished INTEGER NOT NULL DEFAULT 0,
+    submitted_at REAL,
+    updated_at REAL NOT NULL,
+    config TEXT NOT NULL DEFAULT '{}',
+    status TEXT,
+    PRIMARY KEY (host, jobid)
+);
+CREATE INDEX IF NOT EXISTS jobs_by_update ON jobs (updated_at);
+"""
+
+_RECORD_SUBMISSION = """
+INSERT INTO jobs (host, jobid, submitted_at, updated_at, config)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (host, jobid) DO UPDATE SET
+    submitted_at = excluded.submitted_at,
+    updated_at = excluded.updated_at,
+    config = excluded.config
+"""
+
+_RECORD_STATUS = """
+INSERT INTO jobs (host, jobid, name, state, finished, updated_at, status)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (host, jobid) DO UPDATE SET
+    name = excluded.name,
+    state = excluded.state,
+    finished = excluded.finished,
+    updated_at = excluded.updated_at,
+    status = excluded.status
+"""
+
+_COLUMNS = (
+    "host, jobid, name, state, finished, submitted_at, updated_at, config, status"
+)
+
+
+@dataclass
+class JobRecord:
+    """
+    A job in the registry
+
+    config: The launch options the job was submitted with, without credentials
+    status: The last known status as a dictionary of the status' fields, None if the job was never polled
+    """
+
+    host: str
+    jobid: str
+    name: str
+    state: str
+    finished: bool
+    submitted_at: Optional[float]
+    updated_at: float
+    config: Dict[str, Any]
+    status: Optional[Dict[str, Any]]
+
+
+class JobRegistry:
+    """
+    A local SQLite database of the submitted jobs and their last known status. The database
+    runs in WAL mode, so processes reading it are not blocked by the one writing it.
+    Statuses are collected in memory and written in a single transaction per flush interval.
+    """
+
+    def __init__(
+        self, path: str, flush_interval: float = DEFAULT_FLUSH_INTERVAL
+    ) -> None:
+        """
+        Args:
+            path (str): The database file, created with its directory if it does not exist
+            flush_interval (float): The maximum time in seconds a status of a running job is kept in memory
+        """
+        path = os.path.expanduser(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._connection = sqlite3.connect(
+            path, timeout=_BUSY_TIMEOUT, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # A crash may lose the last transaction, but never corrupts the database
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._flush_interval = flush_interval
+        self._pending: Dict[Tuple[str, str], Tuple[BaseJobStatus, float]] = {}
+        self._pending_changed = threading.Condition()
+        self._flusher: Optional[threading.Thread] = None
+        self._closed = False
+
+    def record_submission(self, host: str, jobid: str, config: Dict[str, Any]) -> None:
+        """
+        Records a submitted job.
+
+        Args:
+            host (str): The cluster the job was submitted to
+            jobid (str): The ID of the job
+            config (dict): The options the job was submitted with, must not contain credentials
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                _RECORD_SUBMISSION,
+                (host, jobid, now, now, json.dumps(config, default=str)),
+            )
+
+    def record_status(self, host: str, jobid: str, status: BaseJobStatus) -> None:
+        """
+        Records the latest status of a job. The status is written with the next flush,
+        right away if the job finished.
+
+        Args:
+            host (str): The cluster the job runs on
+            jobid (str): The ID of the job
+            status (BaseJobStatus): The status
+        """
+        with self._pending_changed:
+            if self._closed:
+                return
+
+            self._pending[(host, jobid)] = (status, time.time())
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._flush_regularly, daemon=True
+                )
+                self._flusher.start()
+            if status.is_finished:
+                self._pending_changed.notify()
+
+    def flush(self) -> None:
+        """
+        Writes all statuses recorded so far.
+        """
+        # Taking the statuses and writing them is one step, otherwise a concurrent flush
+        # could write newer statuses first and have them overwritten by older ones
+        with self._lock:
+            with self._pending_changed:
+                pending, self._pending = self._pending, {}
+
+            if not pending:
+                return
+
+            rows = [
+                (
+                    host,
+                    jobid,
+                    status.name,
+                    status.state,
+                    status.is_finished,
+                    recorded_at,
+                    json.dumps(dataclasses.asdict(status)),
+                )
+                for (host, jobid), (status, recorded_at) in pending.items()
+            ]
+            with self._connection:
+                self._connection.executemany(_RECORD_STATUS, rows)
+
+    def get(self, host: str, jobid: str) -> Optional[JobRecord]:
+        """
+        Returns the record of a job, None if the job is not in the registry.
+        """
+        self.flush()
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE host = ? AND jobid = ?",
+                (host, jobid),
+            ).fetchone()
+
+        return None if row is None else _record(row)
+
+    def jobs(self, host: Optional[str] = None, limit: int = 50) -> List[JobRecord]:
+        """
+        Returns the most recently updated jobs.
+
+        Args:
+            host (str): Only return jobs on this cluster
+            limit (int): The maximum number of jobs
+
+        Returns:
+            list[JobRecord]: The jobs, the most recently updated first
+        """
+        self.flush()
+        query = f"SELECT {_COLUMNS} FROM jobs"
+        parameters: Tuple[Any, ...] = ()
+        if host is not None:
+            query += " WHERE host = ?"
+            parameters = (host,)
+        query += " ORDER BY updated_at DESC LIMIT ?"
+        with self._lock:
+            rows = self._connection.execute(query, (*parameters, limit)).fetchall()
+
+        return [_record(row) for row in rows]
+
+    def close(self) -> None:
+        """
+        Writes the remaining statuses and closes the database.
+        """
+        with self._pending_changed:
+            if self._closed:
+                return
+            self._closed = True
+            self._pending_changed.notify()
+            flusher = self._flusher
+
+        if flusher is not None:
+            flusher.join()
+        self.flush()
+        with self._lock:
+            self._connection.close()
+
+    def _flush_regularly(self) -> None:
+        while True:
+            with self._pending_changed:
+                if self._closed:
+                    return
+                self._pending_changed.wait(self._flush_interval)
+                if self._closed:
+                    return
+
+            self.flush()
+
+
+_registries: Dict[str, JobRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def open_registry(path: str = DEFAULT_REGISTRY_PATH) -> JobRegistry:
+    """
+    Returns the registry stored at the path, shared by everything in the process that uses it.
+    Shared registries are closed when the interpreter exits.
+    """
+    path = os.path.abspath(os.path.expanduser(path))
+    with _registries_lock:
+        if path not in _registries:
+            registry = JobRegistry(path)
+            atexit.register(registry.close)
+            _registries[path] = registry
+
+        return _registries[path]
+
+
+def _record(row: Tuple[Any, ...]) -> JobRecord:
+    host, jobid, name, state, finished, submitted_at, updated_at, config, status = row
+    return JobRecord(
+        host=host,
+        jobid=jobid,
+        name=name,
+        state=state,
+        finished=bool(finished),
+        submitted_at=submitted_at,
+        updated_at=updated_at,
+        config=json.loads(config),
+        status=None if status is None else json.loads(status),
+    )
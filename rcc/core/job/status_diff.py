@@ -0,0 +1,116 @@
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .job_status import BaseJobStatus, TaskRange
+
+
+class RangeTransition(NamedTuple):
+    """
+    Consecutive array tasks that moved from one state to another.
+    The previous state is None for tasks that were not known before.
+    """
+
+    first: int
+    last: int
+    previous_state: Optional[str]
+    state: str
+
+
+class StatusDiff(NamedTuple):
+    """
+    The tasks of a job that changed their state between two statuses
+
+    tasks: The new state of every changed task, together with its previous state
+    array_tasks: The changed array tasks, merged into ranges
+    """
+
+    tasks: Dict[str, Tuple[Optional[str], str]]
+    array_tasks: List[RangeTransition]
+
+
+StatusDiffCallback = Callable[[BaseJobStatus, StatusDiff], None]
+
+
+class DiffingCallback:
+    """
+    Adapts a callback that wants to know which tasks changed to a JobStatusCallback.
+    Watchers only call it for statuses that changed, so the diff is computed once per change.
+    """
+
+    def __init__(self, callback: StatusDiffCallback) -> None:
+        self._callback = callback
+        self._previous: Optional[BaseJobStatus] = None
+
+    def __call__(self, status: BaseJobStatus) -> None:
+        diff = diff_statuses(self._previous, status)
+        self._previous = status
+        self._callback(status, diff)
+
+
+def diff_statuses(
+    previous: Optional[BaseJobStatus], status: BaseJobStatus
+) -> StatusDiff:
+    """
+    Finds the tasks that changed their state. Array tasks are compared range by range,
+    so the work grows with the number of ranges, not the number of tasks.
+    """
+    previous_tasks = (
+        {} if previous is None else {task.id: task.state for task in previous.tasks}
+    )
+    tasks = {
+        task.id: (previous_tasks.get(task.id), task.state)
+        for task in status.tasks
+        if previous_tasks.get(task.id) != task.state
+    }
+    previous_ranges = [] if previous is None else previous.array_tasks
+    return StatusDiff(tasks, _diff_ranges(previous_ranges, status.array_tasks))
+
+
+def _diff_ranges(
+    previous: List[TaskRange], current: List[TaskRange]
+) -> List[RangeTransition]:
+    transitions: List[RangeTransition] = []
+    position = 0
+    for task_range in current:
+        start = task_range.first
+        # Ranges are sorted and do not overlap, earlier ones cannot overlap later current ranges
+        while position < len(previous) and previous[position].last < start:
+            position += 1
+
+        index = position
+        while start <= task_range.last:
+            if index < len(previous) and previous[index].first <= start:
+                old = previous[index]
+                end = min(old.last, task_range.last)
+                if old.state != task_range.state:
+                    _append(transitions, start, end, old.state, task_range.state)
+                index += 1
+            else:
+                # Tasks that were not known before, up to the next known range
+                end = task_range.last
+                if index < len(previous):
+                    end = min(end, previous[index].first - 1)
+                _append(transitions, start, end, None, task_range.state)
+
+            start = end + 1
+
+    return transitions
+
+
+def _append(
+    transitions: List[RangeTransition],
+    first: int,
+    last: int,
+    previous_state: Optional[str],
+    state: str,
+) -> None:
+    if transitions:
+        latest = transitions[-1]
+        if (
+            latest.last + 1 == first
+            and latest.previous_state == previous_state
+            and latest.state == state
+        ):
+            transitions[-1] = latest._replace(last=last)
+            return
+
+    transitions.append(RangeTransition(first, last, previous_state, state))
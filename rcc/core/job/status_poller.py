@@ -0,0 +1,339 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Set
+
+from .job_status import status_changed
+from .poll_policy import PollPolicy, AdaptivePollPolicy
+
+if TYPE_CHECKING:
+    from rcc.core.controller import BaseController
+    from .batch_job import BaseBatchJob
+    from .job_status import BaseJobStatus
+    from .job_watcher import JobStatusCallback
+
+_logger = logging.getLogger(__name__)
+
+# A job is given up on after this many polls in a row failed
+DEFAULT_MAX_POLL_FAILURES = 5
+# The longest delay between two polls while polling fails
+_MAX_BACKOFF = 300.0
+
+
+class PollerSubscription:
+    """
+    A single job watched by a StatusPoller. Implements the WatcherThread protocol.
+    """
+
+    def __init__(
+        self,
+        poller: "StatusPoller",
+        runner: "BaseBatchJob",
+        callback: "JobStatusCallback",
+        interval: float,
+    ) -> None:
+        self.runner = runner
+        self.callback = callback
+        self.requested_interval = interval
+        # The interval before the next poll, as decided by the poller's PollPolicy
+        self.interval = interval
+        # The number of polls in a row that failed
+        self.failures = 0
+        self._poller = poller
+        self._last_status: Optional["BaseJobStatus"] = None
+        self._finished = threading.Event()
+        self._done = False
+        self._error: Optional[BaseException] = None
+
+    def start(self) -> None:
+        self._poller.add(self)
+
+    def stop(self) -> None:
+        self._poller.remove(self)
+        self._finished.set()
+
+    def is_done(self) -> bool:
+        return self._done
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        self._finished.wait(timeout)
+
+    @property
+    def last_status(self) -> Optional["BaseJobStatus"]:
+        return self._last_status
+
+    @property
+    def error(self) -> Optional[BaseException]:
+        return self._error
+
+    def update(self, status: "BaseJobStatus") -> bool:
+        """
+        Passes a freshly polled status to the subscription.
+
+        Returns:
+            bool: True if the job is done and no longer needs to be polled
+        """
+        self.failures = 0
+        self._done = status.is_finished
+
+        if status_changed(self._last_status, status):
+            self.callback(status)
+            self._last_status = status
+
+        if self._done:
+            self._finished.set()
+
+        return self._done
+
+    def abort(self, error: Optional[BaseException] = None) -> None:
+        """
+        Ends the subscription without a final status, e.g. because polling failed.
+
+        Args:
+            error (BaseException): The reason, reported as the subscription's error
+        """
+        self._error = error
+        self._finished.set()
+
+
+class StatusPoller:
+    """
+    Polls the status of all subscribed jobs from a single background thread.
+    Every subscription has its own deadline for the next poll, kept in a priority queue.
+    Due jobs that belong to the same controller are polled with a single query, together with
+    the jobs of that controller that would be due shortly after. If a query fails, its jobs are
+    polled again with an exponential backoff, and aborted with the error once too many polls failed.
+    """
+
+    def __init__(
+        self,
+        interval: Optional[float] = None,
+        policy: Optional[PollPolicy] = None,
+        max_failures: int = DEFAULT_MAX_POLL_FAILURES,
+    ) -> None:
+        """
+        Args:
+            interval (float): Polls every job at this interval instead of the one requested by its watcher
+            policy (PollPolicy): Decides the interval between two polls of a job, AdaptivePollPolicy by default
+            max_failures (int): Aborts a subscription once this many polls of its job failed in a row
+        """
+        self._interval = interval
+        self._policy = policy or AdaptivePollPolicy()
+        self._max_failures = max_failures
+        # The next poll of every subscription, ordered by deadline. Stopped subscriptions are skipped
+        self._schedule: List[_ScheduledPoll] = []
+        self._subscriptions: Set[PollerSubscription] = set()
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(
+        self, runner: "BaseBatchJob", callback: "JobStatusCallback", interval: float
+    ) -> PollerSubscription:
+        """
+        Creates a subscription for a job. Matches the WatcherThreadFactory signature,
+        so the poller can be plugged into JobWatcherImpl.
+
+        Args:
+            runner (BaseBatchJob): The job to watch
+            callback (JobStatusCallback): Receives every status change of the job
+            interval (float): The time between two polls of the job
+
+        Returns:
+            PollerSubscription: The subscription, which starts polling once it is started
+        """
+        if self._interval is not None:
+            interval = self._interval
+
+        return PollerSubscription(self, runner, callback, interval)
+
+    def add(self, subscription: PollerSubscription) -> None:
+        with self._condition:
+            self._subscriptions.add(subscription)
+            self._schedule_poll(subscription, time.monotonic())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._poll, daemon=True)
+                self._thread.start()
+
+            self._condition.notify()
+
+    def remove(self, subscription: PollerSubscription) -> None:
+        with self._condition:
+            self._subscriptions.discard(subscription)
+
+    def _schedule_poll(self, subscription: PollerSubscription, now: float) -> None:
+        delay = self._policy.delay(subscription.interval)
+        if subscription.failures:
+            delay = min(delay * 2**subscription.failures, max(delay, _MAX_BACKOFF))
+        deadline = now + delay
+        heapq.heappush(
+            self._schedule,
+            _ScheduledPoll(deadline, next(self._counter), subscription),
+        )
+
+    def _poll(self) -> None:
+        error: Optional[Exception] = None
+        try:
+            self._poll_until_idle()
+        except Exception as err:
+            _logger.exception("Polling jobs failed")
+            error = err
+        finally:
+            with self._condition:
+                if self._thread is threading.current_thread():
+                    self._thread = None
+                # Nothing polls the remaining jobs anymore, their watches end with the error
+                aborted = self._subscriptions if error is not None else set()
+                if aborted:
+                    self._subscriptions = set()
+                    self._schedule = []
+
+            for subscription in aborted:
+                subscription.abort(error)
+
+    def _poll_until_idle(self) -> None:
+        while True:
+            due = self._wait_for_due_polls()
+            if due is None:
+                return
+
+            for controller, group in _group_by_controller(due).items():
+                self._poll_group(controller, group)
+
+            now = time.monotonic()
+            with self._condition:
+                for subscription in due:
+                    if subscription in self._subscriptions:
+                        self._schedule_poll(subscription, now)
+
+    def _wait_for_due_polls(self) -> Optional[List[PollerSubscription]]:
+        with self._condition:
+            while True:
+                while self._schedule and (
+                    self._schedule[0].subscription not in self._subscriptions
+                ):
+                    heapq.heappop(self._schedule)
+
+                if not self._schedule:
+                    self._thread = None
+                    return None
+
+                timeout = self._schedule[0].deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+
+                self._condition.wait(timeout)
+
+            now = time.monotonic()
+            due: List[PollerSubscription] = []
+            while self._schedule and self._schedule[0].deadline <= now:
+                subscription = heapq.heappop(self._schedule).subscription
+                if subscription in self._subscriptions:
+                    due.append(subscription)
+
+            return due + self._take_early_polls(due, now)
+
+    def _take_early_polls(
+        self, due: List[PollerSubscription], now: float
+    ) -> List[PollerSubscription]:
+        # A query is sent for these controllers anyway, jobs that are due soon can be part of it
+        controllers = {subscription.runner.controller for subscription in due}
+        early = [
+            scheduled
+            for scheduled in self._schedule
+            if scheduled.subscription in self._subscriptions
+            and scheduled.subscription.runner.controller in controllers
+            and scheduled.deadline
+            <= now + scheduled.subscription.interval * _EARLY_POLL_FRACTION
+        ]
+        if early:
+            taken = {scheduled.sequence for scheduled in early}
+            self._schedule = [
+                scheduled
+                for scheduled in self._schedule
+                if scheduled.sequence not in taken
+            ]
+            heapq.heapify(self._schedule)
+
+        return [scheduled.subscription for scheduled in early]
+
+    def _poll_group(
+        self, controller: "BaseController", subscriptions: List[PollerSubscription]
+    ) -> None:
+        jobids = list({subscription.runner.jobid for subscription in subscriptions})
+        try:
+            statuses = controller.poll_statuses(jobids)
+        except Exception as err:
+            # Often a transient SSH or cluster error, the jobs are polled again later
+            _logger.warning("Polling jobs %s failed: %s", ", ".join(jobids), err)
+            for subscription in subscriptions:
+                subscription.failures += 1
+                if subscription.failures >= self._max_failures:
+                    self.remove(subscription)
+                    subscription.abort(err)
+            return
+
+        for subscription in subscriptions:
+            status = statuses[subscription.runner.jobid]
+            changed = status_changed(subscription.last_status, status)
+            try:
+                done = subscription.update(status)
+            except Exception as err:
+                # A failing callback must not stop the other jobs from being watched
+                _logger.warning(
+                    "Handling the status of job %s failed: %s",
+                    subscription.runner.jobid,
+                    err,
+                )
+                done = True
+                subscription.abort(err)
+
+            if done:
+                self.remove(subscription)
+            else:
+                subscription.interval = self._policy.next_interval(
+                    subscription.requested_interval,
+                    subscription.interval,
+                    status,
+                    changed,
+                )
+
+
+# Jobs are polled early if they would be due within this fraction of their interval
+_EARLY_POLL_FRACTION = 0.25
+
+
+class _ScheduledPoll(NamedTuple):
+    deadline: float
+    # Breaks ties between equal deadlines, subscriptions are not comparable
+    sequence: int
+    subscription: PollerSubscription
+
+
+_default_poller: Optional[StatusPoller] = None
+_default_poller_lock = threading.Lock()
+
+
+def default_poller() -> StatusPoller:
+    """
+    Returns the StatusPoller shared by all watchers of this process.
+    """
+    global _default_poller
+    with _default_poller_lock:
+        if _default_poller is None:
+            _default_poller = StatusPoller()
+
+        return _default_poller
+
+
+def _group_by_controller(
+    subscriptions: List[PollerSubscription],
+) -> Dict["BaseController", List[PollerSubscription]]:
+    groups: Dict["BaseController", List[PollerSubscription]] = defaultdict(list)
+    for subscription in subscriptions:
+        groups[subscription.runner.controller].append(subscription)
+
+    return groups
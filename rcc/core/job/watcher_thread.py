@@ -1,6 +1,8 @@
 import threading
 from typing import TYPE_CHECKING, Callable, Optional
 
+from .job_status import status_changed
+
 try:
     from typing import Protocol
 except ImportError:  # pragma: no cover
@@ -42,6 +44,13 @@ class WatcherThread(Protocol):
             timeout (float): An optional timeout for joining
         """
 
+    @property
+    def error(self) -> Optional[BaseException]:
+        """
+        The error that ended watching before the job finished, None if there was none
+        """
+        ...
+
 
 class WatcherThreadImpl(threading.Thread):
     def __init__(
@@ -56,14 +65,21 @@ class WatcherThreadImpl(threading.Thread):
         self.interval = interval
         self.stop_event = threading.Event()
         self._done = False
+        self._error: Optional[BaseException] = None
 
     def poll(self) -> None:
+        try:
+            self._poll()
+        except Exception as err:
+            self._error = err
+
+    def _poll(self) -> None:
         last_job = None
         while not self.stop_event.wait(self.interval):
             job = self.runner.poll_status()
             self._done = not (job.is_running or job.is_pending)
 
-            if job != last_job:
+            if status_changed(last_job, job):
                 self.callback(job)
                 last_job = job
 
@@ -75,3 +91,7 @@ class WatcherThreadImpl(threading.Thread):
 
     def is_done(self) -> bool:
         return self._done
+
+    @property
+    def error(self) -> Optional[BaseException]:
+        return self._error
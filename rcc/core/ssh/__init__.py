@@ -1,4 +1,14 @@
 from .sshexecutor import SSHExecutor, SSHError
 from .connectiondata import ConnectionData
+from .pool import ConnectionPool, default_pool
+from .shaping import LinkConditions, ShapedSocket
 
-__all__ = ["SSHExecutor", "SSHError", "ConnectionData"]
+__all__ = [
+    "SSHExecutor",
+    "SSHError",
+    "ConnectionData",
+    "ConnectionPool",
+    "default_pool",
+    "LinkConditions",
+    "ShapedSocket",
+]
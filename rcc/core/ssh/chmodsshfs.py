@@ -1,69 +1,289 @@
+import shlex
 import stat
 from typing import (
-    TYPE_CHECKING,
     Any,
     BinaryIO,
+    Callable,
     Collection,
+    ContextManager,
     Iterator,
     List,
     Mapping,
     Optional,
+    Protocol,
     Text,
     Tuple,
     cast,
 )
 
 import fs.sshfs.sshfs as sshfs
+import paramiko as pm
 from fs.base import FS
 from fs.info import Info
 from fs.permissions import Permissions
+from fs.sshfs.error_tools import convert_sshfs_errors
 from fs.subfs import SubFS
+from paramiko.sftp import (
+    CMD_HANDLE,
+    CMD_OPEN,
+    SFTP_FLAG_CREATE,
+    SFTP_FLAG_TRUNC,
+    SFTP_FLAG_WRITE,
+)
+
+from .connectiondata import ConnectionData
+
+# The size of a single SFTP read or write request
+DEFAULT_CHUNK_SIZE = 32768
+# How often transfers report their progress, if they are asked to
+DEFAULT_PROGRESS_INTERVAL = 64 * 1024 * 1024
+# How many read requests of a download may be in flight, bounds the memory of the prefetch buffer
+DEFAULT_PREFETCH_REQUESTS = 128
+
+# fs.sshfs does not annotate its helpers
+_convert_sshfs_errors = cast(
+    Callable[[Text, Text], ContextManager[None]], convert_sshfs_errors
+)
+# Opening a file with its permissions in the same request needs paramiko's private request API
+_CAN_OPEN_WITH_ATTRIBUTES = hasattr(pm.SFTPClient, "_request") and hasattr(
+    pm.SFTPClient, "_adjust_cwd"
+)
+
 
-if TYPE_CHECKING:
-    from fs.base import _OpendirFactory
+class _Readable(Protocol):
+    def read(self, size: int, /) -> bytes:
+        ...
+
+
+class _Writable(Protocol):
+    def write(self, data: bytes, /) -> Any:
+        ...
+
+
+class SharedClientSSHFS(sshfs.SSHFS):
+    """
+    A SSHFS that runs its SFTP session on an already connected SSHClient instead of opening its own connection.
+    Closing the filesystem only closes the SFTP channel and calls `release`, the client stays connected.
+    """
+
+    def __init__(
+        self,
+        client: pm.SSHClient,
+        connection: ConnectionData,
+        timeout: int = 10,
+        window_size: Optional[int] = None,
+        release: Optional[Callable[[], None]] = None,
+    ) -> None:
+        FS.__init__(self)
+        self._release = release
+        self._user = connection.username
+        self._host = connection.hostname
+        self._port = connection.port
+        self._client = client
+        self._timeout = timeout
+        self._exec_timeout = timeout
+        transport = client.get_transport()
+        if transport is None:
+            raise pm.SSHException("The client is not connected")
+
+        sftp = pm.SFTPClient.from_transport(transport, window_size=window_size)
+        if sftp is None:
+            raise pm.SSHException("Could not open an SFTP session")
+
+        self._sftp = sftp
+
+    def close(self) -> None:
+        # Does not call SSHFS.close, which would close the shared client
+        if self._closed:
+            return
+
+        self._closed = True
+        try:
+            self._sftp.close()
+            if self._release is not None:
+                self._release()
+        except Exception:
+            # FS.__del__ also closes filesystems during interpreter shutdown,
+            # when the shared transport and paramiko may already be torn down
+            pass
+
+    def hash(self, path: Text, name: Text) -> Text:
+        # Hashes on the remote machine instead of downloading the whole file
+        if name == "sha256":
+            digest = self._remote_sha256(self.validatepath(path))
+            if digest is not None:
+                return digest
+
+        return super().hash(path, name)
+
+    def _remote_sha256(self, path: Text) -> Optional[Text]:
+        _, stdout, _ = self._client.exec_command(f"sha256sum {shlex.quote(path)}")
+        output = stdout.read().split()
+        if stdout.channel.recv_exit_status() != 0 or not output:
+            return None
+
+        return output[0].decode()
 
 
 class PermissionChangingSSHFSDecorator(FS):
     """
-    A subclass of SSHFS that changes the permissions of the remote file after upload.
+    A subclass of SSHFS that makes uploaded files readable, writable and executable by their owner.
+    Transfers use pipelined SFTP requests, downloads prefetch a bounded number of requests ahead.
     """
 
+    # The permissions of uploaded files
+    UPLOAD_MODE = stat.S_IRWXU
+
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__()
         self._internal_fs: FS = sshfs.SSHFS(*args, **kwargs)  # type: ignore
+        self._chunk_size = DEFAULT_CHUNK_SIZE
+        self._prefetch_requests = DEFAULT_PREFETCH_REQUESTS
+
+    @classmethod
+    def from_client(
+        cls,
+        client: pm.SSHClient,
+        connection: ConnectionData,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        window_size: Optional[int] = None,
+        prefetch_requests: int = DEFAULT_PREFETCH_REQUESTS,
+        release: Optional[Callable[[], None]] = None,
+    ) -> "PermissionChangingSSHFSDecorator":
+        """
+        Creates the filesystem on top of an already connected client.
+
+        Args:
+            client (pm.SSHClient): The connected client, e.g. taken from a ConnectionPool
+            connection (ConnectionData): The host the client is connected to
+            chunk_size (int): The size of a single SFTP read or write request
+            window_size (int): The SSH window of the SFTP channel, i.e. how much data may be in flight.
+                Paramiko's default if None, links with a high latency benefit from a larger one.
+            prefetch_requests (int): The maximum number of concurrent read requests of a download
+            release (Callable[[], None]): Called once the filesystem is closed, e.g. to give the client
+                back to the pool it was acquired from
+        """
+        decorator = cls.__new__(cls)
+        FS.__init__(decorator)
+        decorator._internal_fs = SharedClientSSHFS(
+            client, connection, window_size=window_size, release=release
+        )
+        decorator._chunk_size = chunk_size
+        decorator._prefetch_requests = prefetch_requests
+        return decorator
 
     def homedir(self) -> Text:
         internal_sshfs = cast(sshfs.SSHFS, self._internal_fs)
         return internal_sshfs._sftp.normalize(".")
 
+    def close(self) -> None:
+        if not self.isclosed():
+            self._internal_fs.close()
+
+        super().close()
+
     def upload(
         self,
         path: str,
         file: BinaryIO,
         chunk_size: Optional[int] = None,
-        **options: Any
+        **options: Any,
     ) -> None:
-        self._internal_fs.upload(path, file, **options)
+        """
+        Uploads a file. Files that already exist keep their permissions.
+
+        Keyword Arguments:
+            offset (int): Continues an earlier upload of the same file by overwriting the existing
+                file from this offset on. `file` has to be positioned at the offset already.
+            on_progress (Callable[[int], None]): Called with the offset up to which the
+                server confirmed the written data, every `progress_interval` bytes
+            progress_interval (int): See `on_progress`
+        """
+        # Failures of the pipelined writes are raised when the file is closed,
+        # so neither a stat before nor after the transfer is necessary
         internal_sshfs = cast(sshfs.SSHFS, self._internal_fs)
-        internal_sshfs._sftp.chmod(
-            path,
-            stat.ST_MODE
-            | stat.S_IRUSR
-            | stat.S_IWUSR
-            | stat.S_IXUSR
-            | stat.S_IREAD
-            | stat.S_IWRITE
-            | stat.S_IEXEC,
-        )
+        _path = internal_sshfs.validatepath(path)
+        chunk_size = chunk_size or self._chunk_size
+        position = options.get("offset", 0)
+        on_progress = options.get("on_progress")
+        interval = options.get("progress_interval", DEFAULT_PROGRESS_INTERVAL)
+        with internal_sshfs._lock, _convert_sshfs_errors("upload", path):
+            remote_file = self._open_for_upload(_path, position)
+            while True:
+                with remote_file:
+                    remote_file.MAX_REQUEST_SIZE = chunk_size
+                    remote_file.set_pipelined(True)
+                    copied = _copy_data(
+                        file, remote_file, chunk_size, interval if on_progress else None
+                    )
+
+                # Closing waited for all pending writes, everything up to here is confirmed
+                position += copied
+                if on_progress is None or copied < interval:
+                    return
+
+                on_progress(position)
+                remote_file = self._open_for_upload(_path, position)
+
+    def _open_for_upload(self, path: Text, offset: int) -> pm.SFTPFile:
+        internal_sshfs = cast(sshfs.SSHFS, self._internal_fs)
+        if not offset:
+            return _create_with_mode(internal_sshfs._sftp, path, self.UPLOAD_MODE)
+
+        remote_file = internal_sshfs._sftp.open(path, "r+b")
+        remote_file.seek(offset)
+        return remote_file
 
     def download(
         self,
         path: Text,
         file: BinaryIO,
         chunk_size: Optional[int] = None,
-        **options: Any
+        **options: Any,
     ) -> None:
-        self._internal_fs.download(path, file, chunk_size, **options)
+        """
+        Downloads a file.
+
+        Keyword Arguments:
+            offset (int): Skips the beginning of the remote file up to this offset,
+                e.g. to continue an earlier download
+            on_progress (Callable[[int], None]): Called with the offset up to which `file`
+                was written and flushed, every `progress_interval` bytes
+            progress_interval (int): See `on_progress`
+        """
+        internal_sshfs = cast(sshfs.SSHFS, self._internal_fs)
+        _path = internal_sshfs.validatepath(path)
+        chunk_size = chunk_size or self._chunk_size
+        position = options.get("offset", 0)
+        on_progress = options.get("on_progress")
+        interval = options.get("progress_interval", DEFAULT_PROGRESS_INTERVAL)
+        with internal_sshfs._lock, _convert_sshfs_errors("download", path):
+            with internal_sshfs._sftp.open(_path, "rb") as remote_file:
+                remote_file.MAX_REQUEST_SIZE = chunk_size
+                # Prefetching starts at the current position
+                remote_file.seek(position)
+                self._prefetch(remote_file)
+                if on_progress is None:
+                    _copy_data(remote_file, file, chunk_size)
+                    return
+
+                while True:
+                    copied = _copy_data(remote_file, file, chunk_size, interval)
+                    if not copied:
+                        return
+
+                    position += copied
+                    file.flush()
+                    on_progress(position)
+
+    def _prefetch(self, remote_file: pm.SFTPFile) -> None:
+        # Without a bound paramiko requests the whole file at once and buffers what arrives
+        remote_file.prefetch(
+            remote_file.stat().st_size, max_concurrent_requests=self._prefetch_requests
+        )
+
+    def hash(self, path: Text, name: Text) -> Text:
+        return self._internal_fs.hash(path, name)
 
     def listdir(self, path: Text) -> List[Text]:
         return self._internal_fs.listdir(path)
@@ -73,11 +293,6 @@ class PermissionChangingSSHFSDecorator(FS):
     ) -> BinaryIO:
         return self._internal_fs.openbin(path, mode, buffering, **options)
 
-    def opendir(
-        self, path: Text, factory: Optional["_OpendirFactory[FS]"] = None
-    ) -> SubFS[FS]:
-        return self._internal_fs.opendir(path, factory)
-
     def remove(self, path: Text) -> None:
         self._internal_fs.remove(path)
 
@@ -122,3 +337,45 @@ class PermissionChangingSSHFSDecorator(FS):
         preserve_time: bool = False,
     ) -> None:
         self._internal_fs.move(src_path, dst_path, overwrite)
+
+
+def _copy_data(
+    source: _Readable,
+    destination: _Writable,
+    chunk_size: int,
+    limit: Optional[int] = None,
+) -> int:
+    # Copies everything, or `limit` bytes, and returns the number of copied bytes
+    copied = 0
+    while limit is None or copied < limit:
+        size = chunk_size if limit is None else min(chunk_size, limit - copied)
+        chunk = source.read(size)
+        if not chunk:
+            break
+
+        destination.write(chunk)
+        copied += len(chunk)
+
+    return copied
+
+
+def _create_with_mode(sftp: pm.SFTPClient, path: Text, mode: int) -> pm.SFTPFile:
+    # Like sftp.open(path, "wb"), but new files get their permissions in the same request
+    # instead of a separate chmod round trip afterwards
+    if not _CAN_OPEN_WITH_ATTRIBUTES:
+        # Also changes the permissions of files that already exist
+        remote_file = sftp.open(path, "wb")
+        remote_file.chmod(mode)
+        return remote_file
+
+    attributes = pm.SFTPAttributes()
+    attributes.st_mode = mode
+    flags = SFTP_FLAG_WRITE | SFTP_FLAG_CREATE | SFTP_FLAG_TRUNC
+    # The stubs only cover the public API
+    response, message = sftp._request(  # type: ignore[attr-defined]
+        CMD_OPEN, sftp._adjust_cwd(path), flags, attributes  # type: ignore[attr-defined]
+    )
+    if response != CMD_HANDLE:
+        raise pm.SFTPError("Expected handle")
+
+    return pm.SFTPFile(sftp, message.get_binary(), "wb")
@@ -15,6 +15,13 @@ class ConnectionData:
     def __post_init__(self) -> None:
         self._resolve_keyfile()
 
+    @property
+    def address(self) -> str:
+        """
+        The user, host and port as user@host:port
+        """
+        return f"{self.username}@{self.hostname}:{self.port}"
+
     def _resolve_keyfile(self) -> None:
         self.keyfile = ConnectionData._resolve_keyfile_from_home_dir(self.keyfile)
 
@@ -0,0 +1,277 @@
+import threading
+from dataclasses import dataclass, field
+from socket import socket
+from typing import Dict, List, Optional, Tuple, Union, cast
+
+import paramiko as pm
+
+from .connectiondata import ConnectionData
+from .shaping import LinkConditions, ShapedSocket, connect_shaped
+
+HopKey = Tuple[str, str, int]
+PoolKey = Tuple[HopKey, ...]
+
+
+def pool_key(
+    connection: ConnectionData, proxyjumps: Optional[List[ConnectionData]] = None
+) -> PoolKey:
+    """
+    Returns the key identifying a connection to `connection` through the given proxy chain.
+
+    Args:
+        connection (ConnectionData): The target host
+        proxyjumps (list[ConnectionData]): The jump hosts in the order they are traversed
+
+    Returns:
+        PoolKey: A tuple of (host, user, port) entries, one per hop
+    """
+    hops = [*(proxyjumps or []), connection]
+    return tuple((hop.hostname, hop.username, hop.port) for hop in hops)
+
+
+# OpenSSH allows 10 sessions per connection by default (MaxSessions). A client can open
+# a few short lived channels besides the session it was acquired for, so leave some room.
+DEFAULT_MAX_SESSIONS = 8
+
+
+@dataclass(eq=False)
+class _PooledClient:
+    client: pm.SSHClient
+    jumphost: Optional["_PooledClient"] = None
+    references: int = 0
+    # Set once the handshake finished, successfully or not
+    connected: threading.Event = field(default_factory=threading.Event)
+    failed: bool = False
+
+    @property
+    def is_active(self) -> bool:
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+
+
+class ConnectionPool:
+    """
+    Hands out authenticated SSH clients that share transports per target host and proxy chain.
+    A transport is shared by at most `max_sessions` holders, another connection is opened once
+    all of them are full.
+
+    Jump hosts are pooled as well, so connections behind the same bastion are tunneled through
+    as few bastion transports as possible.
+    """
+
+    def __init__(
+        self,
+        conditions: Optional[LinkConditions] = None,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+    ) -> None:
+        """
+        Args:
+            conditions (LinkConditions): Network conditions to simulate on the connection to the first hop,
+                e.g. to benchmark under WAN latency. Tunneled connections already cross that link.
+                Connections are not slowed down if None.
+            max_sessions (int): How many holders may share one transport. Every holder is assumed
+                to keep one channel open, e.g. an SFTP session.
+        """
+        self._clients: Dict[PoolKey, List[_PooledClient]] = {}
+        self._lock = threading.Lock()
+        self._conditions = conditions
+        self._max_sessions = max_sessions
+
+    def acquire(
+        self,
+        connection: ConnectionData,
+        proxyjumps: Optional[List[ConnectionData]] = None,
+        host_key_files: Optional[List[str]] = None,
+    ) -> pm.SSHClient:
+        """
+        Returns a connected client for the target. A new handshake only happens if there is no live transport
+        with a free session yet. Handshakes happen outside the pool's lock, so connecting to one host does not
+        hold up others. Every call must be paired with a call to `release`.
+
+        Args:
+            connection (ConnectionData): The target host
+            proxyjumps (list[ConnectionData]): The jump hosts in the order they are traversed
+            host_key_files (list[str]): Known hosts files to load before connecting
+
+        Returns:
+            pm.SSHClient: The shared client
+        """
+        return self._acquire(connection, proxyjumps or [], host_key_files).client
+
+    def release(self, client: pm.SSHClient) -> None:
+        """
+        Gives back a client obtained by `acquire`. The connection is closed once nobody holds it anymore.
+
+        Args:
+            client (pm.SSHClient): The client `acquire` returned
+        """
+        with self._lock:
+            pooled = self._find(client)
+        if pooled is not None:
+            self._release(pooled)
+
+    def close(self) -> None:
+        """
+        Closes all pooled connections regardless of outstanding references.
+        """
+        with self._lock:
+            pooled_clients = [
+                pooled for entries in self._clients.values() for pooled in entries
+            ]
+            self._clients.clear()
+
+        for pooled in pooled_clients:
+            pooled.client.close()
+
+    def _acquire(
+        self,
+        connection: ConnectionData,
+        proxyjumps: List[ConnectionData],
+        host_key_files: Optional[List[str]],
+    ) -> _PooledClient:
+        key = pool_key(connection, proxyjumps)
+        while True:
+            with self._lock:
+                pooled = self._reserve(key)
+                is_new = pooled is None
+                if pooled is None:
+                    pooled = _PooledClient(
+                        _make_sshclient(host_key_files), references=1
+                    )
+                    self._clients.setdefault(key, []).append(pooled)
+
+            if is_new:
+                self._connect(key, pooled, connection, proxyjumps)
+                return pooled
+
+            # Someone else is connecting, the session that was reserved there is only usable if they succeed
+            pooled.connected.wait()
+            if not pooled.failed:
+                return pooled
+
+    def _reserve(self, key: PoolKey) -> Optional[_PooledClient]:
+        # Takes a session on a transport that is alive or still connecting. Dead transports are
+        # closed by their last holder, new holders do not get them anymore.
+        for pooled in self._clients.get(key, []):
+            usable = not pooled.connected.is_set() or (
+                not pooled.failed and pooled.is_active
+            )
+            if usable and pooled.references < self._max_sessions:
+                pooled.references += 1
+                return pooled
+
+        return None
+
+    def _connect(
+        self,
+        key: PoolKey,
+        pooled: _PooledClient,
+        connection: ConnectionData,
+        proxyjumps: List[ConnectionData],
+    ) -> None:
+        try:
+            if proxyjumps:
+                # Every connection holds a session of the jump host it is tunneled through
+                pooled.jumphost = self._acquire(proxyjumps[-1], proxyjumps[:-1], None)
+                channel: Optional[
+                    Union[pm.Channel, ShapedSocket]
+                ] = _open_channel_to_next_host(connection, pooled.jumphost.client)
+            else:
+                channel = _open_shaped_socket(connection, self._conditions)
+
+            _connect_client(pooled.client, connection, channel)
+        except BaseException:
+            with self._lock:
+                pooled.failed = True
+                self._remove(key, pooled)
+            if pooled.jumphost is not None:
+                self._release(pooled.jumphost)
+            pooled.client.close()
+            raise
+        finally:
+            pooled.connected.set()
+
+    def _release(self, pooled: _PooledClient) -> None:
+        with self._lock:
+            pooled.references -= 1
+            if pooled.references > 0:
+                return
+
+            for key, entries in self._clients.items():
+                if pooled in entries:
+                    self._remove(key, pooled)
+                    break
+
+        pooled.client.close()
+        if pooled.jumphost is not None:
+            self._release(pooled.jumphost)
+
+    def _find(self, client: pm.SSHClient) -> Optional[_PooledClient]:
+        for entries in self._clients.values():
+            for pooled in entries:
+                if pooled.client is client:
+                    return pooled
+
+        return None
+
+    def _remove(self, key: PoolKey, pooled: _PooledClient) -> None:
+        entries = self._clients.get(key, [])
+        if pooled in entries:
+            entries.remove(pooled)
+        if not entries:
+            self._clients.pop(key, None)
+
+
+_default_pool = ConnectionPool()
+
+
+def default_pool() -> ConnectionPool:
+    """
+    Returns the process wide connection pool.
+    """
+    return _default_pool
+
+
+def _open_channel_to_next_host(
+    next_connection: ConnectionData, proxy: pm.SSHClient
+) -> pm.Channel:
+    transport = proxy.get_transport()
+    channel = transport.open_channel(  # type: ignore
+        "direct-tcpip", (next_connection.hostname, next_connection.port), ("", 0)
+    )
+
+    return channel
+
+
+def _open_shaped_socket(
+    connection: ConnectionData, conditions: Optional[LinkConditions]
+) -> Optional[ShapedSocket]:
+    if conditions is None:
+        return None
+
+    return connect_shaped(connection.hostname, connection.port, conditions)
+
+
+def _make_sshclient(host_key_files: Optional[List[str]] = None) -> pm.SSHClient:
+    sshclient = pm.SSHClient()
+    sshclient.set_missing_host_key_policy(pm.AutoAddPolicy)
+    for host_key_file in host_key_files or []:
+        sshclient.load_host_keys(host_key_file)
+
+    return sshclient
+
+
+def _connect_client(
+    sshclient: pm.SSHClient,
+    connection: ConnectionData,
+    channel: Optional[Union[pm.Channel, ShapedSocket]],
+) -> None:
+    sshclient.connect(
+        hostname=connection.hostname,
+        username=connection.username,
+        port=connection.port,
+        key_filename=connection.keyfile,
+        password=connection.password,
+        pkey=connection.key,  # type: ignore[arg-type]
+        sock=cast(socket, channel),
+    )
@@ -0,0 +1,46 @@
+import shlex
+from typing import List, Optional, Tuple
+
+import paramiko as pm
+
+
+class RemoteFind:
+    """
+    Lists a remote directory tree with a single `find` command instead of one SFTP round trip per directory.
+    Requires GNU find on the remote machine.
+    """
+
+    def __init__(self, client: pm.SSHClient) -> None:
+        self._client = client
+
+    def walk(
+        self, dir: str, max_depth: Optional[int] = None
+    ) -> Optional[List[Tuple[str, bool]]]:
+        """
+        Lists everything below `dir`, ordered by depth like a breadth first walk.
+
+        Args:
+            dir (str): The absolute path of the directory on the remote machine
+            max_depth (int): How many levels to descend, unlimited if None
+
+        Returns:
+            Optional[list[tuple[str, bool]]]: Pairs of path relative to `dir` with a leading slash
+                and whether it is a directory. None if find failed, e.g. because it is not GNU find.
+        """
+        depth = "" if max_depth is None else f" -maxdepth {max_depth}"
+        command = (
+            f"find {shlex.quote(dir)} -mindepth 1{depth} -printf '%y%P\\0' 2>/dev/null"
+        )
+        _, stdout, _ = self._client.exec_command(command)
+        output = stdout.read()
+        if stdout.channel.recv_exit_status() != 0:
+            return None
+
+        # File names are bytes, undecodable ones are kept like os.listdir does instead of failing the whole walk
+        entries = [
+            ("/" + entry[1:], entry[0] == "d")
+            for entry in output.decode("utf-8", errors="surrogateescape").split("\0")
+            if entry
+        ]
+        entries.sort(key=lambda entry: (entry[0].count("/"), entry[0]))
+        return entries
@@ -0,0 +1,218 @@
+import random
+import socket
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Optional, Tuple, Union
+
+import paramiko as pm
+
+_BUFSIZE = 64 * 1024
+# How often the background threads check whether the socket was closed
+_POLL_INTERVAL = 0.1
+
+
+@dataclass(frozen=True)
+class LinkConditions:
+    """
+    Network conditions to simulate on a connection, applied to each direction separately.
+    A round trip therefore takes at least twice the delay.
+
+    Attributes:
+        delay (float): The seconds data takes from one end to the other
+        jitter (float): The delay of every write varies uniformly by up to this many seconds in either direction
+        bandwidth (float): The bytes per second the link transmits, unlimited if None
+    """
+
+    delay: float = 0.0
+    jitter: float = 0.0
+    bandwidth: Optional[float] = None
+
+
+class _DelayLine:
+    """
+    The data in flight in one direction. Data is delivered in the order it was transmitted,
+    once it went through the link and the delay passed.
+    """
+
+    def __init__(self, conditions: LinkConditions, rng: random.Random) -> None:
+        self._conditions = conditions
+        self._rng = rng
+        self._chunks: Deque[Tuple[float, bytes]] = deque()
+        self._condition = threading.Condition()
+        self._free_at = 0.0
+        self._last_delivery = 0.0
+        self._closed = False
+
+    def transmit(self, data: bytes) -> float:
+        """
+        Puts data on the link.
+
+        Returns:
+            float: The monotonic time the link finished transmitting the data
+        """
+        conditions = self._conditions
+        with self._condition:
+            start = max(time.monotonic(), self._free_at)
+            if conditions.bandwidth:
+                self._free_at = start + len(data) / conditions.bandwidth
+            else:
+                self._free_at = start
+
+            delay = conditions.delay + self._rng.uniform(
+                -conditions.jitter, conditions.jitter
+            )
+            # A byte stream cannot be reordered, jitter only delays later data
+            delivery = max(self._free_at + max(delay, 0.0), self._last_delivery)
+            self._last_delivery = delivery
+            self._chunks.append((delivery, data))
+            self._condition.notify_all()
+            return self._free_at
+
+    def receive(self, size: int, timeout: Optional[float]) -> Optional[bytes]:
+        """
+        Waits for delivered data.
+
+        Returns:
+            Optional[bytes]: At most `size` bytes, b"" once the line is closed and empty, None on a timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if self._chunks and self._chunks[0][0] <= now:
+                    return self._pop(size)
+                if self._closed and not self._chunks:
+                    return b""
+
+                wait = self._chunks[0][0] - now if self._chunks else None
+                if deadline is not None:
+                    if deadline <= now:
+                        return None
+                    wait = deadline - now if wait is None else min(wait, deadline - now)
+
+                self._condition.wait(wait)
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def _pop(self, size: int) -> bytes:
+        delivery, data = self._chunks.popleft()
+        if len(data) > size:
+            self._chunks.appendleft((delivery, data[size:]))
+            data = data[:size]
+
+        return data
+
+
+class ShapedSocket:
+    """
+    Wraps a socket, or a paramiko channel used as one, and delays the data in both directions
+    as if it crossed a link with the given conditions. Can be passed as `sock` to paramiko,
+    which makes round trip heavy code measurable under WAN conditions on a loopback connection.
+    """
+
+    def __init__(
+        self,
+        sock: Union[socket.socket, pm.Channel],
+        conditions: LinkConditions,
+        seed: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            sock (socket.socket | pm.Channel): The connected socket to wrap
+            conditions (LinkConditions): The simulated link
+            seed (int): Seeds the jitter, e.g. to make benchmark runs comparable
+        """
+        rng = random.Random(seed)
+        self._sock = sock
+        self._timeout: Optional[float] = None
+        self._outgoing = _DelayLine(conditions, rng)
+        self._incoming = _DelayLine(conditions, rng)
+        # paramiko's transport checks this attribute of real sockets when it closes
+        self._closed = False
+
+        sock.settimeout(_POLL_INTERVAL)
+        for target in (self._send_delivered, self._receive):
+            threading.Thread(target=target, daemon=True).start()
+
+    def send(self, data: bytes) -> int:
+        if self._closed:
+            raise OSError("Socket is closed")
+
+        finished = self._outgoing.transmit(bytes(data))
+        # The sender waits while the link transmits, that is what limits the bandwidth
+        _sleep_until(finished)
+        return len(data)
+
+    def sendall(self, data: bytes) -> None:
+        self.send(data)
+
+    def recv(self, size: int) -> bytes:
+        data = self._incoming.receive(size, self._timeout)
+        if data is None:
+            raise socket.timeout()
+
+        return data
+
+    def settimeout(self, timeout: Optional[float]) -> None:
+        self._timeout = timeout
+
+    def gettimeout(self) -> Optional[float]:
+        return self._timeout
+
+    def close(self) -> None:
+        self._closed = True
+        self._outgoing.close()
+        self._incoming.close()
+        self._sock.close()
+
+    def __getattr__(self, name: str) -> Any:
+        # getpeername, fileno etc. of the wrapped socket
+        return getattr(self._sock, name)
+
+    def _send_delivered(self) -> None:
+        while True:
+            data = self._outgoing.receive(_BUFSIZE, None)
+            if not data or self._closed:
+                return
+
+            try:
+                self._sock.sendall(data)
+            except OSError:
+                self._incoming.close()
+                return
+
+    def _receive(self) -> None:
+        while not self._closed:
+            try:
+                data = self._sock.recv(_BUFSIZE)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            if not data:
+                break
+
+            self._incoming.transmit(data)
+
+        self._incoming.close()
+
+
+def connect_shaped(
+    hostname: str, port: int, conditions: LinkConditions
+) -> ShapedSocket:
+    """
+    Opens a TCP connection that behaves as if it crossed a link with the given conditions.
+    """
+    return ShapedSocket(socket.create_connection((hostname, port)), conditions)
+
+
+def _sleep_until(deadline: float) -> None:
+    remaining = deadline - time.monotonic()
+    if remaining > 0:
+        time.sleep(remaining)
@@ -1,11 +1,23 @@
-from socket import socket
-from typing import List, Optional, cast
+import select
+import time
+from typing import Iterator, List, Optional, Union
 
 import paramiko as pm
 import paramiko.channel as channel
 from rcc.core.executor import CommandExecutor, RunningCommand
 from .connectiondata import ConnectionData
-from rcc.core.utils import SSHError
+from .pool import (
+    ConnectionPool,
+    default_pool,
+    _connect_client,
+    _make_sshclient,
+    _open_channel_to_next_host,
+    _open_shaped_socket,
+)
+from .shaping import LinkConditions, ShapedSocket
+from rcc.core.utils import SSHError, get_or_raise
+
+_RECV_SIZE = 32768
 
 
 class RemoteCommand(RunningCommand):
@@ -20,15 +32,57 @@ class RemoteCommand(RunningCommand):
         self._stderr = stderr
         self._stdout_lines: List[str] = []
         self._stderr_lines: List[str] = []
+        self._stdout_buffer = bytearray()
+        self._stderr_buffer = bytearray()
+
+    def wait_until_exit(self, timeout: Optional[float] = None) -> int:
+        chan = self._stdout.channel
+        deadline = None if timeout is None else time.monotonic() + timeout
+        stdout, stderr = self._stdout_buffer, self._stderr_buffer
+
+        # The channel's fileno becomes readable whenever data arrives on stdout or
+        # stderr and stays readable once the remote side sent EOF or closed the channel.
+        # Draining while waiting keeps the channel window open for large outputs.
+        while not (chan.eof_received or chan.closed):
+            _drain(chan, stdout, stderr)
+            readable, _, _ = select.select([chan], [], [], _remaining(deadline))
+            if not readable:
+                raise TimeoutError(f"Command did not finish within {timeout}s")
+
+        _drain(chan, stdout, stderr)
+        if not chan.status_event.wait(_remaining(deadline)):
+            raise TimeoutError(f"Command did not finish within {timeout}s")
+
+        self._stdout_lines = _decode_lines(stdout)
+        self._stderr_lines = _decode_lines(stderr)
+
+        return chan.exit_status
+
+    def lines(self, timeout: Optional[float] = None) -> Iterator[str]:
+        chan = self._stdout.channel
+        partial = bytearray()
+        while True:
+            readable, _, _ = select.select([chan], [], [], timeout)
+            if not readable:
+                raise TimeoutError(f"No output within {timeout}s")
+
+            if chan.recv_ready():
+                partial += chan.recv(_RECV_SIZE)
+                *complete, rest = partial.split(b"\n")
+                for line in complete:
+                    yield line.decode("utf-8", errors="replace") + "\n"
+                partial = bytearray(rest)
+            elif chan.recv_stderr_ready():
+                self._stderr_buffer += chan.recv_stderr(_RECV_SIZE)
+            elif chan.eof_received or chan.closed:
+                break
+
+        if partial:
+            yield partial.decode("utf-8", errors="replace")
 
-    def wait_until_exit(self) -> int:
-        while not self._stdout.channel.exit_status_ready():
-            continue
-
-        self._stdout_lines = self._stdout.readlines()
-        self._stderr_lines = self._stderr.readlines()
-
-        return self._stdout.channel.exit_status
+    def close(self) -> None:
+        # Without a terminal the remote command is only stopped once it writes to the closed channel
+        self._stdout.channel.close()
 
     @property
     def exit_status(self) -> int:
@@ -41,34 +95,60 @@ class RemoteCommand(RunningCommand):
         return self._stderr_lines
 
 
+def _drain(chan: pm.Channel, stdout: bytearray, stderr: bytearray) -> None:
+    while chan.recv_ready():
+        stdout += chan.recv(_RECV_SIZE)
+
+    while chan.recv_stderr_ready():
+        stderr += chan.recv_stderr(_RECV_SIZE)
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    if deadline is None:
+        return None
+
+    return max(deadline - time.monotonic(), 0)
+
+
+def _decode_lines(output: bytearray) -> List[str]:
+    return output.decode("utf-8", errors="replace").splitlines(keepends=True)
+
+
 class SSHExecutor(CommandExecutor):
     def __init__(
         self,
         connection: ConnectionData,
         proxyjumps: Optional[List[ConnectionData]] = None,
+        pool: Optional[ConnectionPool] = None,
     ) -> None:
         self._is_connected = False
-        self._client = _make_sshclient()
+        self._client: Optional[pm.SSHClient] = None
         self._connection = connection
         self._proxyjumps = proxyjumps or []
+        self._pool = pool or default_pool()
+        self._host_key_files: List[str] = []
 
     def load_host_keys_from_file(self, hostfile: str) -> None:
-        self._client.load_host_keys(hostfile)
+        self._host_key_files.append(hostfile)
 
     def connect(self) -> None:
         try:
-            channel = build_channel_with_proxyjumps(self._connection, self._proxyjumps)
-            _connect_client(self._client, self._connection, channel=channel)
+            self._client = self._pool.acquire(
+                self._connection, self._proxyjumps, self._host_key_files
+            )
             self._is_connected = True
         except Exception as err:
             raise SSHError(str(err)) from err
 
     def close(self) -> None:
-        self._client.close()
+        if self._client is not None:
+            self._pool.release(self._client)
+
+        self._client = None
         self._is_connected = False
 
     def exec_command(self, cmd: str) -> RunningCommand:
-        stdin, stdout, stderr = self._client.exec_command(cmd)
+        stdin, stdout, stderr = self.client.exec_command(cmd)
         return RemoteCommand(stdin, stdout, stderr)
 
     @property
@@ -77,13 +157,29 @@ class SSHExecutor(CommandExecutor):
 
     @property
     def client(self) -> pm.SSHClient:
-        return self._client
+        return get_or_raise(self._client, SSHError("Not connected"))
 
 
 def build_channel_with_proxyjumps(
-    connection: ConnectionData, proxyjumps: List[ConnectionData]
-) -> Optional[pm.Channel]:
-    channel = None
+    connection: ConnectionData,
+    proxyjumps: List[ConnectionData],
+    conditions: Optional[LinkConditions] = None,
+) -> Optional[Union[pm.Channel, ShapedSocket]]:
+    """
+    Opens a channel to `connection` that is tunneled through the jump hosts.
+
+    Args:
+        connection (ConnectionData): The target host
+        proxyjumps (list[ConnectionData]): The jump hosts in the order they are traversed
+        conditions (LinkConditions): Network conditions to simulate on the connection to the first hop.
+            Without jump hosts, that is the target itself and a shaped socket to it is returned.
+
+    Returns:
+        The channel to pass as `sock` when connecting, None if there is nothing to tunnel or shape
+    """
+    channel: Optional[Union[pm.Channel, ShapedSocket]] = _open_shaped_socket(
+        proxyjumps[0] if proxyjumps else connection, conditions
+    )
     for index, proxyjump in enumerate(proxyjumps):
         next_host = _next_host(connection, proxyjumps, index)
         proxy = _make_sshclient_and_connect(proxyjump, channel)
@@ -101,40 +197,10 @@ def _next_host(
     return connection
 
 
-def _open_channel_to_next_host(
-    next_connection: ConnectionData, proxy: pm.SSHClient
-) -> pm.Channel:
-    transport = proxy.get_transport()
-    channel = transport.open_channel(  # type: ignore
-        "direct-tcpip", (next_connection.hostname, next_connection.port), ("", 0)
-    )
-
-    return channel
-
-
 def _make_sshclient_and_connect(
-    connection: ConnectionData, channel: Optional[pm.Channel] = None
+    connection: ConnectionData,
+    channel: Optional[Union[pm.Channel, ShapedSocket]] = None,
 ) -> pm.SSHClient:
     sshclient = _make_sshclient()
     _connect_client(sshclient, connection, channel)
     return sshclient
-
-
-def _make_sshclient() -> pm.SSHClient:
-    sshclient = pm.SSHClient()
-    sshclient.set_missing_host_key_policy(pm.AutoAddPolicy)
-    return sshclient
-
-
-def _connect_client(
-    sshclient: pm.SSHClient, connection: ConnectionData, channel: Optional[pm.Channel]
-) -> None:
-    sshclient.connect(
-        hostname=connection.hostname,
-        username=connection.username,
-        port=connection.port,
-        key_filename=connection.keyfile,
-        password=connection.password,
-        pkey=connection.key,  # type: ignore[arg-type]
-        sock=cast(socket, channel),
-    )
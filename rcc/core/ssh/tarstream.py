@@ -0,0 +1,210 @@
+import os
+import posixpath
+import re
+import shlex
+import shutil
+import tarfile
+import threading
+from typing import Dict, List, Optional, Tuple, Type
+
+import paramiko as pm
+
+# (source, target) pairs. Local paths are native paths, remote paths are absolute.
+FilePairs = List[Tuple[str, str]]
+
+_BUFSIZE = 256 * 1024
+_TAR_ERROR = re.compile(r"^tar: (?P<name>.+): Cannot (open|stat): (?P<reason>.+)$")
+_TAR_SUMMARY = "tar: Exiting with failure status due to previous errors"
+_ERROR_TYPES: Dict[str, Type[OSError]] = {
+    "File exists": FileExistsError,
+    "No such file or directory": FileNotFoundError,
+}
+
+
+class RemoteTar:
+    """
+    Transfers many files as a single tar stream over one exec channel, instead of
+    several SFTP round trips per file. Requires GNU tar on the remote machine.
+    """
+
+    def __init__(self, client: pm.SSHClient) -> None:
+        self._client = client
+
+    def extract(
+        self, files: FilePairs, overwrite: bool = False
+    ) -> List[Optional[Exception]]:
+        """
+        Uploads local files by streaming them into `tar -x` on the remote machine.
+
+        Args:
+            files (list[tuple[str, str]]): Pairs of local source and remote target paths
+            overwrite (bool): Replace existing remote files
+
+        Returns:
+            list[Optional[Exception]]: The error of every file, None if it was copied
+
+        Raises:
+            OSError: tar failed for a reason that cannot be attributed to single files
+        """
+        base = _common_dir([target for _, target in files])
+        names = [_member_name(target, base) for _, target in files]
+        keep_old_files = "" if overwrite else " --keep-old-files"
+        command = (
+            f"mkdir -p {shlex.quote(base)} && "
+            f"tar -x{keep_old_files} -C {shlex.quote(base)} -f -"
+        )
+
+        results: List[Optional[Exception]] = [None] * len(files)
+        stdin, _, stderr = self._client.exec_command(command)
+        errors = _BackgroundReader(stderr)
+        with tarfile.open(
+            fileobj=stdin, mode="w|", bufsize=_BUFSIZE, format=tarfile.PAX_FORMAT
+        ) as archive:
+            for position, ((source, _), name) in enumerate(zip(files, names)):
+                if not os.path.lexists(source):
+                    results[position] = FileNotFoundError(source)
+                    continue
+
+                archive.add(source, arcname=name, recursive=False)
+
+        stdin.channel.shutdown_write()
+        exit_status = stdin.channel.recv_exit_status()
+        remote_paths = [target for _, target in files]
+        _attribute_errors(exit_status, errors.read(), names, remote_paths, results)
+        return results
+
+    def create(
+        self, files: FilePairs, overwrite: bool = False
+    ) -> List[Optional[Exception]]:
+        """
+        Downloads remote files by running `tar -c` on the remote machine and
+        extracting the stream locally while it arrives.
+
+        Args:
+            files (list[tuple[str, str]]): Pairs of remote source and local target paths
+            overwrite (bool): Replace existing local files
+
+        Returns:
+            list[Optional[Exception]]: The error of every file, None if it was copied
+
+        Raises:
+            OSError: tar failed for a reason that cannot be attributed to single files
+        """
+        base = _common_dir([source for source, _ in files])
+        names = [_member_name(source, base) for source, _ in files]
+        command = (
+            "tar -c --dereference --no-recursion "
+            f"-C {shlex.quote(base)} --null -T - -f -"
+        )
+
+        results: List[Optional[Exception]] = [None] * len(files)
+        positions = _positions(names)
+        stdin, stdout, stderr = self._client.exec_command(command)
+        errors = _BackgroundReader(stderr)
+        # tar reads the file list while it writes the archive, both have to flow at once
+        writer = threading.Thread(
+            target=_write_file_list, args=(stdin, names), daemon=True
+        )
+        writer.start()
+
+        with tarfile.open(fileobj=stdout, mode="r|", bufsize=_BUFSIZE) as archive:
+            for member in archive:
+                position = positions.get(posixpath.normpath(member.name))
+                if position is not None:
+                    results[position] = _extract_member(
+                        archive, member, files[position][1], overwrite
+                    )
+
+        writer.join()
+        exit_status = stdout.channel.recv_exit_status()
+        remote_paths = [source for source, _ in files]
+        _attribute_errors(exit_status, errors.read(), names, remote_paths, results)
+        return results
+
+
+class _BackgroundReader:
+    """
+    Reads a stream in a separate thread, so a full stream cannot stall the transfer.
+    """
+
+    def __init__(self, stream: pm.ChannelFile) -> None:
+        self._stream = stream
+        self._output = b""
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def _read(self) -> None:
+        self._output = self._stream.read()
+
+    def read(self) -> str:
+        self._thread.join()
+        return self._output.decode("utf-8", "replace")
+
+
+def _common_dir(paths: List[str]) -> str:
+    return posixpath.commonpath([posixpath.dirname(path) for path in paths])
+
+
+def _member_name(path: str, base: str) -> str:
+    # The ./ prefix keeps tar from reading names that start with a dash as options
+    return "./" + posixpath.relpath(path, base)
+
+
+def _positions(names: List[str]) -> Dict[str, int]:
+    return {posixpath.normpath(name): position for position, name in enumerate(names)}
+
+
+def _write_file_list(stdin: pm.ChannelFile, names: List[str]) -> None:
+    stdin.write(b"".join(name.encode() + b"\0" for name in names))
+    stdin.flush()
+    stdin.channel.shutdown_write()
+
+
+def _extract_member(
+    archive: tarfile.TarFile, member: tarfile.TarInfo, target: str, overwrite: bool
+) -> Optional[Exception]:
+    if member.isdir():
+        os.makedirs(target, exist_ok=True)
+        return None
+
+    if not overwrite and os.path.exists(target):
+        return FileExistsError(target)
+
+    source = archive.extractfile(member)
+    if source is None:
+        return None
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, "wb") as destination:
+        shutil.copyfileobj(source, destination, _BUFSIZE)
+
+    return None
+
+
+def _attribute_errors(
+    exit_status: int,
+    error_output: str,
+    names: List[str],
+    remote_paths: List[str],
+    results: List[Optional[Exception]],
+) -> None:
+    if exit_status == 0:
+        return
+
+    positions = _positions(names)
+    unattributed = []
+    for line in error_output.splitlines():
+        match = _TAR_ERROR.match(line)
+        position = positions.get(posixpath.normpath(match["name"])) if match else None
+        error_type = _ERROR_TYPES.get(match["reason"]) if match else None
+        if position is None or error_type is None:
+            if line != _TAR_SUMMARY:
+                unattributed.append(line)
+            continue
+
+        results[position] = error_type(remote_paths[position])
+
+    if unattributed or not error_output:
+        raise OSError(
+            "\n".join(unattributed) or f"tar exited with status {exit_status}"
+        )
@@ -1,12 +1,17 @@
-from typing import Any
+import threading
+from collections import Counter, deque
+from typing import Any, Callable, Deque, List, Optional
 
 from rich import box
-from rich.console import RenderableType
+from rich.console import Group, RenderableType
 from rich.live import Live
+from rich.panel import Panel
+from rich.progress_bar import ProgressBar
 from rich.spinner import Spinner
 from rich.table import Table
+from rich.text import Text
 
-from rcc.core.job import BaseJobStatus
+from rcc.core.job import BaseJobStatus, TaskStatus, is_failed_state
 
 try:
     from typing import Protocol
@@ -55,6 +60,14 @@ class UI(Protocol):  # pragma: no cover
             text (str): The message
         """
 
+    def output(self, line: str) -> None:
+        """
+        Displays a line the job wrote to its output
+
+        Args:
+            line (str): The line without the line break
+        """
+
 
 class NullUI(UI):  # pragma: no cover
     """
@@ -76,17 +89,30 @@ class NullUI(UI):  # pragma: no cover
     def launch(self, text: str) -> None:  # pragma: no cover
         pass
 
+    def output(self, line: str) -> None:  # pragma: no cover
+        pass
+
 
 class RichUI(UI):
     """
     A UI that uses the rich terminal library
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self, output_lines: int = 20, detail_rows: int = 10, refresh_per_second: int = 4
+    ) -> None:
+        """
+        Args:
+            output_lines (int): The number of the job's most recent output lines shown below the job table
+            detail_rows (int): Jobs with more tasks are summarized, showing at most this many running and failed tasks
+            refresh_per_second (int): How often the live view is redrawn, independent of how often the status changes
+        """
         self._rich_live: Live
+        self._view = _JobView(output_lines, detail_rows)
+        self._refresh_per_second = refresh_per_second
 
     def __enter__(self) -> "RichUI":
-        self._rich_live = Live(Spinner("bouncingBar", ""), refresh_per_second=16)
+        self._rich_live = Live(self._view, refresh_per_second=self._refresh_per_second)
 
         self._rich_live.start()
         return self
@@ -95,7 +121,7 @@ class RichUI(UI):
         self._rich_live.stop()
 
     def update(self, job: BaseJobStatus) -> None:
-        self._rich_live.update(self._make_table(job))
+        self._view.update(job)
 
     def error(self, text: str) -> None:
         self._rich_live.console.print(
@@ -117,25 +143,158 @@ class RichUI(UI):
             ":rocket: ", text, style="bold yellow", emoji=True
         )
 
-    def _make_table(self, job: BaseJobStatus) -> Table:
-        table = Table(style="bold", box=box.MINIMAL)
-        table.add_column("ID")
-        table.add_column("Name")
-        table.add_column("State")
-
-        for task in job.tasks:
-            last_column: RenderableType = task.state
-            color = "grey42"
-            if task.state == "RUNNING":
-                color = "blue"
-                last_column = Spinner("arc", task.state)
-            elif task.state == "COMPLETED":
-                color = "green"
-                last_column = f":heavy_check_mark: {task.state}"
-            elif task.state == "FAILED":
-                color = "red"
-                last_column = f":cross_mark: {task.state}"
-
-            table.add_row(str(task.id), task.name, last_column, style=color)
-
-        return table
+    def output(self, line: str) -> None:
+        self._view.output(line)
+
+
+# States of tasks that did not finish yet
+_ACTIVE_STATES = {
+    "PENDING",
+    "CONFIGURING",
+    "RUNNING",
+    "COMPLETING",
+    "SUSPENDED",
+    "REQUEUED",
+}
+
+
+class _JobView:
+    """
+    The renderable shown by RichUI's live display. Statuses and output lines only replace the
+    state, the view is rebuilt when the display refreshes and only if something changed since.
+    """
+
+    def __init__(self, output_lines: int, detail_rows: int) -> None:
+        self._lock = threading.Lock()
+        self._job: Optional[BaseJobStatus] = None
+        self._output: Deque[str] = deque(maxlen=output_lines)
+        self._detail_rows = detail_rows
+        self._spinner = Spinner("bouncingBar", "")
+        self._rendered: RenderableType = self._spinner
+        self._changed = False
+
+    def update(self, job: BaseJobStatus) -> None:
+        with self._lock:
+            self._job = job
+            self._changed = True
+
+    def output(self, line: str) -> None:
+        with self._lock:
+            self._output.append(line)
+            self._changed = True
+
+    def __rich__(self) -> RenderableType:
+        with self._lock:
+            if self._changed:
+                self._rendered = self._render()
+                self._changed = False
+
+            return self._rendered
+
+    def _render(self) -> RenderableType:
+        parts: List[RenderableType] = []
+        job = self._job
+        if job is not None:
+            if job.array_tasks or len(job.tasks) > self._detail_rows:
+                parts.append(_make_summary(job, self._detail_rows))
+            else:
+                parts.append(_make_table(job.tasks))
+
+        if self._output:
+            parts.append(
+                Panel(Text("\n".join(self._output)), title="Output", box=box.MINIMAL)
+            )
+
+        if not parts:
+            return self._spinner
+
+        return parts[0] if len(parts) == 1 else Group(*parts)
+
+
+def _make_table(tasks: List[TaskStatus], title: Optional[str] = None) -> Table:
+    table = Table(title=title, style="bold", box=box.MINIMAL)
+    table.add_column("ID")
+    table.add_column("Name")
+    table.add_column("State")
+
+    for task in tasks:
+        last_column: RenderableType = task.state
+        color = "grey42"
+        if task.state == "RUNNING":
+            color = "blue"
+            last_column = Spinner("arc", task.state)
+        elif task.state == "COMPLETED":
+            color = "green"
+            last_column = f":heavy_check_mark: {task.state}"
+        elif is_failed_state(task.state):
+            color = "red"
+            last_column = f":cross_mark: {task.state}"
+
+        table.add_row(str(task.id), task.name, last_column, style=color)
+
+    return table
+
+
+def _make_summary(job: BaseJobStatus, detail_rows: int) -> RenderableType:
+    counts = Counter(task.state for task in job.tasks)
+    for task_range in job.array_tasks:
+        counts[task_range.state] += len(task_range)
+
+    total = sum(counts.values())
+    finished = sum(
+        count for state, count in counts.items() if state not in _ACTIVE_STATES
+    )
+    failed = sum(count for state, count in counts.items() if is_failed_state(state))
+
+    states = Table(style="bold", box=box.MINIMAL)
+    states.add_column("State")
+    states.add_column("Tasks", justify="right")
+    for state, count in counts.most_common():
+        states.add_row(state, str(count), style=_state_color(state))
+
+    summary = f"{finished} of {total} tasks finished"
+    if failed:
+        summary += f", {failed} failed"
+    parts: List[RenderableType] = [
+        Text(summary, style="bold"),
+        ProgressBar(total=total, completed=finished, width=60),
+        states,
+    ]
+    running = _first_tasks(job, lambda state: state == "RUNNING", detail_rows)
+    if running:
+        parts.append(_make_table(running, f"RUNNING ({counts['RUNNING']} tasks)"))
+    failed_tasks = _first_tasks(job, is_failed_state, detail_rows)
+    if failed_tasks:
+        parts.append(_make_table(failed_tasks, f"FAILED ({failed} tasks)"))
+
+    return Group(*parts)
+
+
+def _first_tasks(
+    job: BaseJobStatus, in_state: Callable[[str], bool], limit: int
+) -> List[TaskStatus]:
+    # Ranges of array tasks are shown as a single row
+    selected = [task for task in job.tasks if in_state(task.state)][:limit]
+    for task_range in job.array_tasks:
+        if len(selected) >= limit:
+            break
+
+        if in_state(task_range.state):
+            indices = str(task_range.first)
+            if task_range.last != task_range.first:
+                indices = f"[{task_range.first}-{task_range.last}]"
+            selected.append(
+                TaskStatus(f"{job.id}_{indices}", job.name, task_range.state)
+            )
+
+    return selected
+
+
+def _state_color(state: str) -> str:
+    if is_failed_state(state):
+        return "red"
+
+    return _STATE_COLORS.get(state, "grey42")
+
+
+_STATE_COLORS = {"RUNNING": "blue", "COMPLETED": "green"}
@@ -4,8 +4,10 @@ from .errors import (
     get_error_message,
     ClusterError,
     SSHError,
-    NotWatchingError,
 )
+
+# Defined next to the job watchers, so importing rcc.core.job does not import the options
+from rcc.core.job.job_watcher import NotWatchingError
 from .launch_options import (
     Options,
     LaunchOptions,
@@ -13,6 +15,8 @@ from .launch_options import (
     WatchOptions,
     FinalizeOptions,
     JobBasedOptions,
+    TransferOptions,
+    StatusOptions,
 )
 
 __all__ = [
@@ -27,5 +31,7 @@ __all__ = [
     "WatchOptions",
     "FinalizeOptions",
     "JobBasedOptions",
+    "TransferOptions",
+    "StatusOptions",
     "NotWatchingError",
 ]
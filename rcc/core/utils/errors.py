@@ -23,8 +23,3 @@ class SSHError(RuntimeError):
     """
     Raised when the SSH connection fails.
     """
-
-
-class NotWatchingError(RuntimeError):
-    def __init__(self, *args: object) -> None:
-        super().__init__(*args)
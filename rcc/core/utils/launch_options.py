@@ -1,8 +1,13 @@
 from dataclasses import dataclass, field
 from enum import Enum, auto
-from typing import List, Union
+from typing import List, Optional, Union
 
 from rcc.core.filesystem.progressive import CopyInstruction
+from rcc.core.filesystem.resumable import (
+    DEFAULT_CHECKPOINT_INTERVAL,
+    DEFAULT_JOURNAL_FILE,
+)
+from rcc.core.ssh.chmodsshfs import DEFAULT_CHUNK_SIZE, DEFAULT_PREFETCH_REQUESTS
 from rcc.core.ssh.connectiondata import ConnectionData
 
 Options = Union[
@@ -11,6 +16,32 @@ Options = Union[
 JobBasedOptions = Union["ImmediateCommandOptions", "WatchOptions"]
 
 
+@dataclass
+class TransferOptions:
+    workers: int = 4
+    bundle_threshold: Optional[int] = 500
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    window_size: Optional[int] = None
+    prefetch_requests: int = DEFAULT_PREFETCH_REQUESTS
+    journal_file: Optional[str] = DEFAULT_JOURNAL_FILE
+    checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL
+
+
+@dataclass(frozen=True)
+class StatusOptions:
+    """
+    How the statuses of jobs are queried, shared by all commands that query them
+    """
+
+    # Query pending and running jobs with "squeue" instead of "sacct"
+    backend: str = "sacct"
+    # Learn about state changes from a long-lived command on the cluster instead of polling
+    push_updates: bool = False
+    # Share polled statuses with other local processes for this many seconds, 0 disables sharing
+    cache_ttl: float = 0
+    cache_dir: str = ""
+
+
 @dataclass
 class ImmediateCommandOptions:
     class Action(Enum):
@@ -21,6 +52,8 @@ class ImmediateCommandOptions:
     action: Action
     connection: ConnectionData
     proxyjumps: List[ConnectionData] = field(default_factory=lambda: [])
+    status: StatusOptions = field(default_factory=StatusOptions)
+    job_registry: str = ""
 
 
 @dataclass
@@ -31,10 +64,19 @@ class LaunchOptions:
     copy_files: List[CopyInstruction] = field(default_factory=lambda: [])
     clean_files: List[str] = field(default_factory=lambda: [])
     collect_files: List[CopyInstruction] = field(default_factory=lambda: [])
+    transfer: TransferOptions = field(default_factory=TransferOptions)
     poll_interval: int = 5
     watch: bool = False
     continue_if_job_fails: bool = False
     job_id_file: str = ""
+    # Submit the job on hold and upload the files while it is queued
+    hold_during_upload: bool = False
+    # Show the job's output while it runs, optionally appending it to a local file
+    follow_output: bool = False
+    output_log: str = ""
+    status: StatusOptions = field(default_factory=StatusOptions)
+    # The local database the job and its statuses are recorded in, nothing is recorded if empty
+    job_registry: str = ""
 
 
 @dataclass
@@ -43,6 +85,10 @@ class WatchOptions:
     connection: ConnectionData
     proxyjumps: List[ConnectionData] = field(default_factory=lambda: [])
     poll_interval: int = 5
+    follow_output: bool = False
+    output_log: str = ""
+    status: StatusOptions = field(default_factory=StatusOptions)
+    job_registry: str = ""
 
 
 @dataclass
@@ -51,3 +97,5 @@ class FinalizeOptions:
     proxyjumps: List[ConnectionData] = field(default_factory=lambda: [])
     collect_files: List[CopyInstruction] = field(default_factory=lambda: [])
     clean_files: List[str] = field(default_factory=lambda: [])
+    transfer: TransferOptions = field(default_factory=TransferOptions)
+    status: StatusOptions = field(default_factory=StatusOptions)
@@ -23,8 +23,8 @@ def _immediate_cmd_workflow(
         ImmediateCommandOptions.Action.cancel: workflow.cancelworkflow,
     }
 
-    workflow = immediate_workflows[immediate_cmd_options.action]
-    return workflow(controller, immediate_cmd_options)
+    immediate_workflow = immediate_workflows[immediate_cmd_options.action]
+    return immediate_workflow(controller, immediate_cmd_options)
 
 
 _SimpleWorkflowBuilder = Callable[[Controller, Any], Workflow]
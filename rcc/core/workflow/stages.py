@@ -1,18 +1,31 @@
+from contextlib import closing
 from pathlib import Path
-from typing import List, Optional, Tuple, cast, Protocol
+from typing import Any, Dict, List, Optional, cast, Protocol
 
 from rcc.core.job import (
     BaseBatchJob,
     BaseJobStatus,
+    DiffingCallback,
     JobStatusCallback,
     JobWatcher,
+    JobRegistry,
+    NotWatchingError,
+    OutputFollower,
+    StatusDiff,
+    is_failed_state,
 )
 from rcc.cluster._base import Controller
 from rcc.core.ui import UI
-from rcc.core.utils import get_error_message, get_or_raise, NotWatchingError
+from rcc.core.utils import (
+    get_error_message,
+    get_or_raise,
+    TransferOptions,
+)
 from rcc.core.filesystem import (
     FilesystemFactory,
     CopyInstruction,
+    CopyResult,
+    Filesystem,
     progressive_clean,
     progressive_copy,
 )
@@ -47,6 +60,24 @@ def _log_errors(errors: List[Exception], ui: UI) -> None:
         ui.error(get_error_message(error))
 
 
+def _log_failed_tasks(job: BaseJobStatus, diff: StatusDiff, ui: UI) -> None:
+    for task_id, (_, state) in diff.tasks.items():
+        if is_failed_state(state):
+            ui.error(f"Task {task_id} ended in state {state}")
+
+    for transition in diff.array_tasks:
+        if is_failed_state(transition.state):
+            tasks = f"Task {job.id}_{transition.first}"
+            if transition.last != transition.first:
+                tasks = f"Tasks {job.id}_[{transition.first}-{transition.last}]"
+            ui.error(f"{tasks} ended in state {transition.state}")
+
+
+def _log_skipped(skipped: int, ui: UI) -> None:
+    if skipped:
+        ui.info(f"Skipped {skipped} unchanged files")
+
+
 class LaunchStage:
     """
     Launches a batch job.
@@ -81,6 +112,49 @@ class LaunchStage:
         return cast(BaseBatchJob, self._batch_job)
 
 
+class HeldLaunchStage(LaunchStage):
+    """
+    Submits a batch job on hold, so it waits in the queue while the files are uploaded.
+    The job is released once the upload succeeded and canceled if the upload or the release failed.
+    """
+
+    def __init__(
+        self, controller: Controller, batch_script: str, prepare_stage: "PrepareStage"
+    ) -> None:
+        super().__init__(controller, batch_script)
+        self._prepare_stage = prepare_stage
+
+    def __call__(self, ui: UI) -> bool:
+        batch_job = self._controller.submit(self._batch_script, hold=True)
+        self._batch_job = batch_job
+        ui.launch(f"Launched job {batch_job.jobid} on hold")
+
+        try:
+            uploaded = self._prepare_stage(ui)
+        except BaseException:
+            self._cancel_held_job(batch_job, ui)
+            raise
+
+        if not uploaded:
+            self._cancel_held_job(batch_job, ui)
+            return False
+
+        try:
+            batch_job.release()
+        except Exception as error:
+            # A job that stays held would wait in the queue forever
+            ui.error(get_error_message(error))
+            self._cancel_held_job(batch_job, ui)
+            return False
+
+        ui.success(f"Released job {batch_job.jobid}")
+        return True
+
+    def _cancel_held_job(self, batch_job: BaseBatchJob, ui: UI) -> None:
+        ui.info(f"Canceling held job {batch_job.jobid}")
+        batch_job.cancel()
+
+
 class JobLoggingStage:
     """
     Logs the Slurm Job ID into a file
@@ -105,9 +179,52 @@ class JobLoggingStage:
         pass
 
 
+class JobRecordingStage:
+    """
+    Records the submitted job in the local job registry
+    """
+
+    def __init__(
+        self,
+        batch_job_provider: BatchJobProvider,
+        registry: JobRegistry,
+        host: str,
+        config: Dict[str, Any],
+    ) -> None:
+        """
+        Args:
+            batch_job_provider (BatchJobProvider): Provides the submitted job
+            registry (JobRegistry): The registry to record the job in
+            host (str): The cluster the job was submitted to
+            config (dict): The options the job was submitted with, without credentials
+        """
+        self._provider = batch_job_provider
+        self._registry = registry
+        self._host = host
+        self._config = config
+
+    def allowed_to_fail(self) -> bool:
+        # The job runs either way
+        return True
+
+    def __call__(self, ui: UI) -> bool:
+        jobid = self._provider.get_batch_job().jobid
+        try:
+            self._registry.record_submission(self._host, jobid, self._config)
+        except Exception as err:
+            ui.error(f"Could not record job {jobid}: {get_error_message(err)}")
+            return False
+
+        return True
+
+    def cancel(self, ui: UI) -> None:
+        pass
+
+
 class WatchStage:
     """
-    Watches a batch job until it completes
+    Watches a batch job until it completes. Tasks are reported as soon as they fail,
+    the job's status only shows the first few of them.
     """
 
     def __init__(
@@ -115,11 +232,30 @@ class WatchStage:
         batch_job_provider: BatchJobProvider,
         poll_interval: int,
         allowed_to_fail: bool = False,
+        follow_output: bool = False,
+        output_log: Optional[str] = None,
+        registry: Optional[JobRegistry] = None,
+        host: str = "",
     ) -> None:
+        """
+        Args:
+            batch_job_provider (BatchJobProvider): Provides the job to watch
+            poll_interval (int): The time between two polls of the job
+            allowed_to_fail (bool): Whether the workflow continues if the job fails
+            follow_output (bool): Whether to show the job's output while it runs
+            output_log (str): A local file the followed output is appended to
+            registry (JobRegistry): A registry every status of the job is recorded in
+            host (str): The cluster the job runs on, as recorded in the registry
+        """
         self._poll_interval = poll_interval
         self._provider = batch_job_provider
         self._watcher: Optional[JobWatcher] = None
         self._job_status: Optional[BaseJobStatus] = None
+        self._follow_output = follow_output
+        self._output_log = output_log
+        self._output_follower: Optional[OutputFollower] = None
+        self._registry = registry
+        self._host = host
 
         self._allowed_to_fail = allowed_to_fail
 
@@ -128,20 +264,39 @@ class WatchStage:
 
     def __call__(self, ui: UI) -> bool:
         batch_job = self._provider.get_batch_job()
+        if self._follow_output:
+            self._output_follower = OutputFollower(
+                batch_job, ui.output, self._output_log
+            )
+            self._output_follower.start()
+
         self._watcher = batch_job.get_watcher()
         self._watcher.watch(self._get_callback(ui), self._poll_interval)
-        self._watcher.wait_until_done()
+        try:
+            self._watcher.wait_until_done()
+        finally:
+            if self._output_follower is not None:
+                self._output_follower.finish()
+            if self._registry is not None:
+                self._registry.flush()
 
         return self._job_status is not None and self._job_status.success
 
     def _get_callback(self, ui: UI) -> JobStatusCallback:
-        def callback(new_status: BaseJobStatus) -> None:
+        jobid = self._provider.get_batch_job().jobid
+
+        def callback(new_status: BaseJobStatus, diff: StatusDiff) -> None:
             self._job_status = new_status
             ui.update(new_status)
+            _log_failed_tasks(new_status, diff, ui)
+            if self._registry is not None:
+                self._registry.record_status(self._host, jobid, new_status)
 
-        return callback
+        return DiffingCallback(callback)
 
     def cancel(self, ui: UI) -> None:
+        if self._output_follower is not None:
+            self._output_follower.stop()
         get_or_raise(self._watcher, NotWatchingError).stop()
         self._provider.cancel(ui)
 
@@ -155,86 +310,125 @@ class PrepareStage:
         self,
         filesystem_factory: FilesystemFactory,
         copy_instructions: List[CopyInstruction],
+        transfer: Optional[TransferOptions] = None,
     ) -> None:
         self._local_fs = filesystem_factory.create_local_filesystem()
-        self._remote_fs = filesystem_factory.create_ssh_filesystem()
+        # The SSH filesystem is only opened when the stage runs, a workflow that ends early
+        # must not keep a channel of a shared connection open
+        self._filesystem_factory = filesystem_factory
         self._files = copy_instructions
+        self._transfer = transfer or TransferOptions()
 
     def allowed_to_fail(self) -> bool:
         return False
 
     def __call__(self, ui: UI) -> bool:
+        with closing(self._filesystem_factory.create_ssh_filesystem()) as remote_fs:
+            return self._copy(remote_fs, ui)
+
+    def _copy(self, remote_fs: Filesystem, ui: UI) -> bool:
         ui.info("Copying files...")
-        copied_files, errors = self._try_copy_files()
+        result = self._try_copy_files(remote_fs)
 
-        if errors:
-            _log_errors(errors, ui)
-            self._do_rollback(copied_files, ui)
+        if result.errors:
+            _log_errors(result.errors, ui)
+            self._do_rollback(remote_fs, result.copied_files, ui)
             return False
 
+        _log_skipped(len(result.skipped_files), ui)
         ui.success("Done")
         return True
 
     def cancel(self, ui: UI) -> None:
         pass
 
-    def _try_copy_files(self) -> Tuple[List[str], List[Exception]]:
-        copied_files: List[str] = []
-        errors: List[Exception] = []
-        for cr in progressive_copy(self._local_fs, self._remote_fs, self._files):
-            copied_files.extend(cr.copied_files)
+    def _try_copy_files(self, remote_fs: Filesystem) -> CopyResult:
+        result = CopyResult([])
+        for cr in progressive_copy(
+            self._local_fs,
+            remote_fs,
+            self._files,
+            workers=self._transfer.workers,
+            bundle_threshold=self._transfer.bundle_threshold,
+        ):
+            result.copied_files.extend(cr.copied_files)
+            result.skipped_files.extend(cr.skipped_files)
             if cr.errors:
-                errors.extend(cr.errors)
+                result.errors.extend(cr.errors)
                 break
 
-        return copied_files, errors
+        return result
 
-    def _do_rollback(self, files: List[str], ui: UI) -> None:
+    def _do_rollback(self, remote_fs: Filesystem, files: List[str], ui: UI) -> None:
         ui.info("Performing rollback")
-        errors = list(progressive_clean(self._remote_fs, files))
+        errors = list(progressive_clean(remote_fs, files))
         _log_errors(errors, ui)
         ui.success("Done")
 
 
-class FinalizeStage:
+class CollectStage:
     """
-    Collects result files from the remote filesystem and cleans it according to the given instructions.
+    Collects result files from the remote filesystem.
     """
 
     def __init__(
         self,
         filesystem_factory: FilesystemFactory,
         collect_instructions: List[CopyInstruction],
-        clean_instructions: List[str],
+        transfer: Optional[TransferOptions] = None,
     ) -> None:
         self._local_fs = filesystem_factory.create_local_filesystem()
-        self._remote_fs = filesystem_factory.create_ssh_filesystem()
+        self._filesystem_factory = filesystem_factory
         self._files = collect_instructions
-        self._clean = clean_instructions
+        self._transfer = transfer or TransferOptions()
 
     def allowed_to_fail(self) -> bool:
         return False
 
     def __call__(self, ui: UI) -> bool:
-        self._collect_files(ui)
-        self._clean_files(ui)
-
+        ui.info("Collecting files...")
+        skipped = 0
+        with closing(self._filesystem_factory.create_ssh_filesystem()) as remote_fs:
+            for cr in progressive_copy(
+                remote_fs,
+                self._local_fs,
+                self._files,
+                abort_on_error=False,
+                workers=self._transfer.workers,
+                bundle_threshold=self._transfer.bundle_threshold,
+            ):
+                _log_errors(cr.errors, ui)
+                skipped += len(cr.skipped_files)
+
+        _log_skipped(skipped, ui)
+        ui.success("Done")
         return True
 
-    def _collect_files(self, ui: UI) -> None:
-        ui.info("Collecting files...")
-        for cr in progressive_copy(
-            self._remote_fs, self._local_fs, self._files, abort_on_error=False
-        ):
-            _log_errors(cr.errors, ui)
+    def cancel(self, ui: UI) -> None:
+        pass
 
-        ui.success("Done")
 
-    def _clean_files(self, ui: UI) -> None:
+class CleanStage:
+    """
+    Cleans the remote filesystem according to the given instructions.
+    """
+
+    def __init__(
+        self, filesystem_factory: FilesystemFactory, clean_instructions: List[str]
+    ) -> None:
+        self._filesystem_factory = filesystem_factory
+        self._clean = clean_instructions
+
+    def allowed_to_fail(self) -> bool:
+        return False
+
+    def __call__(self, ui: UI) -> bool:
         ui.info("Cleaning files...")
-        errors = list(progressive_clean(self._remote_fs, self._clean))
+        with closing(self._filesystem_factory.create_ssh_filesystem()) as remote_fs:
+            errors = list(progressive_clean(remote_fs, self._clean))
         _log_errors(errors, ui)
         ui.success("Done")
+        return True
 
     def cancel(self, ui: UI) -> None:
         pass
@@ -245,15 +439,34 @@ class StatusStage:
     Checks a job's status.
     """
 
-    def __init__(self, controller: Controller, jobid: str) -> None:
+    def __init__(
+        self,
+        controller: Controller,
+        jobid: str,
+        registry: Optional[JobRegistry] = None,
+        host: str = "",
+    ) -> None:
+        """
+        Args:
+            controller (Controller): Polls the job
+            jobid (str): The ID of the job
+            registry (JobRegistry): A registry the status is recorded in
+            host (str): The cluster the job runs on, as recorded in the registry
+        """
         self._controller = controller
         self._jobid = jobid
+        self._registry = registry
+        self._host = host
 
     def allowed_to_fail(self) -> bool:
         return False
 
     def __call__(self, ui: UI) -> bool:
-        ui.update(self._controller.poll_status(self._jobid))
+        status = self._controller.poll_status(self._jobid)
+        ui.update(status)
+        if self._registry is not None:
+            self._registry.record_status(self._host, self._jobid, status)
+            self._registry.flush()
         return True
 
     def cancel(self, ui: UI) -> None:
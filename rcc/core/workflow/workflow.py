@@ -1,23 +1,35 @@
-from typing import List, Optional
+import dataclasses
+import posixpath
+import queue
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
 
-from rcc.core.utils import get_or_raise
 from rcc.core.ui import UI
-from rcc.core.filesystem import FilesystemFactory
+from rcc.core.filesystem import CopyInstruction, FilesystemFactory
 from rcc.core.ui import UI
 from rcc.core.utils import (
     LaunchOptions,
     ImmediateCommandOptions,
     WatchOptions,
     FinalizeOptions,
+    TransferOptions,
 )
-from rcc.core.job import BaseBatchJob
+from rcc.core.job import BaseBatchJob, JobRegistry, open_registry
 from rcc.cluster._base import Controller
+from rcc.core.filesystem.glob import (
+    is_glob,
+    removeprefix,
+    split_at_first_wildcard,
+)
 from .stages import (
     LaunchStage,
+    HeldLaunchStage,
     PrepareStage,
     JobLoggingStage,
+    JobRecordingStage,
     WatchStage,
-    FinalizeStage,
+    CollectStage,
+    CleanStage,
     CancelStage,
     StatusStage,
 )
@@ -63,16 +75,72 @@ class Stage(Protocol):
         ...
 
 
+class _Node(NamedTuple):
+    stage: Stage
+    # The positions of the stages that have to complete first
+    dependencies: Tuple[int, ...]
+
+
+# The position of a stage, its result and the exception it raised
+_Outcome = Tuple[int, bool, Optional[BaseException]]
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+
 class Workflow:
     """
-    Represents a series of isolated steps that are executed in order
+    Represents isolated steps that depend on each other. A stage starts once all stages it depends on
+    completed successfully, independent stages run concurrently. After a stage failed, no further
+    stages are started and the workflow ends once the running stages returned.
     """
 
-    def __init__(self, stages: List[Stage]) -> None:
-        self._stages = stages
-        self._active_stage: Optional[Stage] = None
+    def __init__(
+        self,
+        stages: Optional[List[Stage]] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ) -> None:
+        """
+        Args:
+            stages (list[Stage]): Stages that are executed in order, each one depending on the previous one
+            max_concurrency (int): The maximum number of stages that run at the same time
+        """
+        self._stages: List[_Node] = []
+        self._max_concurrency = max_concurrency
+        self._lock = threading.Lock()
+        self._running: Set[int] = set()
+        self._started = False
         self._canceled = False
 
+        previous: List[Stage] = []
+        for stage in stages or []:
+            self.add(stage, after=previous)
+            previous = [stage]
+
+    def add(self, stage: Stage, after: Sequence[Stage] = ()) -> Stage:
+        """
+        Adds a stage to the workflow.
+
+        Args:
+            stage (Stage): The stage
+            after (list[Stage]): The stages that have to complete successfully before `stage` starts
+
+        Returns:
+            Stage: The added stage, to be used as a dependency of later stages
+
+        Raises:
+            ValueError: A dependency is not part of the workflow
+        """
+        positions = {
+            id(node.stage): position for position, node in enumerate(self._stages)
+        }
+        try:
+            dependencies = tuple(positions[id(dependency)] for dependency in after)
+        except KeyError:
+            raise ValueError("Dependencies have to be added to the workflow first")
+
+        self._stages.append(_Node(stage, dependencies))
+        return stage
+
     def run(self, ui: UI) -> bool:
         """
         Runs the workflow. Returns true if all stages completed successfully.
@@ -82,27 +150,96 @@ class Workflow:
 
         Returns:
             bool
-        """
-        results: List[bool] = []
-        for stage in self._stages:
-            self._active_stage = stage
 
-            if self._canceled:
+        Raises:
+            Exception: The first exception raised by a stage, after the other running stages returned
+        """
+        results: Dict[int, bool] = {}
+        finished: "queue.Queue[_Outcome]" = queue.Queue()
+        started: Set[int] = set()
+        error: Optional[BaseException] = None
+        failed = False
+        while True:
+            if not failed:
+                self._start_ready_stages(results, started, finished, ui)
+
+            if len(started) == len(results):
                 break
 
-            result = stage(ui)
-            results.append(result)
-            if self._workflow_failed(stage, result):
-                return False
+            position, result, stage_error = finished.get()
+            results[position] = result
+            error = error or stage_error
+            stage = self._stages[position].stage
+            failed = (
+                failed
+                or stage_error is not None
+                or self._workflow_failed(stage, result)
+            )
 
-        return all(results)
+        if error is not None:
+            raise error
+
+        return all(results.values())
+
+    def _start_ready_stages(
+        self,
+        results: Dict[int, bool],
+        started: Set[int],
+        finished: "queue.Queue[_Outcome]",
+        ui: UI,
+    ) -> None:
+        with self._lock:
+            for position in self._ready_stages(results, started):
+                if (
+                    self._canceled
+                    or len(started) - len(results) >= self._max_concurrency
+                ):
+                    return
+
+                started.add(position)
+                self._running.add(position)
+                self._started = True
+                # Daemon threads do not keep the interpreter alive after an interrupt
+                threading.Thread(
+                    target=self._run_stage,
+                    args=(position, finished, ui),
+                    daemon=True,
+                ).start()
+
+    def _ready_stages(self, results: Dict[int, bool], started: Set[int]) -> List[int]:
+        return [
+            position
+            for position, node in enumerate(self._stages)
+            if position not in started
+            and all(
+                dependency in results
+                and not self._workflow_failed(
+                    self._stages[dependency].stage, results[dependency]
+                )
+                for dependency in node.dependencies
+            )
+        ]
+
+    def _run_stage(
+        self, position: int, finished: "queue.Queue[_Outcome]", ui: UI
+    ) -> None:
+        outcome: _Outcome
+        try:
+            outcome = (position, self._stages[position].stage(ui), None)
+        except BaseException as err:
+            outcome = (position, False, err)
+
+        # A stage that returned must not be canceled anymore
+        with self._lock:
+            self._running.discard(position)
+        finished.put(outcome)
 
     def _workflow_failed(self, stage: Stage, result: bool) -> bool:
         return not (result or stage.allowed_to_fail())
 
     def cancel(self, ui: UI) -> None:
         """
-        Cancels the workflow.
+        Cancels the workflow. Running stages are canceled, no further stages are started.
 
         Args:
             ui (UI): The ui to send output to.
@@ -110,9 +247,15 @@ class Workflow:
         Raises:
             WorkflowNotStartedError: If the workflow is canceled before it was started.
         """
-        active_stage = get_or_raise(self._active_stage, WorkflowNotStartedError)
-        active_stage.cancel(ui)
-        self._canceled = True
+        with self._lock:
+            if not self._started:
+                raise WorkflowNotStartedError()
+
+            self._canceled = True
+            running = [self._stages[position].stage for position in self._running]
+
+        for stage in running:
+            stage.cancel(ui)
 
 
 class WorkflowNotStartedError(Exception):
@@ -124,34 +267,116 @@ def launchworkflow(
     controller: Controller,
     options: LaunchOptions,
 ) -> Workflow:
-    launch_stage = LaunchStage(controller, options.sbatch)
-    stages: List[Stage] = [
-        PrepareStage(filesystem_factory, options.copy_files),
-        launch_stage,
-    ]
+    workflow = Workflow()
+    launch_stage: Optional[LaunchStage] = None
+    if options.hold_during_upload:
+        launch_stage = _add_held_launch_stage(
+            workflow, filesystem_factory, controller, options
+        )
+    if launch_stage is None:
+        prepare_stage = workflow.add(
+            PrepareStage(filesystem_factory, options.copy_files, options.transfer)
+        )
+        launch_stage = LaunchStage(controller, options.sbatch)
+        workflow.add(launch_stage, after=[prepare_stage])
 
     if options.job_id_file:
-        stages.append(JobLoggingStage(launch_stage, Path(options.job_id_file)))
+        workflow.add(
+            JobLoggingStage(launch_stage, Path(options.job_id_file)),
+            after=[launch_stage],
+        )
+
+    registry = _registry(options.job_registry)
+    host = options.connection.address
+    if registry is not None:
+        workflow.add(
+            JobRecordingStage(launch_stage, registry, host, _job_config(options)),
+            after=[launch_stage],
+        )
 
     if options.watch:
-        stages.append(
+        watch_stage = workflow.add(
             WatchStage(
-                launch_stage, options.poll_interval, options.continue_if_job_fails
-            )
+                launch_stage,
+                options.poll_interval,
+                options.continue_if_job_fails,
+                options.follow_output,
+                options.output_log or None,
+                registry,
+                host,
+            ),
+            after=[launch_stage],
+        )
+        _add_finalize_stages(
+            workflow,
+            filesystem_factory,
+            options.collect_files,
+            options.clean_files,
+            options.transfer,
+            after=[watch_stage],
         )
-        stages.append(
-            FinalizeStage(
-                filesystem_factory, options.collect_files, options.clean_files
+
+    return workflow
+
+
+def _add_held_launch_stage(
+    workflow: Workflow,
+    filesystem_factory: FilesystemFactory,
+    controller: Controller,
+    options: LaunchOptions,
+) -> Optional[LaunchStage]:
+    # The batch script has to be on the cluster before the job can be submitted
+    script_files = [
+        instruction
+        for instruction in options.copy_files
+        if _may_copy_to(instruction, options.sbatch)
+    ]
+    input_files = [
+        instruction
+        for instruction in options.copy_files
+        if instruction not in script_files
+    ]
+    if options.copy_files and not script_files:
+        # The script is copied under a name that cannot be told from the instructions,
+        # everything is uploaded before the job is submitted
+        return None
+
+    launch_after: List[Stage] = []
+    if script_files:
+        launch_after.append(
+            workflow.add(
+                PrepareStage(filesystem_factory, script_files, options.transfer)
             )
         )
 
-    return Workflow(stages)
+    upload_stage = PrepareStage(filesystem_factory, input_files, options.transfer)
+    launch_stage = HeldLaunchStage(controller, options.sbatch, upload_stage)
+    workflow.add(launch_stage, after=launch_after)
+    return launch_stage
+
+
+def _may_copy_to(instruction: CopyInstruction, path: str) -> bool:
+    # The destination is the file itself or a directory it may be copied into
+    destination, path = _remote_path(instruction.destination), _remote_path(path)
+    if posixpath.isabs(destination) != posixpath.isabs(path):
+        # Relative paths start at a directory we do not know here
+        return True
+
+    return _contains(destination, path)
+
+
+def _remote_path(path: str) -> str:
+    # Relative paths start in the home directory
+    return posixpath.normpath(removeprefix(path, "~/"))
 
 
 def statusworkflow(
     controller: Controller, options: ImmediateCommandOptions
 ) -> Workflow:
-    return Workflow([StatusStage(controller, options.jobid)])
+    registry = _registry(options.job_registry)
+    return Workflow(
+        [StatusStage(controller, options.jobid, registry, options.connection.address)]
+    )
 
 
 def cancelworkflow(
@@ -163,18 +388,103 @@ def cancelworkflow(
 def watchworkflow(controller: Controller, options: WatchOptions) -> Workflow:
     class SimpleBatchJobProvider:
         def get_batch_job(self) -> BaseBatchJob:
-            return BaseBatchJob(controller, options.jobid)
+            return controller.batch_job(options.jobid)
 
         def cancel(self, ui: UI) -> None:
             pass
 
-    return Workflow([WatchStage(SimpleBatchJobProvider(), options.poll_interval)])
+    return Workflow(
+        [
+            WatchStage(
+                SimpleBatchJobProvider(),
+                options.poll_interval,
+                follow_output=options.follow_output,
+                output_log=options.output_log or None,
+                registry=_registry(options.job_registry),
+                host=options.connection.address,
+            )
+        ]
+    )
+
+
+def _registry(path: str) -> Optional[JobRegistry]:
+    return open_registry(path) if path else None
+
+
+def _job_config(options: LaunchOptions) -> Dict[str, Any]:
+    # The registry is a plain file, it must not contain passwords or keys
+    config = dataclasses.asdict(options)
+    del config["connection"]
+    config["proxyjumps"] = [proxyjump.address for proxyjump in options.proxyjumps]
+    return config
 
 
 def finalizeworkflow(
     filesystem_factory: FilesystemFactory,
     options: FinalizeOptions,
 ) -> Workflow:
-    return Workflow(
-        [FinalizeStage(filesystem_factory, options.collect_files, options.clean_files)]
+    workflow = Workflow()
+    _add_finalize_stages(
+        workflow,
+        filesystem_factory,
+        options.collect_files,
+        options.clean_files,
+        options.transfer,
+    )
+    return workflow
+
+
+def _add_finalize_stages(
+    workflow: Workflow,
+    filesystem_factory: FilesystemFactory,
+    collect_files: List[CopyInstruction],
+    clean_files: List[str],
+    transfer: TransferOptions,
+    after: Sequence[Stage] = (),
+) -> None:
+    collect_stage = workflow.add(
+        CollectStage(filesystem_factory, collect_files, transfer), after=after
+    )
+
+    # Cleaning may only start early if it cannot delete files that are still being collected
+    clean_after = list(after)
+    if _any_overlap([instruction.source for instruction in collect_files], clean_files):
+        clean_after.append(collect_stage)
+
+    workflow.add(CleanStage(filesystem_factory, clean_files), after=clean_after)
+
+
+def _any_overlap(paths: List[str], other_paths: List[str]) -> bool:
+    return any(
+        _overlap(path, other_path) for path in paths for other_path in other_paths
+    )
+
+
+def _overlap(path: str, other_path: str) -> bool:
+    # Compares the directories in front of the first wildcard, one containing the other means overlap
+    directory, other_directory = _fixed_part(path), _fixed_part(other_path)
+    if posixpath.isabs(directory) != posixpath.isabs(other_directory):
+        # Relative paths start at a directory we do not know here
+        return True
+
+    return _contains(directory, other_directory) or _contains(
+        other_directory, directory
+    )
+
+
+def _fixed_part(path: str) -> str:
+    # Relative paths start in the home directory
+    path = removeprefix(path, "~/")
+    if is_glob(path):
+        path, _ = split_at_first_wildcard(path)
+        path = posixpath.dirname(path) if not path.endswith("/") else path
+
+    return posixpath.normpath(path)
+
+
+def _contains(directory: str, path: str) -> bool:
+    return (
+        directory == "."
+        or path == directory
+        or path.startswith(directory.rstrip("/") + "/")
     )